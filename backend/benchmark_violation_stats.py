@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark for violation statistics queries
+
+Compares the old client-side approach (four count round trips plus a full
+violation_type / fine_amount scan tallied in Python) with the single
+grouped violation_statistics() RPC.
+
+Usage:
+    python benchmark_violation_stats.py --seed 1000000   # insert synthetic violations
+    python benchmark_violation_stats.py --runs 20        # time both approaches
+    python benchmark_violation_stats.py --cleanup        # delete the synthetic violations
+"""
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from postgrest.types import ReturnMethod
+from database.supabase_client import supabase
+from models.violation import ViolationType, ViolationStatus, ViolationSeverity
+
+BENCHMARK_MARKER = "[benchmark]"
+SEED_CHUNK_SIZE = 1000
+# PostgREST caps a single response at its max-rows setting, so a full scan has to page
+SCAN_PAGE_SIZE = 1000
+
+
+def seed(count: int):
+    """Insert `count` synthetic violations spread over the past year"""
+    now = datetime.utcnow()
+    inserted = 0
+    while inserted < count:
+        rows = []
+        for _ in range(min(SEED_CHUNK_SIZE, count - inserted)):
+            created_at = (now - timedelta(seconds=random.randint(0, 365 * 24 * 3600))).isoformat()
+            rows.append({
+                "id": str(uuid.uuid4()),
+                "plate_number": f"GR {random.randint(1000, 9999)}-{random.randint(10, 24)}",
+                "violation_type": random.choice(list(ViolationType)).value,
+                "severity": random.choice(list(ViolationSeverity)).value,
+                "location": f"Benchmark Location {random.randint(1, 50)}",
+                "description": BENCHMARK_MARKER,
+                "fine_amount": random.choice([50.0, 100.0, 200.0, 500.0]),
+                "status": random.choice(list(ViolationStatus)).value,
+                "reported_at": created_at,
+                "created_at": created_at,
+                "updated_at": created_at
+            })
+        supabase.table("violations").insert(rows, returning=ReturnMethod.minimal).execute()
+        inserted += len(rows)
+        print(f"Seeded {inserted}/{count} violations", end="\r")
+    print()
+
+
+def cleanup():
+    """Delete every violation created by seed()"""
+    supabase.table("violations").delete(returning=ReturnMethod.minimal).eq("description", BENCHMARK_MARKER).execute()
+    print("✅ Benchmark violations deleted")
+
+
+def legacy_statistics() -> dict:
+    """The pre-aggregation implementation: separate counts plus a paged full scan"""
+    counts = {}
+    for status in (None, "pending", "approved", "rejected", "paid"):
+        query = supabase.table("violations").select("id", count="exact").limit(1)
+        if status:
+            query = query.eq("status", status)
+        counts[status or "total"] = query.execute().count or 0
+
+    violation_types = {}
+    total_fines = 0.0
+    offset = 0
+    while True:
+        page = supabase.table("violations").select("violation_type,fine_amount").order("id").range(offset, offset + SCAN_PAGE_SIZE - 1).execute().data
+        for violation in page:
+            violation_types[violation["violation_type"]] = violation_types.get(violation["violation_type"], 0) + 1
+            total_fines += float(violation["fine_amount"] or 0)
+        if len(page) < SCAN_PAGE_SIZE:
+            break
+        offset += SCAN_PAGE_SIZE
+
+    return {"counts": counts, "violation_types": violation_types, "total_fines": total_fines}
+
+
+def aggregated_statistics() -> dict:
+    """The grouped violation_statistics() RPC"""
+    return {"groups": supabase.rpc("violation_statistics").execute().data}
+
+
+def time_runs(name: str, func, runs: int):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{name:<12} median {statistics.median(timings):>10.1f} ms   p95 {p95:>10.1f} ms   ({runs} runs)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark violation statistics queries")
+    parser.add_argument("--seed", type=int, default=0, help="Insert this many synthetic violations first")
+    parser.add_argument("--runs", type=int, default=10, help="Timed runs per approach")
+    parser.add_argument("--legacy-runs", type=int, default=None, help="Timed runs for the legacy approach (defaults to --runs)")
+    parser.add_argument("--cleanup", action="store_true", help="Delete synthetic violations and exit")
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup()
+        return
+    if args.seed:
+        seed(args.seed)
+
+    total = supabase.table("violations").select("id", count="exact").limit(1).execute().count
+    print(f"Benchmarking against {total} violations")
+    time_runs("aggregated", aggregated_statistics, args.runs)
+    time_runs("legacy", legacy_statistics, args.legacy_runs or args.runs)
+
+
+if __name__ == "__main__":
+    main()
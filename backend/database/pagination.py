@@ -0,0 +1,78 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    """Apply the default and maximum page size to a requested limit"""
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def encode_cursor(*values: Any) -> str:
+    """Pack the sort key of the last row on a page into an opaque cursor"""
+    payload = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Unpack a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error, UnicodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def apply_keyset(query, cursor: Optional[str], limit: int):
+    """
+    Order a PostgREST query newest-first on (created_at, id) and resume it after cursor.
+
+    One extra row is requested so split_page can tell whether another page exists.
+    """
+    query = query.order("created_at", desc=True).order("id", desc=True)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if '"' in str(created_at) or '"' in str(row_id):
+            raise ValueError("Invalid cursor")
+        query = query.or_(
+            f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{row_id}")'
+        )
+    return query.limit(limit + 1)
+
+
+def row_cursor(row: dict) -> str:
+    """Cursor that resumes a keyset query after the given row"""
+    return encode_cursor(row["created_at"], row["id"])
+
+
+def split_page(rows: List[dict], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """Drop the look-ahead row fetched by apply_keyset and build the next cursor"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, row_cursor(rows[-1])
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, Any]:
+    """Unpack the (rank, id) position of a ranked search cursor"""
+    values = decode_cursor(cursor)
+    if len(values) != 2 or not isinstance(values[0], (int, float)) or isinstance(values[0], bool):
+        raise ValueError("Invalid cursor")
+    return values[0], values[1]
+
+
+def split_ranked_page(rows: List[dict], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """split_page for ranked search results, which resume after (rank, id) instead of (created_at, id)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1]["rank"], rows[-1]["id"])
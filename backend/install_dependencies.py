@@ -59,7 +59,7 @@ def install_fastapi_dependencies():
 def install_auth_dependencies():
     """Install authentication packages"""
     auth_packages = [
-        "python-jose[cryptography]>=3.3.0",
+        "PyJWT>=2.8.0",
         "passlib[bcrypt]>=1.7.4",
         "python-dotenv>=1.0.0"
     ]
@@ -1,33 +1,57 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, Body, File, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 import os
+import io
+import math
+import asyncio
 try:
     from dotenv import load_dotenv
 except ImportError:
     def load_dotenv():
         pass  # No-op if dotenv not available
-from datetime import datetime, timedelta
-from typing import Optional, List
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, List
 import jwt
 from passlib.context import CryptContext
 
 # Import our modules
 from database.supabase_client import supabase
-from models.user import User, UserCreate, UserLogin
-from models.vehicle import Vehicle, VehicleCreate
-from models.violation import Violation, ViolationCreate
+from database.pagination import DEFAULT_PAGE_SIZE
+from models.user import User, UserCreate, UserLogin, UserAccessUpdate, UserRole, UserStatus
+from models.vehicle import Vehicle, VehicleCreate, PlateCandidate, VehicleSearchResult, ExpiringVehicles
+from models.profile import VehicleProfile
+from models.violation import (
+    Violation, ViolationCreate, ViolationSummary, ViolationBulkResult, ViolationLeaseRelease,
+    ViolationBulkReview, ViolationBulkReviewResult
+)
 from models.dvla import (
-    DVLAUser, DVLAUserCreate, DVLAVehicle, DVLAVehicleCreate,
-    DVLARenewal, DVLARenewalCreate, DVLAFine, DVLAFineCreate, DVLAAnalytics
+    DVLAUser, DVLAUserCreate, DVLAVehicle, DVLAVehicleSummary, DVLAVehicleCreate,
+    DVLARenewal, DVLARenewalCreate, DVLARenewalBatch, DVLAFine, DVLAFineCreate, DVLAAnalytics
 )
 from services.auth_service import AuthService
+from services.token_verifier import token_verifier
+from services.password_pool import PasswordPoolBusy, password_pool
+from services.rate_limiter import RateLimiter
+from services.authorization import user_access
 from services.plate_recognition_service import PlateRecognitionService
 from services.vehicle_service import VehicleService
-from services.violation_service import ViolationService
+from services.violation_service import ViolationService, REVIEW_CONFLICT_ERROR
 from services.dvla_service import DVLAService
+from services.export_service import ExportService, EXPORT_FORMATS
+from services.dvla_import import (
+    IMPORT_FORMATS, VehicleImporter, VehicleImportStatus, import_job_id, read_import_status, store_upload
+)
+from services.fine_reconciliation import FineReconciler, FineReconciliationSummary
+from services.metrics_broadcaster import metrics_broadcaster
+from services.expiry_sweeper import expiry_sweeper
+from services.profile_service import ProfileService
+from services.evidence_store import (
+    DERIVATIVE_FORMATS, DERIVATIVE_SIZES, is_evidence_hash, parse_range_header, sniff_content_type
+)
 
 # Load environment variables
 load_dotenv()
@@ -45,10 +69,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Security
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Initialize services
@@ -57,6 +83,30 @@ plate_recognition_service = PlateRecognitionService()
 vehicle_service = VehicleService()
 violation_service = ViolationService()
 dvla_service = DVLAService()
+export_service = ExportService()
+profile_service = ProfileService()
+# Login throttling in front of the password hash pool. The per-IP limit is loose
+# because a whole station can share one address.
+login_user_limiter = RateLimiter(per_minute=float(os.getenv("LOGIN_ATTEMPTS_PER_MINUTE", "10")), burst=5)
+login_ip_limiter = RateLimiter(per_minute=float(os.getenv("LOGIN_IP_ATTEMPTS_PER_MINUTE", "120")), burst=60)
+expiry_sweeper.on_expired = lambda swept: vehicle_service.expiring_cache.invalidate()
+
+@app.on_event("startup")
+async def start_background_tasks():
+    metrics_broadcaster.register("violations", violation_service.get_violation_stats)
+    metrics_broadcaster.register("dvla", dvla_service.get_analytics)
+    metrics_broadcaster.start()
+    if violation_service.spool:
+        violation_service.spool.start()
+    expiry_sweeper.start()
+    # Warm the fuzzy plate index so the first recognition doesn't wait for it
+    vehicle_service.refresh_plate_index_in_background()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await expiry_sweeper.stop()
+    if violation_service.spool:
+        await violation_service.spool.stop()
 
 # Models
 class Token(BaseModel):
@@ -72,29 +122,112 @@ class PlateRecognitionResponse(BaseModel):
     plate_number: str
     confidence: float
     vehicle_data: Optional[Vehicle] = None
+    candidate_matches: List[PlateCandidate] = []
     processing_time: float
 
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    """List endpoints return a bare JSON array; the cursor for the next page travels in a header"""
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+def export_response(table: str, export_format: str, filters: dict) -> StreamingResponse:
+    """Stream a table export with a download filename"""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    return StreamingResponse(
+        export_service.stream(table, export_format, filters),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{export_format}"'}
+    )
+
+def limit_login_attempts(request: Request, username: Optional[str] = None):
+    """Throttle password checks per client IP and per username before they reach the hash pool"""
+    limits = [(login_ip_limiter, request.client.host if request.client else "unknown")]
+    if username:
+        limits.append((login_user_limiter, username.lower()))
+    for limiter, key in limits:
+        retry_after = limiter.acquire(key)
+        if retry_after:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many attempts, try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+def password_pool_busy(e: PasswordPoolBusy) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
 # Authentication dependency
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, os.getenv("SECRET_KEY"), algorithms=["HS256"])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
+def authenticate_token(request: Request, token: str) -> str:
+    """Verify a token and record its principal on request.state; returns the user id"""
+    try:
+        claims = token_verifier.verify(token)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    request.state.user_id = str(claims["sub"])
+    request.state.user_role = claims.get("role")
+    return request.state.user_id
+
+async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return authenticate_token(request, credentials.credentials)
+
+async def get_stream_user(
+    request: Request,
+    access_token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    """Like get_current_user, but also accepts ?access_token= since EventSource can't send headers"""
+    if credentials:
+        return authenticate_token(request, credentials.credentials)
+    if access_token:
+        return authenticate_token(request, access_token)
+    raise HTTPException(status_code=403, detail="Not authenticated")
+
+async def get_current_dvla_user(current_user: str = Depends(get_current_user)) -> int:
+    """DVLA endpoints: the caller must hold a DVLA account token; returns the DVLA user id"""
+    try:
+        return int(current_user)
+    except ValueError:
+        raise HTTPException(status_code=403, detail="Requires a DVLA account")
+
+def require_roles(*roles: UserRole):
+    """
+    Dependency factory: the caller must be an active user with one of `roles`.
+    
+    Role and status come from the in-memory access cache, so the check
+    usually costs no database call. Returns the user id like get_current_user.
+    """
+    allowed = set(roles)
+    
+    async def dependency(request: Request, current_user: str = Depends(get_current_user)) -> str:
+        if current_user.isdigit():
+            # DVLA accounts live in dvla_users and hold none of these roles
+            raise HTTPException(status_code=403, detail="DVLA accounts cannot perform this action")
+        access = await user_access.get(current_user)
+        if access is None:
+            raise HTTPException(status_code=403, detail="Unknown account")
+        if access.status != UserStatus.ACTIVE:
+            raise HTTPException(status_code=403, detail="Account is not active")
+        if access.role not in allowed:
+            raise HTTPException(status_code=403, detail=f"Requires role: {', '.join(role.value for role in roles)}")
+        request.state.user_role = access.role.value
+        return current_user
+    
+    return dependency
+
+# Violation review and queue actions
+require_supervisor = require_roles(UserRole.SUPERVISOR, UserRole.ADMIN)
 
 @app.get("/")
 async def root():
     return {"message": "ANPR Backend API is running"}
 
 @app.post("/auth/login", response_model=Token)
-async def login(user_credentials: UserLogin):
+async def login(user_credentials: UserLogin, request: Request):
     """Login endpoint for all user types"""
+    limit_login_attempts(request, user_credentials.username)
     try:
         user = await auth_service.authenticate_user(user_credentials.username, user_credentials.password)
         if not user:
@@ -102,18 +235,36 @@ async def login(user_credentials: UserLogin):
         
         access_token = auth_service.create_access_token(data={"sub": user.id, "role": user.role})
         return Token(access_token=access_token, token_type="bearer", user_role=user.role)
+    except HTTPException:
+        raise
+    except PasswordPoolBusy as e:
+        raise password_pool_busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/auth/register", response_model=User)
-async def register(user_data: UserCreate):
+async def register(user_data: UserCreate, request: Request):
     """Register new user (pending approval)"""
+    limit_login_attempts(request)
     try:
         user = await auth_service.create_user(user_data)
         return user
+    except PasswordPoolBusy as e:
+        raise password_pool_busy(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.put("/users/{user_id}/access", response_model=User)
+async def update_user_access(user_id: str, update: UserAccessUpdate, current_user: str = Depends(require_roles(UserRole.ADMIN))):
+    """Activate, suspend or change the role of a user (admin only); takes effect on the user's next request"""
+    try:
+        user = await auth_service.update_user_access(user_id, update.status, update.role)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
 @app.post("/plate-recognition", response_model=PlateRecognitionResponse)
 async def recognize_plate(request: PlateRecognitionRequest, current_user: str = Depends(get_current_user)):
     """Recognize license plate from image and return vehicle data"""
@@ -124,10 +275,17 @@ async def recognize_plate(request: PlateRecognitionRequest, current_user: str =
         # Get vehicle data from database
         vehicle_data = await vehicle_service.get_vehicle_by_plate(plate_number)
         
+        # Nearest registered plates, in case OCR misread a character
+        candidate_matches = []
+        if confidence > 0:
+            candidates = await vehicle_service.find_similar_plates(plate_number)
+            candidate_matches = [c for c in candidates if c.distance > 0]
+        
         return PlateRecognitionResponse(
             plate_number=plate_number,
             confidence=confidence,
             vehicle_data=vehicle_data,
+            candidate_matches=candidate_matches,
             processing_time=processing_time
         )
     except Exception as e:
@@ -142,6 +300,44 @@ async def create_violation(violation_data: ViolationCreate, current_user: str =
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+MAX_BULK_VIOLATIONS = 1000
+
+@app.post("/violations/bulk", response_model=ViolationBulkResult)
+async def create_violations_bulk(violations: List[dict] = Body(...), current_user: str = Depends(get_current_user)):
+    """Create many violations at once; each record is validated and reported individually"""
+    if len(violations) > MAX_BULK_VIOLATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_VIOLATIONS} violations per request")
+    try:
+        return await violation_service.create_violations(violations, current_user)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/vehicles/search", response_model=VehicleSearchResult)
+async def search_vehicles(
+    q: str,
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    current_user: str = Depends(get_current_user)
+):
+    """Search vehicles by plate number, owner name or make/model"""
+    try:
+        return await vehicle_service.search_vehicles(q, limit, offset, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/vehicles/expiring", response_model=ExpiringVehicles)
+async def get_expiring_vehicles(days: int = 30, limit: int = 20, current_user: str = Depends(get_current_user)):
+    """Active vehicles whose registration, insurance or road-worthiness lapses within `days` days"""
+    if not 1 <= days <= 366:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 366")
+    try:
+        return await vehicle_service.get_expiring_vehicles(days, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/vehicles/{plate_number}", response_model=Vehicle)
 async def get_vehicle(plate_number: str, current_user: str = Depends(get_current_user)):
     """Get vehicle information by plate number"""
@@ -153,50 +349,134 @@ async def get_vehicle(plate_number: str, current_user: str = Depends(get_current
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/violations", response_model=List[Violation])
+@app.get("/vehicles/{plate_number}/profile", response_model=VehicleProfile)
+async def get_vehicle_profile(plate_number: str, current_user: str = Depends(get_current_user)):
+    """Vehicle, violations, DVLA record, renewals and fines for a plate in one response"""
+    try:
+        profile = await profile_service.get_profile(plate_number)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not profile.vehicle and not profile.dvla_vehicle and not profile.violations:
+        raise HTTPException(status_code=404, detail="No records for this plate")
+    return profile
+
+@app.get("/violations", response_model=List[ViolationSummary])
 async def get_violations(
+    response: Response,
     plate_number: Optional[str] = None,
     status: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
     current_user: str = Depends(get_current_user)
 ):
-    """Get violations with optional filtering"""
+    """Get violations with optional filtering (paginated, see X-Next-Cursor)"""
     try:
-        violations = await violation_service.get_violations(plate_number, status, current_user)
+        violations, next_cursor = await violation_service.get_violations(plate_number, status, current_user, limit, cursor)
+        set_next_cursor(response, next_cursor)
         return violations
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/violations/{violation_id}", response_model=Violation)
+async def get_violation(violation_id: str, include_evidence: bool = False, current_user: str = Depends(get_current_user)):
+    """Get a single violation; evidence_image is included only on request"""
+    try:
+        violation = await violation_service.get_violation_by_id(violation_id, include_evidence)
+        if not violation:
+            raise HTTPException(status_code=404, detail="Violation not found")
+        return violation
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/violations/{violation_id}/evidence")
+async def get_violation_evidence(violation_id: str, current_user: str = Depends(get_current_user)):
+    """Get the evidence reference of a violation (inline image for legacy rows)"""
+    evidence = await violation_service.get_violation_evidence(violation_id)
+    if evidence is None:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    if evidence.get("evidence_hash"):
+        evidence["evidence_url"] = f"/evidence/{evidence['evidence_hash']}"
+    return evidence
+
+MAX_BULK_REVIEW = 1000
+
+@app.put("/violations/bulk-review", response_model=ViolationBulkReviewResult)
+async def bulk_review_violations(review: ViolationBulkReview, current_user: str = Depends(require_supervisor)):
+    """Approve and/or reject many violations at once, with a result per id (supervisor only)"""
+    if len(review.approve) + len(review.reject) > MAX_BULK_REVIEW:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_REVIEW} violations per request")
+    try:
+        return await violation_service.review_violations(review, current_user)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/violations/{violation_id}/approve")
-async def approve_violation(violation_id: str, current_user: str = Depends(get_current_user)):
+async def approve_violation(violation_id: str, current_user: str = Depends(require_supervisor)):
     """Approve a violation (supervisor only)"""
     try:
-        result = await violation_service.approve_violation(violation_id, current_user)
-        return {"message": "Violation approved successfully"}
+        approved = await violation_service.approve_violation(violation_id, current_user)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if not approved:
+        raise HTTPException(status_code=409, detail=REVIEW_CONFLICT_ERROR)
+    return {"message": "Violation approved successfully"}
 
 @app.put("/violations/{violation_id}/reject")
-async def reject_violation(violation_id: str, reason: str, current_user: str = Depends(get_current_user)):
+async def reject_violation(violation_id: str, reason: str, current_user: str = Depends(require_supervisor)):
     """Reject a violation (supervisor only)"""
     try:
-        result = await violation_service.reject_violation(violation_id, reason, current_user)
-        return {"message": "Violation rejected successfully"}
+        rejected = await violation_service.reject_violation(violation_id, reason, current_user)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if not rejected:
+        raise HTTPException(status_code=409, detail=REVIEW_CONFLICT_ERROR)
+    return {"message": "Violation rejected successfully"}
+
+# Review Queue Endpoints
+@app.post("/violations/queue/lease", response_model=List[ViolationSummary])
+async def lease_violations(limit: int = 10, current_user: str = Depends(require_supervisor)):
+    """
+    Lease the next pending violations for review (oldest first).
+    
+    Leased items are hidden from other supervisors until reviewed, released or
+    expired. Calling again returns (and renews) the caller's unfinished leases
+    plus new items up to `limit`.
+    """
+    try:
+        return await violation_service.lease_violations(current_user, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/violations/queue/release")
+async def release_violations(release: ViolationLeaseRelease, current_user: str = Depends(require_supervisor)):
+    """Return leased violations to the queue without reviewing them"""
+    try:
+        released = await violation_service.release_violations(release.violation_ids, current_user)
+        return {"released": released}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 # DVLA Endpoints
 @app.post("/dvla/auth/register", response_model=DVLAUser)
-async def register_dvla_user(user_data: DVLAUserCreate):
+async def register_dvla_user(user_data: DVLAUserCreate, request: Request):
     """Register new DVLA user"""
+    limit_login_attempts(request)
     try:
         user = await dvla_service.create_dvla_user(user_data)
         return user
+    except PasswordPoolBusy as e:
+        raise password_pool_busy(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/dvla/auth/login", response_model=Token)
-async def login_dvla_user(user_credentials: UserLogin):
+async def login_dvla_user(user_credentials: UserLogin, request: Request):
     """Login DVLA user"""
+    limit_login_attempts(request, user_credentials.username)
     try:
         user = await dvla_service.authenticate_dvla_user(user_credentials.username, user_credentials.password)
         if not user:
@@ -204,15 +484,27 @@ async def login_dvla_user(user_credentials: UserLogin):
 
         access_token = auth_service.create_access_token(data={"sub": str(user.id), "role": user.role})
         return Token(access_token=access_token, token_type="bearer", user_role=user.role)
+    except HTTPException:
+        raise
+    except PasswordPoolBusy as e:
+        raise password_pool_busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/dvla/users", response_model=List[DVLAUser])
-async def get_dvla_users(current_user: str = Depends(get_current_user)):
-    """Get all DVLA users"""
+async def get_dvla_users(
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    current_user: str = Depends(get_current_user)
+):
+    """Get DVLA users (paginated, see X-Next-Cursor)"""
     try:
-        users = await dvla_service.get_dvla_users()
+        users, next_cursor = await dvla_service.get_dvla_users(limit, cursor)
+        set_next_cursor(response, next_cursor)
         return users
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -225,12 +517,76 @@ async def create_dvla_vehicle(vehicle_data: DVLAVehicleCreate, current_user: str
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/dvla/vehicles", response_model=List[DVLAVehicle])
-async def get_dvla_vehicles(search: Optional[str] = None, limit: int = 100, current_user: str = Depends(get_current_user)):
-    """Get vehicles with optional search"""
+# Import jobs running in this process, by job id; a double submit can't run the same file twice
+running_imports: Dict[str, asyncio.Task] = {}
+
+@app.post("/dvla/vehicles/import", response_model=VehicleImportStatus, status_code=202)
+async def import_dvla_vehicles(
+    file: UploadFile = File(...),
+    format: str = "csv",
+    dvla_user_id: int = Depends(get_current_dvla_user)
+):
+    """
+    Start a bulk load of a registry extract (CSV with a header row, or NDJSON).
+
+    The import runs in the background; poll /dvla/vehicles/import/{job_id}
+    for progress. Rows that fail validation or insertion are skipped and
+    listed in the error report; re-uploading the same file resumes an
+    interrupted import.
+    """
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported import format: {format}")
+    path = await asyncio.to_thread(store_upload, file.file, format)
+    job_id = import_job_id(path)
+    if job_id in running_imports:
+        raise HTTPException(status_code=409, detail="This file is already being imported")
+
+    importer = VehicleImporter(f"{path}.checkpoint.json", f"{path}.errors.csv", dvla_user_id)
+
+    async def run_import():
+        try:
+            await asyncio.to_thread(importer.run, path, format)
+        except Exception as e:
+            # Recorded in the checkpoint as the job's error
+            print(f"Vehicle import {job_id} failed: {e}")
+        finally:
+            running_imports.pop(job_id, None)
+            dvla_service.analytics_changed()
+
+    running_imports[job_id] = asyncio.create_task(run_import())
+    return VehicleImportStatus(job_id=job_id, status="running")
+
+@app.get("/dvla/vehicles/import/{job_id}", response_model=VehicleImportStatus)
+async def get_dvla_vehicle_import(job_id: str, current_user: str = Depends(get_current_user)):
+    """Progress of a registry import, read from its checkpoint"""
+    status = await asyncio.to_thread(read_import_status, job_id)
+    if status is None:
+        if job_id in running_imports:
+            return VehicleImportStatus(job_id=job_id, status="running")
+        raise HTTPException(status_code=404, detail="Import not found")
+    if job_id in running_imports:
+        # A resumed job may not have replaced its previous run's final status yet
+        status.status = "running"
+    elif status.status == "running":
+        # The process running it stopped; uploading the file again resumes from the checkpoint
+        status.status = "interrupted"
+    return status
+
+@app.get("/dvla/vehicles", response_model=List[DVLAVehicleSummary])
+async def get_dvla_vehicles(
+    response: Response,
+    search: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    current_user: str = Depends(get_current_user)
+):
+    """Get vehicles with optional search (paginated, see X-Next-Cursor)"""
     try:
-        vehicles = await dvla_service.get_vehicles(search, limit)
+        vehicles, next_cursor = await dvla_service.get_vehicles(search, limit, cursor)
+        set_next_cursor(response, next_cursor)
         return vehicles
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -274,12 +630,40 @@ async def create_dvla_renewal(renewal_data: DVLARenewalCreate, current_user: str
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+MAX_RENEWAL_BATCH = 5000
+
+@app.post("/dvla/renewals/batch")
+async def process_dvla_renewal_batch(batch: DVLARenewalBatch, dvla_user_id: int = Depends(get_current_dvla_user)):
+    """
+    Process many renewals, extending each linked vehicle's expiry.
+    
+    Streams one NDJSON result per renewal as each chunk commits; renewals
+    are deduplicated on transaction_id, so a failed batch can be resent.
+    """
+    if len(batch.renewals) > MAX_RENEWAL_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_RENEWAL_BATCH} renewals per request")
+    results = dvla_service.process_renewals(batch.renewals, dvla_user_id)
+    return StreamingResponse(
+        (result.model_dump_json() + "\n" for result in results),
+        media_type=EXPORT_FORMATS["ndjson"]
+    )
+
 @app.get("/dvla/renewals", response_model=List[DVLARenewal])
-async def get_dvla_renewals(vehicle_id: Optional[int] = None, status: Optional[str] = None, current_user: str = Depends(get_current_user)):
-    """Get renewals with optional filtering"""
+async def get_dvla_renewals(
+    response: Response,
+    vehicle_id: Optional[int] = None,
+    status: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    current_user: str = Depends(get_current_user)
+):
+    """Get renewals with optional filtering (paginated, see X-Next-Cursor)"""
     try:
-        renewals = await dvla_service.get_renewals(vehicle_id, status)
+        renewals, next_cursor = await dvla_service.get_renewals(vehicle_id, status, limit, cursor)
+        set_next_cursor(response, next_cursor)
         return renewals
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -302,14 +686,42 @@ async def create_dvla_fine(fine_data: DVLAFineCreate, current_user: str = Depend
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/dvla/fines", response_model=List[DVLAFine])
-async def get_dvla_fines(vehicle_id: Optional[int] = None, payment_status: Optional[str] = None, current_user: str = Depends(get_current_user)):
-    """Get fines with optional filtering"""
+async def get_dvla_fines(
+    response: Response,
+    vehicle_id: Optional[int] = None,
+    payment_status: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    current_user: str = Depends(get_current_user)
+):
+    """Get fines with optional filtering (paginated, see X-Next-Cursor)"""
     try:
-        fines = await dvla_service.get_fines(vehicle_id, payment_status)
+        fines, next_cursor = await dvla_service.get_fines(vehicle_id, payment_status, limit, cursor)
+        set_next_cursor(response, next_cursor)
         return fines
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/dvla/fines/reconcile", response_model=FineReconciliationSummary)
+async def reconcile_dvla_fines(file: UploadFile = File(...), dvla_user_id: int = Depends(get_current_dvla_user)):
+    """
+    Match a payment settlement CSV (fine_id, amount, payment_method) against unpaid fines.
+    
+    Exact matches are marked paid; every other line is returned in
+    `mismatches` with the reason it was not applied.
+    """
+    reconciler = FineReconciler(verified_by=dvla_user_id)
+    settlement = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        summary = await asyncio.to_thread(reconciler.run, settlement)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if summary.paid:
+        dvla_service.analytics_changed()
+    return summary
+
 @app.put("/dvla/fines/{fine_id}/payment")
 async def update_dvla_fine_payment(fine_id: str, payment_data: dict, current_user: str = Depends(get_current_user)):
     """Update fine payment status"""
@@ -347,6 +759,23 @@ async def get_violation_stats(current_user: str = Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/analytics/violations/chart")
+async def get_violation_chart(
+    period: str = "week",
+    buckets: Optional[int] = None,
+    end: Optional[date] = None,
+    location: Optional[str] = None,
+    violation_type: Optional[str] = None,
+    current_user: str = Depends(get_current_user)
+):
+    """Get violation counts per status for the day / week / month / year charts"""
+    try:
+        return await violation_service.get_violation_chart(period, buckets, end, location, violation_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/analytics/officers")
 async def get_officer_stats(current_user: str = Depends(get_current_user)):
     """Get officer performance statistics"""
@@ -356,5 +785,156 @@ async def get_officer_stats(current_user: str = Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics/auth")
+async def get_auth_metrics(current_user: str = Depends(get_current_user)):
+    """Password hash pool load and how many users / IPs the login limiters are tracking"""
+    return {
+        "password_pool": password_pool.metrics(),
+        "login_limiter_users": len(login_user_limiter),
+        "login_limiter_ips": len(login_ip_limiter)
+    }
+
+# Live Metrics
+@app.get("/events/metrics")
+async def stream_metrics(topics: Optional[str] = None, current_user: str = Depends(get_stream_user)):
+    """
+    Server-Sent Events stream of dashboard metrics.
+    
+    Sends a `snapshot` event per topic (`violations`, `dvla`; comma-separated,
+    default both) and then `delta` events with only the changed fields
+    whenever the underlying data changes.
+    """
+    requested = topics.split(",") if topics else metrics_broadcaster.topics
+    unknown = [topic for topic in requested if topic not in metrics_broadcaster.topics]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown topics: {', '.join(unknown)}")
+    return StreamingResponse(
+        metrics_broadcaster.subscribe(requested),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Export Endpoints
+@app.get("/export/violations")
+async def export_violations(
+    format: str = "ndjson",
+    plate_number: Optional[str] = None,
+    status: Optional[str] = None,
+    current_user: str = Depends(get_current_user)
+):
+    """Stream the caller's violations as NDJSON or CSV (same scope and filters as /violations)"""
+    return export_response("violations", format, {"plate_number": plate_number, "status": status, "reported_by": current_user})
+
+@app.get("/export/vehicles")
+async def export_vehicles(format: str = "ndjson", status: Optional[str] = None, current_user: str = Depends(get_current_user)):
+    """Stream vehicles as NDJSON or CSV"""
+    return export_response("vehicles", format, {"status": status})
+
+@app.get("/export/dvla/renewals")
+async def export_dvla_renewals(
+    format: str = "ndjson",
+    vehicle_id: Optional[int] = None,
+    status: Optional[str] = None,
+    dvla_user_id: int = Depends(get_current_dvla_user)
+):
+    """Stream renewals as NDJSON or CSV (DVLA accounts only)"""
+    return export_response("dvla_renewals", format, {"vehicle_id": vehicle_id, "status": status})
+
+@app.get("/export/dvla/fines")
+async def export_dvla_fines(
+    format: str = "ndjson",
+    vehicle_id: Optional[int] = None,
+    payment_status: Optional[str] = None,
+    dvla_user_id: int = Depends(get_current_dvla_user)
+):
+    """Stream fines as NDJSON or CSV (DVLA accounts only)"""
+    return export_response("dvla_fines", format, {"vehicle_id": vehicle_id, "payment_status": payment_status})
+
+# Evidence Endpoints
+EVIDENCE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+async def evidence_response(key: str, request: Request, media_type: Optional[str] = None, vary: Optional[str] = None) -> Response:
+    """
+    Serve a blob from the evidence store, honouring a single byte range.
+    
+    Keys are content-addressed, so the key itself is a strong ETag and the
+    response can be cached forever. Store lookups and reads run in a worker
+    thread since the storage backend is blocking.
+    """
+    evidence_store = violation_service.evidence_store
+    headers = {"ETag": f'"{key}"', "Cache-Control": EVIDENCE_CACHE_CONTROL}
+    if vary:
+        headers["Vary"] = vary
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or headers["ETag"] in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    
+    size = await asyncio.to_thread(evidence_store.size, key)
+    if size is None:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != headers["ETag"]:
+        range_header = None
+    try:
+        byte_range = parse_range_header(range_header, size)
+    except ValueError:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    
+    headers["Accept-Ranges"] = "bytes"
+    if byte_range is None:
+        data = await asyncio.to_thread(evidence_store.read, key)
+        return Response(content=data, media_type=media_type or sniff_content_type(data), headers=headers)
+    
+    start, end = byte_range
+    data = await asyncio.to_thread(evidence_store.read, key, start, end)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    if media_type is None:
+        if start:
+            media_type = sniff_content_type(await asyncio.to_thread(evidence_store.read, key, 0, 11))
+        else:
+            media_type = sniff_content_type(data)
+    return Response(content=data, status_code=206, media_type=media_type, headers=headers)
+
+@app.get("/evidence/{evidence_hash}")
+async def get_evidence(evidence_hash: str, request: Request, current_user: str = Depends(get_current_user)):
+    """Get an evidence image by hash (supports Range requests)"""
+    if not is_evidence_hash(evidence_hash):
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    return await evidence_response(evidence_hash, request)
+
+@app.get("/evidence/{evidence_hash}/{size}")
+async def get_evidence_derivative(
+    evidence_hash: str,
+    size: str,
+    request: Request,
+    format: Optional[str] = None,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Get a resized derivative of an evidence image (`thumbnail` or `detail`).
+    
+    Without `format`, WebP is served to clients that accept it and JPEG otherwise.
+    """
+    if not is_evidence_hash(evidence_hash) or size not in DERIVATIVE_SIZES:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    
+    vary = None
+    if format is None:
+        format = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+        vary = "Accept"
+    elif format not in DERIVATIVE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(DERIVATIVE_FORMATS)}")
+    
+    try:
+        key = await asyncio.to_thread(violation_service.evidence_store.get_derivative, evidence_hash, size, format)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if key is None:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    return await evidence_response(key, request, DERIVATIVE_FORMATS[format][2], vary)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands for the ANPR backend database
+
+Usage:
+    python maintenance.py rebuild-counters
+    python maintenance.py sweep-expired
+    python maintenance.py import-vehicles registry.csv [--format ndjson] [--created-by 1]
+    python maintenance.py reconcile-fines settlement.csv [--report mismatches.csv]
+    python maintenance.py replay-dead-letters [--spool spool/violations.db]
+"""
+
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from database.supabase_client import supabase
+from services.dvla_import import IMPORT_FORMATS, VehicleImporter
+from services.expiry_sweeper import ExpirySweeper
+from services.fine_reconciliation import FineReconciler, write_mismatch_report
+from services.violation_service import ViolationService
+from services.violation_spool import SPOOL_PATH, ViolationSpool
+
+
+def rebuild_counters(args):
+    """Recompute the violation counter tables from the violations table"""
+    print("Rebuilding violation counters...")
+    result = supabase.rpc('rebuild_violation_counters').execute()
+    print(f"✅ Violation counters rebuilt ({result.data} violations counted)")
+
+
+def sweep_expired(args):
+    """Mark every active vehicle whose registration, insurance or road-worthiness lapsed as expired"""
+    swept = ExpirySweeper().sweep()
+    print(f"✅ {len(swept)} vehicles marked expired")
+
+
+def import_vehicles(args):
+    """Bulk load a DVLA registry extract, resuming from its checkpoint if one exists"""
+    importer = VehicleImporter(
+        checkpoint_path=args.checkpoint or f"{args.path}.checkpoint.json",
+        error_report_path=args.error_report or f"{args.path}.errors.csv",
+        created_by=args.created_by
+    )
+    summary = importer.run(args.path, args.format)
+    print(f"✅ Imported {summary.inserted} vehicles, {summary.failed} rows failed "
+          f"({summary.rows_per_minute:.0f} rows/min, resumed from row {summary.resumed_from})")
+    if summary.failed:
+        print(f"Error report: {summary.error_report}")
+
+
+def reconcile_fines(args):
+    """Mark fines paid from a settlement file and write the lines that didn't match to a report"""
+    with open(args.path, newline="", encoding="utf-8-sig") as settlement:
+        summary = FineReconciler(verified_by=args.verified_by).run(settlement)
+    report_path = args.report or f"{args.path}.mismatches.csv"
+    with open(report_path, "w", newline="") as report:
+        write_mismatch_report(summary.mismatches, report)
+    print(f"✅ {summary.paid} fines marked paid from {summary.lines_read} settlement lines in {summary.elapsed_seconds}s")
+    if summary.mismatched:
+        print(f"{summary.mismatched} lines did not match, see {report_path}")
+
+
+def replay_dead_letters(args):
+    """Put dead-lettered violations back in the write-behind spool and try to write them now"""
+    spool = ViolationSpool(ViolationService().write_violation_rows, args.spool)
+    requeued = spool.requeue_dead_letters()
+    print(f"Requeued {requeued} dead-lettered violations")
+    flushed = spool.drain()
+    print(f"✅ {flushed} violations written, {spool.pending_count()} still spooled, {spool.dead_letter_count()} dead-lettered")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANPR backend maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    rebuild_parser = subparsers.add_parser("rebuild-counters", help="Recompute violation statistics counters from scratch")
+    rebuild_parser.set_defaults(func=rebuild_counters)
+    
+    sweep_parser = subparsers.add_parser("sweep-expired", help="Run the vehicle expiry sweep once")
+    sweep_parser.set_defaults(func=sweep_expired)
+    
+    import_parser = subparsers.add_parser("import-vehicles", help="Bulk load a DVLA registry extract (CSV or NDJSON)")
+    import_parser.add_argument("path", help="Registry extract to load")
+    import_parser.add_argument("--format", choices=IMPORT_FORMATS, default="csv")
+    import_parser.add_argument("--created-by", type=int, default=None, help="DVLA user id recorded as creator")
+    import_parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: <path>.checkpoint.json)")
+    import_parser.add_argument("--error-report", default=None, help="Rejected-row report (default: <path>.errors.csv)")
+    import_parser.set_defaults(func=import_vehicles)
+    
+    reconcile_parser = subparsers.add_parser("reconcile-fines", help="Apply a payment settlement file to unpaid fines")
+    reconcile_parser.add_argument("path", help="Settlement CSV with fine_id and amount columns")
+    reconcile_parser.add_argument("--report", default=None, help="Mismatch report (default: <path>.mismatches.csv)")
+    reconcile_parser.add_argument("--verified-by", type=int, default=None, help="DVLA user id recorded as verifier")
+    reconcile_parser.set_defaults(func=reconcile_fines)
+    
+    replay_parser = subparsers.add_parser("replay-dead-letters", help="Retry violations the write-behind spool gave up on")
+    replay_parser.add_argument("--spool", default=SPOOL_PATH, help=f"Spool database (default: {SPOOL_PATH})")
+    replay_parser.set_defaults(func=replay_dead_letters)
+    
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
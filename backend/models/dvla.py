@@ -60,6 +60,20 @@ class DVLAVehicle(BaseModel):
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
+class DVLAVehicleSummary(BaseModel):
+    """List/search view of a DVLA vehicle record"""
+    id: Optional[int] = None
+    reg_number: str
+    license_plate: str
+    manufacturer: str
+    model: str
+    vehicle_type: str
+    year_of_manufacture: int
+    color: str
+    owner_name: str
+    status: str = "active"
+    created_at: Optional[datetime] = None
+
 class DVLAVehicleCreate(BaseModel):
     reg_number: str
     manufacturer: str
@@ -117,6 +131,20 @@ class DVLARenewalCreate(BaseModel):
     transaction_id: Optional[str] = None
     notes: Optional[str] = None
 
+class DVLARenewalBatchItem(DVLARenewalCreate):
+    transaction_id: str  # Required here: retried batches are deduplicated on it
+    status: str = "completed"  # Completed renewals extend the matching vehicle's expiry
+
+class DVLARenewalBatch(BaseModel):
+    renewals: List[DVLARenewalBatchItem]
+
+class DVLARenewalBatchItemResult(BaseModel):
+    index: int  # Position of the renewal in the submitted batch
+    success: bool
+    renewal_id: Optional[int] = None
+    duplicate: bool = False  # transaction_id was already processed; renewal_id is the original
+    error: Optional[str] = None
+
 class DVLAFine(BaseModel):
     id: Optional[int] = None
     fine_id: str
@@ -157,3 +185,10 @@ class DVLAAnalytics(BaseModel):
     revenue_this_month: Decimal
     renewal_rate: float
     fine_payment_rate: float
+
+# Column projections for select()
+DVLA_USER_COLUMNS = ",".join(DVLAUser.model_fields)
+DVLA_VEHICLE_SUMMARY_COLUMNS = ",".join(DVLAVehicleSummary.model_fields)
+DVLA_VEHICLE_DETAIL_COLUMNS = ",".join(DVLAVehicle.model_fields)
+DVLA_RENEWAL_COLUMNS = ",".join(DVLARenewal.model_fields)
+DVLA_FINE_COLUMNS = ",".join(DVLAFine.model_fields)
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from models.vehicle import Vehicle
+from models.violation import ViolationSummary
+from models.dvla import DVLAVehicleSummary, DVLARenewal, DVLAFine
+
+class VehicleProfile(BaseModel):
+    """Everything known about one plate across the police and DVLA records"""
+    plate_number: str
+    vehicle: Optional[Vehicle] = None
+    violations: List[ViolationSummary] = []  # Newest first, at most PROFILE_ITEM_LIMIT
+    dvla_vehicle: Optional[DVLAVehicleSummary] = None
+    renewals: List[DVLARenewal] = []  # Newest first, at most PROFILE_ITEM_LIMIT
+    fines: List[DVLAFine] = []  # Newest first, at most PROFILE_ITEM_LIMIT
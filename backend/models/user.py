@@ -46,4 +46,11 @@ class User(UserBase):
     position: Optional[str] = None
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class UserAccessUpdate(BaseModel):
+    status: Optional[UserStatus] = None
+    role: Optional[UserRole] = None
+
+# Column projection for select(); password_hash is only read when authenticating
+USER_COLUMNS = ",".join(User.model_fields)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
@@ -45,4 +45,36 @@ class Vehicle(VehicleBase):
     registered_by: str  # User ID who registered the vehicle
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+# Column projection for select()
+VEHICLE_COLUMNS = ",".join(Vehicle.model_fields)
+
+class PlateCandidate(BaseModel):
+    plate_number: str
+    distance: float  # Edit distance; confusable characters (0/O, 8/B) count as 0.5
+
+class ExpiryKind(str, Enum):
+    REGISTRATION = "registration"
+    INSURANCE = "insurance"
+    ROAD_WORTHINESS = "road_worthiness"
+
+class VehicleExpiry(BaseModel):
+    vehicle_id: str
+    plate_number: str
+    kind: ExpiryKind  # Which of the vehicle's expiry dates lapses first
+    expires_at: datetime
+    days_left: int
+    urgency: str  # "high" (3 days or less), "medium" (7 days or less) or "low"
+
+class ExpiryBucket(BaseModel):
+    days: int
+    count: int  # Active vehicles lapsing within `days` days
+
+class ExpiringVehicles(BaseModel):
+    buckets: List[ExpiryBucket]
+    items: List[VehicleExpiry]  # Soonest first
+
+class VehicleSearchResult(BaseModel):
+    items: List[Vehicle]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to fetch the next page
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, model_validator
+from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
@@ -41,14 +41,83 @@ class ViolationCreate(ViolationBase):
 
 class Violation(ViolationBase):
     id: str
+    evidence_hash: Optional[str] = None  # Key in the evidence store, see GET /evidence/{hash}
     status: ViolationStatus
     reported_by: str  # User ID of the officer
     reported_at: datetime
     reviewed_by: Optional[str] = None  # User ID of the supervisor
     reviewed_at: Optional[datetime] = None
     rejection_reason: Optional[str] = None
+    lease_owner: Optional[str] = None  # Supervisor currently holding the item in the review queue
+    lease_expires_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class ViolationSummary(BaseModel):
+    """List/dashboard view of a violation; leaves out the heavy evidence_image column"""
+    id: str
+    plate_number: str
+    violation_type: ViolationType
+    severity: ViolationSeverity
+    location: str
+    description: str
+    fine_amount: float
+    evidence_hash: Optional[str] = None
+    officer_notes: Optional[str] = None
+    status: ViolationStatus
+    reported_by: str
+    reported_at: datetime
+    reviewed_by: Optional[str] = None
+    reviewed_at: Optional[datetime] = None
+    rejection_reason: Optional[str] = None
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ViolationLeaseRelease(BaseModel):
+    violation_ids: List[str]
+
+class ViolationBulkItemResult(BaseModel):
+    index: int  # Position of the record in the submitted batch
+    success: bool
+    violation_id: Optional[str] = None
+    error: Optional[str] = None
+
+class ViolationBulkResult(BaseModel):
+    created: int
+    failed: int
+    results: List[ViolationBulkItemResult]
+
+class ViolationBulkReview(BaseModel):
+    approve: List[str] = []
+    reject: List[str] = []
+    rejection_reason: Optional[str] = None  # Required when reject is non-empty
+
+    @model_validator(mode="after")
+    def require_rejection_reason(self):
+        if self.reject and not self.rejection_reason:
+            raise ValueError("rejection_reason is required when rejecting violations")
+        return self
+
+class ViolationReviewResult(BaseModel):
+    violation_id: str
+    success: bool
+    status: Optional[ViolationStatus] = None
+    error: Optional[str] = None
+
+class ViolationBulkReviewResult(BaseModel):
+    approved: int
+    rejected: int
+    failed: int
+    results: List[ViolationReviewResult]
+
+# Column projections for select()
+VIOLATION_SUMMARY_COLUMNS = ",".join(ViolationSummary.model_fields)
+VIOLATION_DETAIL_COLUMNS = ",".join(Violation.model_fields)
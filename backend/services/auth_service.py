@@ -5,7 +5,9 @@ from passlib.context import CryptContext
 from typing import Optional
 import uuid
 from database.supabase_client import supabase
-from models.user import User, UserCreate, UserLogin, UserRole, UserStatus
+from services.password_pool import PasswordPoolBusy, password_pool
+from services.authorization import user_access
+from models.user import User, UserCreate, UserLogin, UserRole, UserStatus, USER_COLUMNS
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this")
@@ -35,15 +37,15 @@ class AuthService:
     async def authenticate_user(self, username: str, password: str) -> Optional[User]:
         try:
             # Query user from Supabase
-            response = supabase.table("users").select("*").eq("username", username).execute()
+            response = supabase.table("users").select(f"{USER_COLUMNS},password_hash").eq("username", username).execute()
             
             if not response.data:
                 return None
             
             user_data = response.data[0]
             
-            # Verify password
-            if not self.verify_password(password, user_data["password_hash"]):
+            # Verify password off the event loop
+            if not await password_pool.run(self.verify_password, password, user_data["password_hash"]):
                 return None
             
             # Check if user is active
@@ -71,6 +73,8 @@ class AuthService:
             
             return user
             
+        except PasswordPoolBusy:
+            raise
         except Exception as e:
             print(f"Authentication error: {e}")
             return None
@@ -88,7 +92,7 @@ class AuthService:
                 raise ValueError("Email already exists")
             
             # Hash password
-            hashed_password = self.get_password_hash(user_data.password)
+            hashed_password = await password_pool.run(self.get_password_hash, user_data.password)
             
             # Create user data
             user_dict = {
@@ -143,7 +147,7 @@ class AuthService:
 
     async def get_user_by_id(self, user_id: str) -> Optional[User]:
         try:
-            response = supabase.table("users").select("*").eq("id", user_id).execute()
+            response = supabase.table("users").select(USER_COLUMNS).eq("id", user_id).execute()
             
             if not response.data:
                 return None
@@ -170,4 +174,19 @@ class AuthService:
             
         except Exception as e:
             print(f"Get user error: {e}")
-            return None 
\ No newline at end of file
+            return None 
+
+    async def update_user_access(self, user_id: str, status: Optional[UserStatus] = None, role: Optional[UserRole] = None) -> Optional[User]:
+        """Change a user's status and/or role; cached authorization data is dropped immediately"""
+        changes = {"updated_at": datetime.utcnow().isoformat()}
+        if status is not None:
+            changes["status"] = status.value
+        if role is not None:
+            changes["role"] = role.value
+        
+        response = supabase.table("users").update(changes).eq("id", user_id).select(USER_COLUMNS).execute()
+        user_access.invalidate(user_id)
+        
+        if not response.data:
+            return None
+        return User(**response.data[0])
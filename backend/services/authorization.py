@@ -0,0 +1,52 @@
+import asyncio
+import os
+import uuid
+from typing import Optional
+from pydantic import BaseModel
+from database.supabase_client import supabase
+from models.user import UserRole, UserStatus
+from services.cache import TTLCache
+
+# How long a role / status change made outside this process can take to apply
+USER_ACCESS_CACHE_TTL = float(os.getenv("USER_ACCESS_CACHE_TTL", "60"))
+
+
+class UserAccess(BaseModel):
+    role: UserRole
+    status: UserStatus
+
+
+class UserAccessCache:
+    """
+    In-memory cache of each user's role and status for authorization checks.
+
+    Lookups hit the users table once per user per TTL (concurrent misses
+    share one query), so role enforcement costs no database round trip in
+    the common case. Code that changes a user's role or status must call
+    invalidate() so the change applies immediately.
+    """
+
+    def __init__(self, ttl: float = USER_ACCESS_CACHE_TTL, max_entries: int = 10000):
+        self._cache = TTLCache(ttl=ttl, max_entries=max_entries)
+
+    async def get(self, user_id: str) -> Optional[UserAccess]:
+        """Role and status of a users-table account; None for unknown ids (e.g. DVLA accounts)"""
+        return await self._cache.get_or_load(user_id, lambda: asyncio.to_thread(self._load, user_id))
+
+    def _load(self, user_id: str) -> Optional[UserAccess]:
+        try:
+            uuid.UUID(user_id)
+        except ValueError:
+            return None
+        rows = supabase.table("users").select("role,status").eq("id", user_id).limit(1).execute().data
+        return UserAccess(**rows[0]) if rows else None
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """Forget one user's cached access, or everyone's when called without an id"""
+        if user_id is None:
+            self._cache.invalidate()
+        else:
+            self._cache.invalidate(user_id)
+
+
+user_access = UserAccessCache()
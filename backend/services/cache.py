@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent async loads of the same key.
+
+    While a load for a key is in flight, further callers await the same
+    result instead of starting their own. Failures are shared by everyone
+    waiting on that flight and are not remembered afterwards. If the
+    caller running the load is cancelled, the others start a new flight
+    rather than inheriting its cancellation.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            flight = self._flights.get(key)
+            if flight is None:
+                break
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        try:
+            result = await loader()
+            flight.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            # Mark the exception retrieved when nobody else was waiting
+            flight.exception()
+            raise
+        finally:
+            del self._flights[key]
+
+
+class TTLCache:
+    """
+    Bounded in-process cache whose entries expire after a time-to-live.
+
+    Oldest entries are evicted first once max_entries is reached.
+    get_or_load adds single-flight loading, so a burst of misses on one
+    key runs the loader once. A load that an invalidate() overlaps is run
+    again rather than cached, so it can't bring back the dropped value.
+    """
+
+    # Loads restarted by overlapping invalidations before the result is returned uncached
+    MAX_LOAD_ATTEMPTS = 3
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._single_flight = SingleFlight()
+        # Bumped by invalidate(): once for everything, and per key while that key is loading
+        self._generation = 0
+        self._loading: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key: Hashable, value: Any, ttl: Optional[float]):
+        """Add an entry; the caller holds the lock"""
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable = _MISSING):
+        """Drop one key, or every entry when called without a key"""
+        with self._lock:
+            if key is _MISSING:
+                self._entries.clear()
+                self._generation += 1
+            else:
+                self._entries.pop(key, None)
+                if key in self._loading:
+                    self._loading[key] += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None) -> Any:
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        async def load():
+            # Another flight may have filled the entry while we were queued
+            cached = self.get(key, _MISSING)
+            if cached is not _MISSING:
+                return cached
+            # Single flight means at most one load per key, so the key's counter is ours
+            with self._lock:
+                self._loading[key] = 0
+            try:
+                for _ in range(self.MAX_LOAD_ATTEMPTS):
+                    with self._lock:
+                        started = (self._generation, self._loading[key])
+                    loaded = await loader()
+                    with self._lock:
+                        if (self._generation, self._loading[key]) == started:
+                            self._store(key, loaded, ttl)
+                            return loaded
+                # Still being invalidated; answer with the latest load but don't cache it
+                return loaded
+            finally:
+                with self._lock:
+                    del self._loading[key]
+
+        return await self._single_flight.do(key, load)
@@ -0,0 +1,319 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import IO, Dict, Iterator, List, Optional, Set, Tuple, Union
+import pandas as pd
+from postgrest.types import ReturnMethod
+from pydantic import BaseModel
+from database.supabase_client import supabase
+from models.dvla import DVLAVehicleCreate
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_DIR = os.getenv("DVLA_IMPORT_DIR", "imports")
+
+# Rows validated together, and rows per multi-row insert
+IMPORT_READ_CHUNK_SIZE = 10000
+IMPORT_INSERT_CHUNK_SIZE = 1000
+IMPORT_WRITE_WORKERS = int(os.getenv("DVLA_IMPORT_WRITE_WORKERS", "4"))
+
+# Columns that must be unique across the registry
+UNIQUE_COLUMNS = ["reg_number", "vin", "chassis_number", "license_plate"]
+
+REQUIRED_COLUMNS = [
+    name for name, field in DVLAVehicleCreate.model_fields.items() if field.is_required()
+]
+OPTIONAL_INT_COLUMNS = [
+    name for name, field in DVLAVehicleCreate.model_fields.items()
+    if not field.is_required() and field.annotation == Optional[int]
+]
+OPTIONAL_STR_COLUMNS = [
+    name for name, field in DVLAVehicleCreate.model_fields.items()
+    if not field.is_required() and field.annotation == Optional[str]
+]
+
+# VARCHAR limits from the dvla_vehicles schema
+MAX_LENGTHS = {
+    "reg_number": 20, "manufacturer": 50, "model": 50, "vehicle_type": 30, "chassis_number": 50,
+    "vin": 17, "license_plate": 20, "color": 30, "use_type": 20, "tyre_size_front": 20,
+    "tyre_size_middle": 20, "tyre_size_rear": 20, "engine_make": 50, "engine_number": 50,
+    "owner_name": 100, "owner_phone": 20, "owner_email": 100,
+}
+
+_EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+
+
+class VehicleImportSummary(BaseModel):
+    rows_read: int
+    inserted: int
+    failed: int
+    resumed_from: int  # Rows skipped because an earlier run already processed them
+    elapsed_seconds: float
+    rows_per_minute: float
+    error_report: Optional[str] = None
+
+
+class VehicleImportStatus(BaseModel):
+    """Progress of an import job, as recorded in its checkpoint"""
+    job_id: str
+    status: str  # running, completed, failed, interrupted
+    rows_done: int = 0
+    inserted: int = 0
+    failed: int = 0
+    error: Optional[str] = None
+    summary: Optional[VehicleImportSummary] = None
+
+
+def _unique_key(value: str) -> str:
+    """Registry identifiers compare case- and whitespace-insensitively"""
+    return re.sub(r'\s+', '', value.upper())
+
+
+def _unique_keys(values: pd.Series) -> pd.Series:
+    return values.str.upper().str.replace(r'\s+', '', regex=True)
+
+
+def store_upload(source: IO[bytes], import_format: str, import_dir: str = IMPORT_DIR) -> str:
+    """
+    Save an uploaded extract under its content hash and return the path.
+
+    Uploading the same file again lands on the same path, so the import
+    picks up its checkpoint and resumes rather than starting over. The hash
+    doubles as the import's job id.
+    """
+    os.makedirs(import_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    tmp_path = os.path.join(import_dir, f".upload-{os.getpid()}-{time.monotonic_ns()}")
+    with open(tmp_path, "wb") as f:
+        for block in iter(lambda: source.read(1024 * 1024), b""):
+            digest.update(block)
+            f.write(block)
+    path = os.path.join(import_dir, f"{digest.hexdigest()}.{import_format}")
+    os.replace(tmp_path, path)
+    return path
+
+
+def import_job_id(path: str) -> str:
+    return os.path.basename(path).split(".", 1)[0]
+
+
+def read_import_status(job_id: str, import_dir: str = IMPORT_DIR) -> Optional[VehicleImportStatus]:
+    """Status of an uploaded import from its checkpoint; None if the job id is unknown"""
+    if not re.fullmatch(r'[0-9a-f]{64}', job_id):
+        return None
+    for import_format in IMPORT_FORMATS:
+        checkpoint_path = os.path.join(import_dir, f"{job_id}.{import_format}.checkpoint.json")
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            return VehicleImportStatus(job_id=job_id, **{
+                key: value for key, value in checkpoint.items() if key in VehicleImportStatus.model_fields
+            })
+    return None
+
+
+class VehicleImporter:
+    """
+    Streams a CSV / NDJSON registry extract into dvla_vehicles.
+
+    Rows are read and validated a chunk at a time with vectorized pandas
+    checks, uniqueness is enforced against an in-memory index of the existing
+    registry (plus everything imported so far), and valid rows are written
+    with concurrent multi-row inserts. After each chunk a checkpoint records
+    how many source rows are done, so an interrupted import can resume.
+    The checkpoint also carries the job status (running, then completed or
+    failed with the error), which is what the import status endpoint serves.
+    Rejected rows go to a CSV error report.
+    """
+
+    def __init__(
+        self,
+        checkpoint_path: str,
+        error_report_path: str,
+        created_by: Optional[int] = None,
+        read_chunk_size: int = IMPORT_READ_CHUNK_SIZE,
+        insert_chunk_size: int = IMPORT_INSERT_CHUNK_SIZE
+    ):
+        self.checkpoint_path = checkpoint_path
+        self.error_report_path = error_report_path
+        self.created_by = created_by
+        self.read_chunk_size = read_chunk_size
+        self.insert_chunk_size = insert_chunk_size
+        self.seen: Dict[str, Set[str]] = {column: set() for column in UNIQUE_COLUMNS}
+
+    def load_existing_keys(self, page_size: int = 1000):
+        """Fill the uniqueness index from the registry, paging by id"""
+        last_id = 0
+        while True:
+            rows = supabase.table("dvla_vehicles").select(f"id,{','.join(UNIQUE_COLUMNS)}").gt("id", last_id).order("id").limit(page_size).execute().data
+            for row in rows:
+                for column in UNIQUE_COLUMNS:
+                    if row.get(column):
+                        self.seen[column].add(_unique_key(row[column]))
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]["id"]
+
+    def _read_chunks(self, source: Union[str, IO], import_format: str) -> Iterator[pd.DataFrame]:
+        if import_format == "csv":
+            return pd.read_csv(source, chunksize=self.read_chunk_size, dtype=str, keep_default_na=False)
+        return pd.read_json(source, lines=True, chunksize=self.read_chunk_size, dtype=False)
+
+    def _read_checkpoint(self) -> dict:
+        if not os.path.exists(self.checkpoint_path):
+            return {"status": "running", "rows_done": 0, "inserted": 0, "failed": 0}
+        with open(self.checkpoint_path) as f:
+            return json.load(f)
+
+    def _write_checkpoint(self, checkpoint: dict):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def validate(self, chunk: pd.DataFrame, first_row: int) -> Tuple[List[Tuple[int, dict]], List[Tuple[int, str, str]]]:
+        """
+        Split a chunk into (row, record) pairs to insert and (row, reg_number, error) rejections.
+
+        Row numbers are 1-based positions in the source, excluding any header;
+        the chunk must have a fresh 0-based index.
+        """
+        missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+        known_columns = REQUIRED_COLUMNS + OPTIONAL_INT_COLUMNS + OPTIONAL_STR_COLUMNS
+        frame = chunk.reindex(columns=known_columns).astype(object).where(lambda df: df.notna(), "")
+        frame = frame.apply(lambda column: column.astype(str).str.strip())
+        errors = pd.Series([[] for _ in range(len(frame))], index=frame.index, dtype=object)
+
+        def flag(mask: pd.Series, message: str):
+            for index in mask[mask].index:
+                errors[index].append(message)
+
+        for column in REQUIRED_COLUMNS:
+            flag(frame[column] == "", f"{column} is required")
+        for column, max_length in MAX_LENGTHS.items():
+            flag(frame[column].str.len() > max_length, f"{column} longer than {max_length} characters")
+
+        year = pd.to_numeric(frame["year_of_manufacture"], errors="coerce")
+        flag(year.isna() | (year % 1 != 0) | (year < 1900) | (year > datetime.now().year + 1), "year_of_manufacture must be a year between 1900 and next year")
+        entry_date = pd.to_datetime(frame["date_of_entry"], errors="coerce", format="ISO8601")
+        flag(entry_date.isna(), "date_of_entry must be an ISO date")
+        flag(~frame["owner_email"].str.match(_EMAIL_PATTERN), "owner_email is not a valid email address")
+
+        optional_ints = {}
+        for column in OPTIONAL_INT_COLUMNS:
+            optional_ints[column] = pd.to_numeric(frame[column].replace("", None), errors="coerce")
+            flag((frame[column] != "") & (optional_ints[column].isna() | (optional_ints[column] % 1 != 0)), f"{column} must be a whole number")
+
+        # Uniqueness: within the chunk first, then against the registry and earlier chunks
+        keys = {column: _unique_keys(frame[column]) for column in UNIQUE_COLUMNS}
+        for column, key in keys.items():
+            flag((key != "") & key.duplicated(keep="first"), f"duplicate {column} in import")
+            flag(key.isin(self.seen[column]), f"{column} already registered")
+
+        valid = errors.map(len) == 0
+        for column, key in keys.items():
+            self.seen[column].update(key[valid])
+
+        output = frame.loc[valid, REQUIRED_COLUMNS + OPTIONAL_STR_COLUMNS].copy()
+        output["year_of_manufacture"] = year[valid].astype(int)
+        output["date_of_entry"] = entry_date[valid].dt.strftime("%Y-%m-%d")
+        for column in OPTIONAL_INT_COLUMNS:
+            output[column] = optional_ints[column][valid].astype("Int64")
+        for column in OPTIONAL_STR_COLUMNS:
+            output[column] = output[column].replace("", None)
+        if self.created_by is not None:
+            output["created_by"] = self.created_by
+        # Plain Python values so the rows serialize as JSON (no numpy ints or pd.NA)
+        records = json.loads(output.to_json(orient="records"))
+        accepted = list(zip((first_row + output.index + 1).tolist(), records))
+
+        rejected = [
+            (first_row + index + 1, frame.at[index, "reg_number"], "; ".join(row_errors))
+            for index, row_errors in errors[~valid].items()
+        ]
+        return accepted, rejected
+
+    def _insert(self, batch: List[Tuple[int, dict]]) -> List[Tuple[int, str, str]]:
+        """Insert one batch; on failure retry row by row and return (row, reg_number, error) for the failures"""
+        try:
+            supabase.table("dvla_vehicles").insert([record for _, record in batch], returning=ReturnMethod.minimal).execute()
+            return []
+        except Exception as e:
+            print(f"Vehicle import batch error, retrying rows individually: {e}")
+        failures = []
+        for row_number, record in batch:
+            try:
+                supabase.table("dvla_vehicles").insert(record, returning=ReturnMethod.minimal).execute()
+            except Exception as e:
+                failures.append((row_number, record["reg_number"], str(e)))
+        return failures
+
+    def run(self, source: Union[str, IO], import_format: str = "csv") -> VehicleImportSummary:
+        if import_format not in IMPORT_FORMATS:
+            raise ValueError(f"Unsupported import format: {import_format}")
+
+        checkpoint = self._read_checkpoint()
+        checkpoint.update(status="running", error=None, summary=None)
+        self._write_checkpoint(checkpoint)
+        try:
+            summary = self._run(source, import_format, checkpoint)
+        except Exception as e:
+            checkpoint.update(status="failed", error=str(e))
+            self._write_checkpoint(checkpoint)
+            raise
+        checkpoint.update(status="completed", summary=summary.model_dump())
+        self._write_checkpoint(checkpoint)
+        return summary
+
+    def _run(self, source: Union[str, IO], import_format: str, checkpoint: dict) -> VehicleImportSummary:
+        started = time.monotonic()
+        resumed_from = checkpoint["rows_done"]
+        self.load_existing_keys()
+
+        report_exists = os.path.exists(self.error_report_path) and resumed_from > 0
+        with open(self.error_report_path, "a" if report_exists else "w", newline="") as report_file, \
+                ThreadPoolExecutor(max_workers=IMPORT_WRITE_WORKERS) as executor:
+            report = csv.writer(report_file)
+            if not report_exists:
+                report.writerow(["row", "reg_number", "error"])
+
+            rows_read = 0
+            for chunk in self._read_chunks(source, import_format):
+                chunk_start = rows_read
+                rows_read += len(chunk)
+                if rows_read <= resumed_from:
+                    continue
+                if chunk_start < resumed_from:
+                    chunk = chunk.iloc[resumed_from - chunk_start:]
+                    chunk_start = resumed_from
+
+                accepted, rejected = self.validate(chunk.reset_index(drop=True), chunk_start)
+                batches = [accepted[i:i + self.insert_chunk_size] for i in range(0, len(accepted), self.insert_chunk_size)]
+                failures = [failure for batch_failures in executor.map(self._insert, batches) for failure in batch_failures]
+                report.writerows(sorted(rejected + failures))
+
+                checkpoint["rows_done"] = rows_read
+                checkpoint["inserted"] += len(accepted) - len(failures)
+                checkpoint["failed"] += len(rejected) + len(failures)
+                report_file.flush()
+                self._write_checkpoint(checkpoint)
+                print(f"Imported {checkpoint['inserted']} vehicles ({rows_read} rows read, {checkpoint['failed']} failed)")
+
+        elapsed = time.monotonic() - started
+        processed = max(rows_read - resumed_from, 0)
+        return VehicleImportSummary(
+            rows_read=rows_read,
+            inserted=checkpoint["inserted"],
+            failed=checkpoint["failed"],
+            resumed_from=resumed_from,
+            elapsed_seconds=round(elapsed, 2),
+            rows_per_minute=round(processed / elapsed * 60, 1) if elapsed else 0.0,
+            error_report=self.error_report_path
+        )
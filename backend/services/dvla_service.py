@@ -1,21 +1,45 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 from datetime import datetime, date
 from decimal import Decimal
+import asyncio
+import os
 import bcrypt
 from database.supabase_client import supabase
+from database.pagination import (
+    DEFAULT_PAGE_SIZE, clamp_page_size, apply_keyset, split_page, decode_cursor, decode_rank_cursor, encode_cursor,
+    split_ranked_page
+)
+from services.cache import SingleFlight, TTLCache
+from services.expiry_sweeper import expiry_sweeper
+from services.metrics_broadcaster import metrics_broadcaster
+from services.password_pool import password_pool
 from models.dvla import (
-    DVLAUser, DVLAUserCreate, DVLAVehicle, DVLAVehicleCreate, 
-    DVLARenewal, DVLARenewalCreate, DVLAFine, DVLAFineCreate, DVLAAnalytics
+    DVLAUser, DVLAUserCreate, DVLAVehicle, DVLAVehicleSummary, DVLAVehicleCreate, 
+    DVLARenewal, DVLARenewalCreate, DVLARenewalBatchItem, DVLARenewalBatchItemResult, DVLAFine, DVLAFineCreate, DVLAAnalytics,
+    DVLA_USER_COLUMNS, DVLA_VEHICLE_SUMMARY_COLUMNS, DVLA_VEHICLE_DETAIL_COLUMNS,
+    DVLA_RENEWAL_COLUMNS, DVLA_FINE_COLUMNS
 )
 
+# Dashboard refreshes within this window share one analytics computation
+ANALYTICS_CACHE_TTL_SECONDS = float(os.getenv("DVLA_ANALYTICS_CACHE_TTL", "30"))
+# Renewals committed per process_renewals() transaction
+RENEWAL_BATCH_CHUNK_SIZE = 200
+
 class DVLAService:
     def __init__(self):
         self.supabase = supabase
+        self.analytics_cache = TTLCache(ttl=ANALYTICS_CACHE_TTL_SECONDS, max_entries=1)
+        self.single_flight = SingleFlight()
+
+    def analytics_changed(self):
+        """Drop cached analytics and push fresh figures to dashboard subscribers"""
+        self.analytics_cache.invalidate()
+        metrics_broadcaster.notify("dvla")
 
     # User Management
     async def create_dvla_user(self, user_data: DVLAUserCreate) -> DVLAUser:
         """Create new DVLA user"""
-        hashed_password = bcrypt.hashpw(user_data.password.encode('utf-8'), bcrypt.gensalt())
+        hashed_password = await password_pool.run(bcrypt.hashpw, user_data.password.encode('utf-8'), bcrypt.gensalt())
         
         result = self.supabase.table("dvla_users").insert({
             "username": user_data.username,
@@ -32,18 +56,21 @@ class DVLAService:
 
     async def authenticate_dvla_user(self, username: str, password: str) -> Optional[DVLAUser]:
         """Authenticate DVLA user"""
-        result = self.supabase.table("dvla_users").select("*").eq("username", username).execute()
+        result = self.supabase.table("dvla_users").select(f"{DVLA_USER_COLUMNS},password_hash").eq("username", username).execute()
         
         if result.data:
             user_data = result.data[0]
-            if bcrypt.checkpw(password.encode('utf-8'), user_data['password_hash'].encode('utf-8')):
+            if await password_pool.run(bcrypt.checkpw, password.encode('utf-8'), user_data['password_hash'].encode('utf-8')):
                 return DVLAUser(**user_data)
         return None
 
-    async def get_dvla_users(self) -> List[DVLAUser]:
-        """Get all DVLA users"""
-        result = self.supabase.table("dvla_users").select("*").execute()
-        return [DVLAUser(**user) for user in result.data]
+    async def get_dvla_users(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Tuple[List[DVLAUser], Optional[str]]:
+        """Get one page of DVLA users (newest first) and the next-page cursor"""
+        limit = clamp_page_size(limit)
+        query = apply_keyset(self.supabase.table("dvla_users").select(DVLA_USER_COLUMNS), cursor, limit)
+        
+        rows, next_cursor = split_page(query.execute().data, limit)
+        return [DVLAUser(**user) for user in rows], next_cursor
 
     # Vehicle Management
     async def create_vehicle(self, vehicle_data: DVLAVehicleCreate, created_by: int) -> DVLAVehicle:
@@ -54,30 +81,55 @@ class DVLAService:
         result = self.supabase.table("dvla_vehicles").insert(vehicle_dict).execute()
         
         if result.data:
+            self.analytics_changed()
             return DVLAVehicle(**result.data[0])
         raise Exception("Failed to create vehicle")
 
-    async def get_vehicles(self, search: Optional[str] = None, limit: int = 100) -> List[DVLAVehicle]:
-        """Get vehicles with optional search"""
-        query = self.supabase.table("dvla_vehicles").select("*")
-        
+    async def get_vehicles(
+        self, search: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None
+    ) -> Tuple[List[DVLAVehicleSummary], Optional[str]]:
+        """
+        Get one page of vehicles with optional search, plus the next-page cursor.
+
+        Searches are ranked and resume after the last (rank, id); plain
+        listings are ordered by id and resume after the last id.
+        """
+        limit = clamp_page_size(limit)
         if search:
-            query = query.or_(f"reg_number.ilike.%{search}%,license_plate.ilike.%{search}%,owner_name.ilike.%{search}%")
+            # Ranked trigram search in a single round trip; one extra row tells us whether more follow
+            params = {"p_query": search, "p_limit": limit + 1}
+            if cursor:
+                after_rank, after_id = decode_rank_cursor(cursor)
+                if not isinstance(after_id, int):
+                    raise ValueError("Invalid cursor")
+                params.update({"p_after_rank": after_rank, "p_after_id": after_id})
+            result = await asyncio.to_thread(lambda: self.supabase.rpc("search_dvla_vehicles", params).execute())
+            rows, next_cursor = split_ranked_page(result.data, limit)
+            return [DVLAVehicleSummary(**row["vehicle"]) for row in rows], next_cursor
         
-        result = query.limit(limit).execute()
-        return [DVLAVehicle(**vehicle) for vehicle in result.data]
+        query = self.supabase.table("dvla_vehicles").select(DVLA_VEHICLE_SUMMARY_COLUMNS).order("id").limit(limit + 1)
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 1 or not isinstance(values[0], int):
+                raise ValueError("Invalid cursor")
+            query = query.gt("id", values[0])
+        result = await asyncio.to_thread(query.execute)
+        rows = result.data
+        next_cursor = encode_cursor(rows[limit - 1]["id"]) if len(rows) > limit else None
+        return [DVLAVehicleSummary(**vehicle) for vehicle in rows[:limit]], next_cursor
 
     async def get_vehicle_by_id(self, vehicle_id: int) -> Optional[DVLAVehicle]:
         """Get vehicle by ID"""
-        result = self.supabase.table("dvla_vehicles").select("*").eq("id", vehicle_id).execute()
+        result = self.supabase.table("dvla_vehicles").select(DVLA_VEHICLE_DETAIL_COLUMNS).eq("id", vehicle_id).execute()
         
         if result.data:
             return DVLAVehicle(**result.data[0])
         return None
 
     async def get_vehicle_by_reg(self, reg_number: str) -> Optional[DVLAVehicle]:
-        """Get vehicle by registration number"""
-        result = self.supabase.table("dvla_vehicles").select("*").eq("reg_number", reg_number).execute()
+        """Get vehicle by registration number; concurrent lookups of one number share a query"""
+        query = self.supabase.table("dvla_vehicles").select(DVLA_VEHICLE_DETAIL_COLUMNS).eq("reg_number", reg_number)
+        result = await self.single_flight.do(("vehicle_by_reg", reg_number), lambda: asyncio.to_thread(query.execute))
         
         if result.data:
             return DVLAVehicle(**result.data[0])
@@ -102,20 +154,71 @@ class DVLAService:
         result = self.supabase.table("dvla_renewals").insert(renewal_dict).execute()
         
         if result.data:
+            self.analytics_changed()
+            expiry_sweeper.wake()
             return DVLARenewal(**result.data[0])
         raise Exception("Failed to create renewal")
 
-    async def get_renewals(self, vehicle_id: Optional[int] = None, status: Optional[str] = None) -> List[DVLARenewal]:
-        """Get renewals with optional filtering"""
-        query = self.supabase.table("dvla_renewals").select("*")
+    def process_renewals(self, renewals: List[DVLARenewalBatchItem], processed_by: int) -> Iterator[DVLARenewalBatchItemResult]:
+        """
+        Create many renewals and extend the linked vehicles' expiry, one transaction per chunk.
+        
+        Yields a result per renewal as each chunk commits. Re-sending a
+        renewal with an already processed transaction_id succeeds as a
+        duplicate without creating anything, so failed batches can be retried
+        whole. A chunk that errors fails only its own renewals.
+        """
+        created = 0
+        try:
+            for start in range(0, len(renewals), RENEWAL_BATCH_CHUNK_SIZE):
+                chunk = renewals[start:start + RENEWAL_BATCH_CHUNK_SIZE]
+                try:
+                    rows = self.supabase.rpc("process_renewals", {
+                        "p_renewals": [renewal.model_dump(mode="json") for renewal in chunk],
+                        "p_processed_by": processed_by
+                    }).execute().data
+                except Exception as e:
+                    print(f"Renewal batch error: {e}")
+                    for offset in range(len(chunk)):
+                        yield DVLARenewalBatchItemResult(index=start + offset, success=False, error=str(e))
+                    continue
+                
+                for row in rows:
+                    index = start + row["item_index"]
+                    if row["outcome"] == "vehicle_not_found":
+                        yield DVLARenewalBatchItemResult(index=index, success=False, error="Vehicle not found")
+                        continue
+                    created += row["outcome"] == "created"
+                    yield DVLARenewalBatchItemResult(
+                        index=index,
+                        success=True,
+                        renewal_id=row["renewal_id"],
+                        duplicate=row["outcome"] == "duplicate"
+                    )
+        finally:
+            if created:
+                self.analytics_changed()
+                # Renewals moved vehicle expiry dates; let the sweeper re-plan
+                expiry_sweeper.wake()
+
+    async def get_renewals(
+        self,
+        vehicle_id: Optional[int] = None,
+        status: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[DVLARenewal], Optional[str]]:
+        """Get one page of renewals (newest first) with optional filtering, plus the next-page cursor"""
+        limit = clamp_page_size(limit)
+        query = self.supabase.table("dvla_renewals").select(DVLA_RENEWAL_COLUMNS)
         
         if vehicle_id:
             query = query.eq("vehicle_id", vehicle_id)
         if status:
             query = query.eq("status", status)
         
-        result = query.execute()
-        return [DVLARenewal(**renewal) for renewal in result.data]
+        rows, next_cursor = split_page(apply_keyset(query, cursor, limit).execute().data, limit)
+        return [DVLARenewal(**renewal) for renewal in rows], next_cursor
 
     async def update_renewal_status(self, renewal_id: int, status: str) -> DVLARenewal:
         """Update renewal status"""
@@ -125,6 +228,8 @@ class DVLAService:
         }).eq("id", renewal_id).execute()
         
         if result.data:
+            self.analytics_changed()
+            expiry_sweeper.wake()
             return DVLARenewal(**result.data[0])
         raise Exception("Failed to update renewal")
 
@@ -137,20 +242,28 @@ class DVLAService:
         result = self.supabase.table("dvla_fines").insert(fine_dict).execute()
         
         if result.data:
+            self.analytics_changed()
             return DVLAFine(**result.data[0])
         raise Exception("Failed to create fine")
 
-    async def get_fines(self, vehicle_id: Optional[int] = None, payment_status: Optional[str] = None) -> List[DVLAFine]:
-        """Get fines with optional filtering"""
-        query = self.supabase.table("dvla_fines").select("*")
+    async def get_fines(
+        self,
+        vehicle_id: Optional[int] = None,
+        payment_status: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[DVLAFine], Optional[str]]:
+        """Get one page of fines (newest first) with optional filtering, plus the next-page cursor"""
+        limit = clamp_page_size(limit)
+        query = self.supabase.table("dvla_fines").select(DVLA_FINE_COLUMNS)
         
         if vehicle_id:
             query = query.eq("vehicle_id", vehicle_id)
         if payment_status:
             query = query.eq("payment_status", payment_status)
         
-        result = query.execute()
-        return [DVLAFine(**fine) for fine in result.data]
+        rows, next_cursor = split_page(apply_keyset(query, cursor, limit).execute().data, limit)
+        return [DVLAFine(**fine) for fine in rows], next_cursor
 
     async def update_fine_payment(self, fine_id: str, payment_data: dict) -> DVLAFine:
         """Update fine payment status"""
@@ -159,6 +272,7 @@ class DVLAService:
         result = self.supabase.table("dvla_fines").update(payment_data).eq("fine_id", fine_id).execute()
         
         if result.data:
+            self.analytics_changed()
             return DVLAFine(**result.data[0])
         raise Exception("Failed to update fine payment")
 
@@ -171,44 +285,35 @@ class DVLAService:
         }).eq("fine_id", fine_id).execute()
         
         if result.data:
+            self.analytics_changed()
             return DVLAFine(**result.data[0])
         raise Exception("Failed to clear fine")
 
     # Analytics
     async def get_analytics(self) -> DVLAAnalytics:
-        """Get DVLA system analytics"""
-        # Get totals
-        vehicles_result = self.supabase.table("dvla_vehicles").select("id", count="exact").execute()
-        renewals_result = self.supabase.table("dvla_renewals").select("id", count="exact").execute()
-        fines_result = self.supabase.table("dvla_fines").select("id", count="exact").execute()
-        
-        # Get pending renewals
-        pending_renewals = self.supabase.table("dvla_renewals").select("id", count="exact").eq("status", "pending").execute()
-        
-        # Get unpaid fines
-        unpaid_fines = self.supabase.table("dvla_fines").select("id", count="exact").eq("payment_status", "unpaid").execute()
-        
-        # Calculate revenue this month
+        """Get DVLA system analytics (cached briefly; concurrent misses share one query)"""
+        return await self.analytics_cache.get_or_load("analytics", self._compute_analytics)
+
+    async def _compute_analytics(self) -> DVLAAnalytics:
         current_month = datetime.now().strftime("%Y-%m")
-        revenue_result = self.supabase.table("dvla_renewals").select("amount_paid").gte("created_at", f"{current_month}-01").execute()
-        revenue_this_month = sum(Decimal(str(r['amount_paid'] or 0)) for r in revenue_result.data)
+        result = await asyncio.to_thread(
+            lambda: self.supabase.rpc("dvla_analytics", {"p_month_start": f"{current_month}-01"}).execute()
+        )
+        totals = result.data[0]
         
         # Calculate rates
-        total_renewals = renewals_result.count or 1
-        total_fines = fines_result.count or 1
-        completed_renewals = self.supabase.table("dvla_renewals").select("id", count="exact").eq("status", "completed").execute()
-        paid_fines = self.supabase.table("dvla_fines").select("id", count="exact").eq("payment_status", "paid").execute()
-        
-        renewal_rate = (completed_renewals.count or 0) / total_renewals * 100
-        fine_payment_rate = (paid_fines.count or 0) / total_fines * 100
+        total_renewals = totals["total_renewals"] or 1
+        total_fines = totals["total_fines"] or 1
+        renewal_rate = totals["completed_renewals"] / total_renewals * 100
+        fine_payment_rate = totals["paid_fines"] / total_fines * 100
         
         return DVLAAnalytics(
-            total_vehicles=vehicles_result.count or 0,
-            total_renewals=renewals_result.count or 0,
-            total_fines=fines_result.count or 0,
-            pending_renewals=pending_renewals.count or 0,
-            unpaid_fines=unpaid_fines.count or 0,
-            revenue_this_month=revenue_this_month,
+            total_vehicles=totals["total_vehicles"],
+            total_renewals=totals["total_renewals"],
+            total_fines=totals["total_fines"],
+            pending_renewals=totals["pending_renewals"],
+            unpaid_fines=totals["unpaid_fines"],
+            revenue_this_month=Decimal(str(totals["revenue_this_month"] or 0)),
             renewal_rate=renewal_rate,
             fine_payment_rate=fine_payment_rate
         )
@@ -0,0 +1,293 @@
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+import httpx
+from PIL import Image, ImageOps
+
+EVIDENCE_BACKEND = os.getenv("EVIDENCE_BACKEND", "local")
+EVIDENCE_DIR = os.getenv("EVIDENCE_DIR", "evidence")
+EVIDENCE_BUCKET = os.getenv("EVIDENCE_BUCKET", "evidence")
+MAX_EVIDENCE_BYTES = int(os.getenv("MAX_FILE_SIZE", str(10 * 1024 * 1024)))
+
+# Fixed-size derivatives for the review UI: name -> bounding box
+DERIVATIVE_SIZES = {
+    "thumbnail": (320, 320),
+    "detail": (1280, 1280),
+}
+DERIVATIVE_FORMATS = {
+    "jpeg": ("jpg", "JPEG", "image/jpeg"),
+    "webp": ("webp", "WEBP", "image/webp"),
+}
+DERIVATIVE_QUALITY = 80
+# Lifetime of the signed URLs used for ranged reads from Supabase Storage
+SIGNED_URL_SECONDS = 60
+
+# Derivatives are rendered off the request path
+_derivative_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("EVIDENCE_DERIVATIVE_WORKERS", "2")),
+    thread_name_prefix="evidence-derivatives"
+)
+
+_HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+_DATA_URL_PATTERN = re.compile(r'^data:[^;,]*;base64,', re.IGNORECASE)
+
+# Everything Pillow raises for bytes that aren't a (safe) image
+_IMAGE_ERRORS = (OSError, SyntaxError, ValueError, Image.DecompressionBombError)
+
+
+def is_evidence_hash(value: str) -> bool:
+    return bool(_HASH_PATTERN.match(value))
+
+
+def open_image(data: bytes) -> Image.Image:
+    """Decode image bytes; raises ValueError if they aren't an image Pillow can read"""
+    try:
+        return Image.open(io.BytesIO(data))
+    except _IMAGE_ERRORS:
+        raise ValueError("Evidence is not a readable image")
+
+
+def verify_image(data: bytes):
+    """Check that bytes are a complete image without decoding the pixels"""
+    try:
+        open_image(data).verify()
+    except _IMAGE_ERRORS:
+        raise ValueError("Evidence is not a readable image")
+
+
+def sniff_content_type(data: bytes) -> str:
+    """Guess an image content type from its magic bytes"""
+    if data.startswith(b'\xff\xd8\xff'):
+        return "image/jpeg"
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return "image/png"
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return "image/webp"
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return "image/gif"
+    return "application/octet-stream"
+
+
+class EvidenceBackend(ABC):
+    """Blob storage used by EvidenceStore; keys are opaque relative paths"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def put(self, key: str, data: bytes):
+        ...
+
+    @abstractmethod
+    def size(self, key: str) -> Optional[int]:
+        ...
+
+    @abstractmethod
+    def read(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """Read bytes [start, end] inclusive; end=None reads to the end"""
+
+
+class LocalEvidenceBackend(EvidenceBackend):
+    """Stores blobs on the local filesystem, fanned out by hash prefix"""
+
+    def __init__(self, root: str = EVIDENCE_DIR):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so readers never see a partial blob
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return os.path.getsize(self._path(key))
+        except OSError:
+            return None
+
+    def read(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            return f.read() if end is None else f.read(end - start + 1)
+
+
+class SupabaseStorageBackend(EvidenceBackend):
+    """Stores blobs in a Supabase Storage bucket"""
+
+    def __init__(self, bucket: str = EVIDENCE_BUCKET):
+        from database.supabase_client import supabase
+        self.bucket = supabase.storage.from_(bucket)
+
+    def exists(self, key: str) -> bool:
+        return self.size(key) is not None
+
+    def put(self, key: str, data: bytes):
+        self.bucket.upload(key, data, {"content-type": sniff_content_type(data), "upsert": "true"})
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            for entry in self.bucket.list("", {"search": key}):
+                if entry.get("name") == key:
+                    return (entry.get("metadata") or {}).get("size")
+        except Exception as e:
+            print(f"Evidence storage lookup error for {key}: {e}")
+        return None
+
+    def read(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        if start == 0 and end is None:
+            return self.bucket.download(key)
+        # Fetch only the requested bytes through a short-lived signed URL
+        signed_url = self.bucket.create_signed_url(key, SIGNED_URL_SECONDS)["signedURL"]
+        byte_range = f"bytes={start}-" if end is None else f"bytes={start}-{end}"
+        response = httpx.get(signed_url, headers={"Range": byte_range})
+        response.raise_for_status()
+        if response.status_code == 206:
+            return response.content
+        # Storage ignored the range; slice the full body instead
+        return response.content[start:] if end is None else response.content[start:end + 1]
+
+
+class EvidenceStore:
+    """
+    Content-addressed store for violation evidence images.
+
+    Images are keyed by the SHA-256 of their bytes, so uploading the same
+    image twice stores it once. Resized JPEG/WebP derivatives (see
+    DERIVATIVE_SIZES) are rendered in the background after ingest and on
+    demand for blobs that don't have them yet.
+    """
+
+    def __init__(self, backend: Optional[EvidenceBackend] = None):
+        if backend is None:
+            backend = SupabaseStorageBackend() if EVIDENCE_BACKEND == "supabase" else LocalEvidenceBackend()
+        self.backend = backend
+
+    @staticmethod
+    def derivative_key(evidence_hash: str, size: str, image_format: str) -> str:
+        return f"{evidence_hash}.{size}.{DERIVATIVE_FORMATS[image_format][0]}"
+
+    def put(self, data: bytes) -> str:
+        """Store image bytes and return their hash; raises ValueError for oversized or non-image data"""
+        if len(data) > MAX_EVIDENCE_BYTES:
+            raise ValueError(f"Evidence image exceeds {MAX_EVIDENCE_BYTES} bytes")
+        verify_image(data)
+
+        evidence_hash = hashlib.sha256(data).hexdigest()
+        if not self.backend.exists(evidence_hash):
+            self.backend.put(evidence_hash, data)
+            self.schedule_derivatives(evidence_hash)
+        return evidence_hash
+
+    def ingest(self, evidence_image: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Move an inline base64 / data-URL image into the store.
+
+        Returns (evidence_image, evidence_hash): external URLs are passed
+        through untouched, inline images come back as (None, hash).
+        """
+        if not evidence_image:
+            return None, None
+        if evidence_image.startswith(("http://", "https://")):
+            return evidence_image, None
+
+        encoded = _DATA_URL_PATTERN.sub("", evidence_image, count=1)
+        try:
+            data = base64.b64decode(encoded, validate=True)
+        except (binascii.Error, ValueError):
+            raise ValueError("evidence_image must be a URL or base64-encoded image")
+        return None, self.put(data)
+
+    def schedule_derivatives(self, evidence_hash: str):
+        """Render every derivative of a stored blob on the background executor"""
+        _derivative_executor.submit(self._generate_derivatives, evidence_hash)
+
+    def _generate_derivatives(self, evidence_hash: str):
+        try:
+            image = open_image(self.backend.read(evidence_hash))
+            for size in DERIVATIVE_SIZES:
+                for image_format in DERIVATIVE_FORMATS:
+                    self._render(evidence_hash, image, size, image_format)
+        except Exception as e:
+            # The original is still stored; derivatives are retried on first request
+            print(f"Evidence derivative error for {evidence_hash}: {e}")
+
+    def _render(self, evidence_hash: str, image: Image.Image, size: str, image_format: str) -> str:
+        key = self.derivative_key(evidence_hash, size, image_format)
+        if self.backend.exists(key):
+            return key
+
+        resized = ImageOps.exif_transpose(image).convert("RGB")
+        resized.thumbnail(DERIVATIVE_SIZES[size])
+        buffer = io.BytesIO()
+        resized.save(buffer, format=DERIVATIVE_FORMATS[image_format][1], quality=DERIVATIVE_QUALITY)
+        self.backend.put(key, buffer.getvalue())
+        return key
+
+    def get_derivative(self, evidence_hash: str, size: str, image_format: str) -> Optional[str]:
+        """
+        Key of a derivative, rendering it now if the background job hasn't.
+
+        Returns None if the original blob does not exist and raises
+        ValueError if it can't be decoded as an image.
+        """
+        key = self.derivative_key(evidence_hash, size, image_format)
+        if self.backend.exists(key):
+            return key
+        if not self.backend.exists(evidence_hash):
+            return None
+        image = open_image(self.backend.read(evidence_hash))
+        try:
+            return self._render(evidence_hash, image, size, image_format)
+        except _IMAGE_ERRORS:
+            raise ValueError("Evidence is not a readable image")
+
+    def size(self, key: str) -> Optional[int]:
+        return self.backend.size(key)
+
+    def read(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        return self.backend.read(key, start, end)
+
+
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range `Range: bytes=...` header against a blob size.
+
+    Returns an inclusive (start, end) pair, None for a missing or multi-range
+    header (serve the whole blob), and raises ValueError if unsatisfiable.
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+
+    start_text, _, end_text = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(end_text), 0)
+            end = size - 1
+    except ValueError:
+        return None
+
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise ValueError("Requested range not satisfiable")
+    return start, end
@@ -0,0 +1,103 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+from database.supabase_client import supabase
+
+# Longest the sweeper sleeps between sweeps, so vehicles added with an
+# already-close expiry are still picked up promptly
+SWEEP_MAX_INTERVAL_SECONDS = int(os.getenv("VEHICLE_EXPIRY_SWEEP_SECONDS", "300"))
+SWEEP_BATCH_SIZE = 1000
+SWEEP_RETRY_SECONDS = 30
+
+
+class ExpirySweeper:
+    """
+    Moves active vehicles to `expired` once their registration, insurance or
+    road-worthiness date passes.
+
+    Each sweep calls sweep_expired_vehicles() in batches, which walks the
+    (next_expiry_at) index of active vehicles from the oldest lapse, so a
+    sweep only touches rows that actually expired. Between sweeps the
+    background task sleeps until the next lapse on that same index (capped
+    at SWEEP_MAX_INTERVAL_SECONDS) instead of polling on a fixed timer.
+    `on_expired` is called with the swept rows after every sweep that
+    changed something.
+    """
+
+    def __init__(self, on_expired: Optional[Callable[[List[dict]], None]] = None, batch_size: int = SWEEP_BATCH_SIZE):
+        self.on_expired = on_expired
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+
+    def sweep(self, now: Optional[datetime] = None) -> List[dict]:
+        """Expire every vehicle lapsed as of `now`; returns the (id, plate_number) rows swept"""
+        now = now or datetime.now(timezone.utc)
+        swept = []
+        while True:
+            batch = supabase.rpc("sweep_expired_vehicles", {
+                "p_now": now.isoformat(),
+                "p_limit": self.batch_size
+            }).execute().data or []
+            swept.extend(batch)
+            if len(batch) < self.batch_size:
+                break
+        if swept and self.on_expired:
+            self.on_expired(swept)
+        return swept
+
+    def next_expiry(self) -> Optional[datetime]:
+        """When the next active vehicle lapses, if any"""
+        rows = supabase.table("vehicles").select("next_expiry_at").eq("status", "active").not_.is_("next_expiry_at", "null").order("next_expiry_at").limit(1).execute().data
+        if not rows:
+            return None
+        return datetime.fromisoformat(rows[0]["next_expiry_at"])
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                swept = await asyncio.to_thread(self.sweep)
+                if swept:
+                    print(f"Expiry sweep: {len(swept)} vehicles expired")
+                next_at = await asyncio.to_thread(self.next_expiry)
+                delay = SWEEP_MAX_INTERVAL_SECONDS
+                if next_at is not None:
+                    delay = min(delay, max((next_at - datetime.now(timezone.utc)).total_seconds(), 0) + 1)
+            except Exception as e:
+                print(f"Expiry sweeper error: {e}")
+                delay = SWEEP_RETRY_SECONDS
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def wake(self):
+        """
+        Sweep now, e.g. after vehicles were added or their expiry dates changed.
+
+        Safe to call from worker threads; a no-op while the sweeper isn't running.
+        """
+        if self._wake is not None and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def start(self):
+        """Start the background sweeper on the running event loop"""
+        if self._task is None:
+            self._stopping = False
+            self._wake = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping = True
+        if self._task is not None:
+            self._wake.set()
+            await self._task
+            self._task = None
+
+
+expiry_sweeper = ExpirySweeper()
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+from typing import Dict, Iterator, List, Optional
+from database.supabase_client import supabase
+from database.pagination import MAX_PAGE_SIZE, apply_keyset, split_page
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Columns written per table. Violations leave out evidence_image, which can be
+# a whole base64 image per row.
+EXPORT_COLUMNS: Dict[str, List[str]] = {
+    "violations": [
+        "id", "plate_number", "violation_type", "severity", "location", "description",
+        "fine_amount", "evidence_hash", "officer_notes", "status", "reported_by", "reported_at",
+        "reviewed_by", "reviewed_at", "rejection_reason", "created_at", "updated_at",
+    ],
+    "vehicles": [
+        "id", "plate_number", "vehicle_type", "make", "model", "year", "color",
+        "engine_number", "chassis_number", "owner_name", "owner_phone", "owner_email",
+        "owner_address", "registration_date", "expiry_date", "insurance_expiry",
+        "road_worthiness_expiry", "status", "registered_by", "created_at", "updated_at",
+    ],
+    "dvla_renewals": [
+        "id", "vehicle_id", "renewal_date", "expiry_date", "status", "amount_paid",
+        "payment_method", "transaction_id", "notes", "processed_by", "created_at", "updated_at",
+    ],
+    "dvla_fines": [
+        "id", "fine_id", "vehicle_id", "offense_description", "offense_date", "offense_location",
+        "amount", "payment_status", "payment_method", "payment_proof_path", "marked_as_cleared",
+        "notes", "evidence_paths", "created_by", "verified_by", "created_at", "updated_at",
+    ],
+}
+
+
+class ExportService:
+    """Streams whole tables as NDJSON or CSV, one keyset page in memory at a time"""
+
+    def __init__(self, chunk_size: int = MAX_PAGE_SIZE):
+        self.chunk_size = chunk_size
+
+    def iter_pages(self, table: str, filters: Optional[Dict[str, object]] = None) -> Iterator[List[dict]]:
+        """Yield pages of rows matching the equality filters, newest first"""
+        columns = ",".join(EXPORT_COLUMNS[table])
+        cursor = None
+        while True:
+            query = supabase.table(table).select(columns)
+            for column, value in (filters or {}).items():
+                if value is not None:
+                    query = query.eq(column, value)
+
+            response = apply_keyset(query, cursor, self.chunk_size).execute()
+            rows, cursor = split_page(response.data, self.chunk_size)
+            if rows:
+                yield rows
+            if not cursor:
+                return
+
+    def stream(self, table: str, export_format: str, filters: Optional[Dict[str, object]] = None) -> Iterator[str]:
+        """Serialize the table as NDJSON or CSV, emitting one chunk per page"""
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+
+        pages = self.iter_pages(table, filters)
+        if export_format == "ndjson":
+            return ("".join(json.dumps(row, default=str) + "\n" for row in rows) for rows in pages)
+        return self._csv_chunks(EXPORT_COLUMNS[table], pages)
+
+    def _csv_chunks(self, columns: List[str], pages: Iterator[List[dict]]) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        for rows in pages:
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
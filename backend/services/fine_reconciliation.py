@@ -0,0 +1,165 @@
+import csv
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Dict, IO, Iterable, List, Optional, Set
+from pydantic import BaseModel
+from database.supabase_client import supabase
+
+# Payments sent per apply_fine_payments() call
+FINE_PAYMENT_CHUNK_SIZE = 1000
+UNPAID_INDEX_PAGE_SIZE = 1000
+# Fines looked up per query when classifying unmatched settlement lines
+LOOKUP_CHUNK_SIZE = 200
+
+MISMATCH_REPORT_COLUMNS = ["line", "fine_id", "amount", "expected_amount", "reason"]
+
+_CENT = Decimal("0.01")
+
+
+class FineMismatch(BaseModel):
+    line: int  # 1-based settlement line, excluding the header
+    fine_id: Optional[str] = None
+    amount: Optional[str] = None  # As settled
+    expected_amount: Optional[str] = None  # Outstanding on the fine
+    reason: str  # amount_mismatch, already_paid, unknown_fine, duplicate_in_file, invalid_line, update_failed
+
+
+class FineReconciliationSummary(BaseModel):
+    lines_read: int
+    paid: int
+    mismatched: int
+    elapsed_seconds: float
+    mismatches: List[FineMismatch]
+
+
+def _parse_amount(value: Optional[str]) -> Decimal:
+    return Decimal((value or "").replace(",", "").strip()).quantize(_CENT)
+
+
+class FineReconciler:
+    """
+    Matches a payment settlement file against unpaid dvla_fines.
+
+    The settlement CSV (header: fine_id, amount and optionally
+    payment_method; other columns are ignored) is read line by line. Each
+    line is looked up in an in-memory hash index of unpaid fines built once
+    up front, and exact matches are marked paid in bulk through apply_fine_payments(). Everything else,
+    wrong amounts, unknown or already paid fines, repeats and unparsable
+    lines, is returned as a mismatch for follow-up.
+    """
+
+    def __init__(self, verified_by: Optional[int] = None, chunk_size: int = FINE_PAYMENT_CHUNK_SIZE):
+        self.verified_by = verified_by
+        self.chunk_size = chunk_size
+        self.unpaid: Dict[str, Decimal] = {}
+
+    def load_unpaid_index(self):
+        """fine_id -> outstanding amount for every unpaid fine, paging by id"""
+        self.unpaid = {}
+        last_id = 0
+        while True:
+            rows = supabase.table("dvla_fines").select("id,fine_id,amount").eq("payment_status", "unpaid").gt("id", last_id).order("id").limit(UNPAID_INDEX_PAGE_SIZE).execute().data
+            for row in rows:
+                self.unpaid[row["fine_id"]] = Decimal(str(row["amount"])).quantize(_CENT)
+            if len(rows) < UNPAID_INDEX_PAGE_SIZE:
+                return
+            last_id = rows[-1]["id"]
+
+    def _apply(self, payments: List[dict], mismatches: List[FineMismatch]) -> int:
+        """Mark a chunk of matched fines paid; fines paid concurrently since indexing become mismatches"""
+        try:
+            rows = supabase.rpc("apply_fine_payments", {
+                "p_payments": [{"fine_id": p["fine_id"], "payment_method": p["payment_method"]} for p in payments],
+                "p_verified_by": self.verified_by
+            }).execute().data
+        except Exception as e:
+            print(f"Fine reconciliation update error: {e}")
+            mismatches.extend(FineMismatch(line=p["line"], fine_id=p["fine_id"], amount=p["amount"], reason="update_failed") for p in payments)
+            return 0
+        paid = {row["paid_fine_id"] for row in rows}
+        mismatches.extend(
+            FineMismatch(line=p["line"], fine_id=p["fine_id"], amount=p["amount"], reason="already_paid")
+            for p in payments if p["fine_id"] not in paid
+        )
+        return len(paid)
+
+    def _classify_unmatched(self, unmatched: List[FineMismatch]):
+        """Tell already paid fines apart from fine ids that don't exist"""
+        fine_ids = list({mismatch.fine_id for mismatch in unmatched})
+        known = {}
+        for start in range(0, len(fine_ids), LOOKUP_CHUNK_SIZE):
+            rows = supabase.table("dvla_fines").select("fine_id,amount").in_("fine_id", fine_ids[start:start + LOOKUP_CHUNK_SIZE]).execute().data
+            known.update((row["fine_id"], row) for row in rows)
+        for mismatch in unmatched:
+            if mismatch.fine_id in known:
+                mismatch.reason = "already_paid"
+                mismatch.expected_amount = str(Decimal(str(known[mismatch.fine_id]["amount"])).quantize(_CENT))
+
+    def run(self, lines: Iterable[str]) -> FineReconciliationSummary:
+        started = time.monotonic()
+        self.load_unpaid_index()
+
+        reader = csv.DictReader(lines)
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+        if "fine_id" not in reader.fieldnames or "amount" not in reader.fieldnames:
+            raise ValueError("Settlement file needs fine_id and amount columns")
+
+        mismatches: List[FineMismatch] = []
+        unmatched: List[FineMismatch] = []
+        matched: Set[str] = set()
+        pending: List[dict] = []
+        paid = 0
+        lines_read = 0
+        for lines_read, line in enumerate(reader, start=1):
+            fine_id = (line.get("fine_id") or "").strip()
+            raw_amount = (line.get("amount") or "").strip()
+            try:
+                if not fine_id:
+                    raise ValueError
+                amount = _parse_amount(raw_amount)
+            except (ValueError, InvalidOperation):
+                mismatches.append(FineMismatch(line=lines_read, fine_id=fine_id or None, amount=raw_amount or None, reason="invalid_line"))
+                continue
+
+            if fine_id in matched:
+                mismatches.append(FineMismatch(line=lines_read, fine_id=fine_id, amount=str(amount), reason="duplicate_in_file"))
+                continue
+            expected = self.unpaid.get(fine_id)
+            if expected is None:
+                unmatched.append(FineMismatch(line=lines_read, fine_id=fine_id, amount=str(amount), reason="unknown_fine"))
+                continue
+            if amount != expected:
+                mismatches.append(FineMismatch(line=lines_read, fine_id=fine_id, amount=str(amount), expected_amount=str(expected), reason="amount_mismatch"))
+                continue
+
+            matched.add(fine_id)
+            pending.append({
+                "line": lines_read,
+                "fine_id": fine_id,
+                "amount": str(amount),
+                "payment_method": (line.get("payment_method") or "").strip() or None
+            })
+            if len(pending) >= self.chunk_size:
+                paid += self._apply(pending, mismatches)
+                pending = []
+        if pending:
+            paid += self._apply(pending, mismatches)
+
+        if unmatched:
+            self._classify_unmatched(unmatched)
+            mismatches.extend(unmatched)
+        mismatches.sort(key=lambda mismatch: mismatch.line)
+
+        return FineReconciliationSummary(
+            lines_read=lines_read,
+            paid=paid,
+            mismatched=len(mismatches),
+            elapsed_seconds=round(time.monotonic() - started, 2),
+            mismatches=mismatches
+        )
+
+
+def write_mismatch_report(mismatches: List[FineMismatch], report: IO[str]):
+    writer = csv.DictWriter(report, fieldnames=MISMATCH_REPORT_COLUMNS)
+    writer.writeheader()
+    writer.writerows(mismatch.model_dump() for mismatch in mismatches)
@@ -0,0 +1,131 @@
+import asyncio
+import json
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+from fastapi.encoders import jsonable_encoder
+from services.cache import SingleFlight
+
+# Mutations within this window are folded into one recomputation
+METRICS_DEBOUNCE_SECONDS = 1.0
+# Comment lines sent to idle streams so proxies don't close them
+KEEPALIVE_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = 32
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class MetricsBroadcaster:
+    """
+    Pushes dashboard metrics to Server-Sent Events subscribers.
+
+    Each topic ("violations", "dvla") has a source coroutine that computes
+    its metrics. Services call notify(topic) after mutating data; after a
+    short debounce the source runs once and only the fields that changed
+    are sent to every subscriber as a `delta` event. New subscribers get a
+    `snapshot` first. Nothing is computed for topics nobody is watching.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, Callable[[], Awaitable[object]]] = {}
+        self._snapshots: Dict[str, dict] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._queue_topics: Dict[asyncio.Queue, List[str]] = {}
+        self._dirty: Set[str] = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._single_flight = SingleFlight()
+
+    @property
+    def topics(self) -> List[str]:
+        return list(self._sources)
+
+    def register(self, topic: str, source: Callable[[], Awaitable[object]]):
+        self._sources[topic] = source
+        self._subscribers.setdefault(topic, set())
+
+    def start(self):
+        """Bind to the running event loop so notify() can be called from worker threads"""
+        self._loop = asyncio.get_running_loop()
+
+    def notify(self, topic: str):
+        """Mark a topic's metrics stale; safe to call from any thread"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        try:
+            if asyncio.get_running_loop() is self._loop:
+                self._mark_dirty(topic)
+                return
+        except RuntimeError:
+            pass
+        self._loop.call_soon_threadsafe(self._mark_dirty, topic)
+
+    def _mark_dirty(self, topic: str):
+        if not self._subscribers.get(topic):
+            # Nobody is listening: just forget the snapshot so the next subscriber recomputes
+            self._snapshots.pop(topic, None)
+            return
+        self._dirty.add(topic)
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_dirty())
+
+    async def _refresh_dirty(self):
+        # Loop so topics marked dirty while a refresh is running are not lost
+        while self._dirty:
+            await asyncio.sleep(METRICS_DEBOUNCE_SECONDS)
+            topics, self._dirty = self._dirty, set()
+            for topic in topics:
+                try:
+                    previous = self._snapshots.get(topic, {})
+                    current = await self._load(topic)
+                    delta = {key: value for key, value in current.items() if previous.get(key) != value}
+                    if delta:
+                        self._publish(topic, "delta", delta)
+                except Exception as e:
+                    print(f"Metrics refresh error for {topic}: {e}")
+
+    async def _load(self, topic: str) -> dict:
+        async def compute():
+            metrics = jsonable_encoder(await self._sources[topic]())
+            self._snapshots[topic] = metrics
+            return metrics
+        return await self._single_flight.do(topic, compute)
+
+    def _publish(self, topic: str, event: str, metrics: dict):
+        message = _sse_event(event, {"topic": topic, "metrics": metrics})
+        for queue in list(self._subscribers.get(topic, ())):
+            if not queue.full():
+                queue.put_nowait(message)
+                continue
+            # Slow consumer: drop its backlog and resync it with full snapshots
+            while not queue.empty():
+                queue.get_nowait()
+            for queue_topic in self._queue_topics[queue]:
+                if queue_topic in self._snapshots:
+                    queue.put_nowait(_sse_event("snapshot", {"topic": queue_topic, "metrics": self._snapshots[queue_topic]}))
+
+    async def subscribe(self, topics: List[str]) -> AsyncIterator[str]:
+        """Yield SSE-formatted events for the given topics until the client disconnects"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._queue_topics[queue] = topics
+        for topic in topics:
+            self._subscribers[topic].add(queue)
+        try:
+            for topic in topics:
+                metrics = self._snapshots.get(topic)
+                if metrics is None:
+                    metrics = await self._load(topic)
+                yield _sse_event("snapshot", {"topic": topic, "metrics": metrics})
+
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            for topic in topics:
+                self._subscribers[topic].discard(queue)
+            del self._queue_topics[queue]
+
+
+metrics_broadcaster = MetricsBroadcaster()
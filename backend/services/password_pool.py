@@ -0,0 +1,86 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+# bcrypt is deliberately slow; a few threads are enough and keep it from crowding out other work
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Hash / verify calls allowed to wait for a worker before new ones are refused
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the password hashing queue is full"""
+
+
+class PasswordHashPool:
+    """
+    Dedicated, size-limited executor for bcrypt hashing and verification.
+
+    Password checks run here instead of on the event loop, so a login
+    storm only queues behind other logins. At most `workers` hashes run
+    at once and at most `max_queue` more may wait; beyond that calls fail
+    fast with PasswordPoolBusy instead of piling up.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0  # Submitted and not finished (queued + running)
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise PasswordPoolBusy("Too many password checks in progress, try again shortly")
+            self._pending += 1
+        submitted = time.monotonic()
+
+        def task():
+            with self._lock:
+                self._running += 1
+                self._wait_seconds += time.monotonic() - submitted
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        def finished(_future):
+            # Runs when the job itself ends, so a caller that gave up waiting
+            # doesn't free its slot while bcrypt is still busy in a worker
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+
+        try:
+            future = self._executor.submit(task)
+        except RuntimeError:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(finished)
+        return await asyncio.wrap_future(future)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queue_depth": self._pending - self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_seconds / self._completed * 1000, 2) if self._completed else 0.0,
+            }
+
+
+password_pool = PasswordHashPool()
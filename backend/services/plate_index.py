@@ -0,0 +1,125 @@
+import re
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+# Characters that OCR routinely mistakes for one another on Ghanaian plates.
+# Substituting within a group costs half of a regular edit.
+OCR_CONFUSION_GROUPS = ["0ODQ", "1IL", "2Z", "5S", "6G", "8B"]
+
+# Distances are tracked in half-edit units so they stay integers
+CONFUSION_COST = 1
+EDIT_COST = 2
+
+_CONFUSION_CLASS: Dict[str, str] = {
+    char: group[0] for group in OCR_CONFUSION_GROUPS for char in group
+}
+
+
+def normalize_plate(plate_number: str) -> str:
+    """Uppercase a plate and strip spaces, dashes and slashes"""
+    return re.sub(r'[^A-Z0-9]', '', plate_number.upper())
+
+
+def _substitution_cost(a: str, b: str) -> int:
+    if a == b:
+        return 0
+    if _CONFUSION_CLASS.get(a, a) == _CONFUSION_CLASS.get(b, b):
+        return CONFUSION_COST
+    return EDIT_COST
+
+
+def plate_distance(a: str, b: str) -> int:
+    """Confusion-weighted Levenshtein distance between two normalized plates, in half-edits"""
+    if a == b:
+        return 0
+    previous = [i * EDIT_COST for i in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        current = [i * EDIT_COST]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + EDIT_COST,
+                current[j - 1] + EDIT_COST,
+                previous[j - 1] + _substitution_cost(char_a, char_b)
+            ))
+        previous = current
+    return previous[-1]
+
+
+class PlateIndex:
+    """
+    OCR-tolerant index over registered plate numbers.
+
+    Each plate is stored under its confusion-folded form (0/O/D/Q -> 0, 8/B -> 8,
+    ...) and under every single-character deletion of that form. A lookup probes
+    the same variants of the query, so a plate that differs by any number of
+    confusable characters plus one insertion, deletion or substitution is found
+    with a handful of dict lookups; candidates are then ranked by plate_distance.
+    """
+
+    def __init__(self):
+        self._plates: Dict[str, str] = {}
+        self._variants: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._plates)
+
+    def __contains__(self, plate_number: str) -> bool:
+        return normalize_plate(plate_number) in self._plates
+
+    def add(self, plate_number: str):
+        """Add a plate to the index (no-op if it is already present)"""
+        key = normalize_plate(plate_number)
+        if not key:
+            return
+
+        with self._lock:
+            if key in self._plates:
+                return
+            self._plates[key] = plate_number
+            for variant in _variants(_fold(key)):
+                self._variants.setdefault(variant, []).append(key)
+
+    def build(self, plate_numbers: Iterable[str]):
+        """Add many plates and mark the index as loaded"""
+        for plate_number in plate_numbers:
+            self.add(plate_number)
+        self.loaded = True
+
+    def search(self, plate_number: str, max_distance: float = 1.0, limit: int = 5) -> List[Tuple[str, float]]:
+        """
+        Find registered plates within max_distance edits of plate_number.
+
+        Returns (plate_number, distance) pairs, nearest first. A confusable
+        character swap (e.g. 0/O, 8/B) counts as half an edit. Only one
+        non-confusable edit is tolerated regardless of max_distance.
+        """
+        key = normalize_plate(plate_number)
+        if not key:
+            return []
+
+        candidates = set()
+        for variant in _variants(_fold(key)):
+            candidates.update(self._variants.get(variant, ()))
+
+        threshold = int(max_distance * EDIT_COST)
+        matches = []
+        for candidate in candidates:
+            distance = plate_distance(key, candidate)
+            if distance <= threshold:
+                matches.append((distance, candidate))
+
+        matches.sort()
+        return [(self._plates[match_key], distance / EDIT_COST) for distance, match_key in matches[:limit]]
+
+
+def _fold(key: str) -> str:
+    return ''.join(_CONFUSION_CLASS.get(char, char) for char in key)
+
+
+def _variants(folded: str) -> set:
+    variants = {folded}
+    for i in range(len(folded)):
+        variants.add(folded[:i] + folded[i + 1:])
+    return variants
@@ -0,0 +1,75 @@
+import asyncio
+import os
+from typing import List, Optional
+from database.supabase_client import supabase
+from models.dvla import DVLAVehicleSummary, DVLARenewal, DVLAFine, DVLA_VEHICLE_SUMMARY_COLUMNS, DVLA_RENEWAL_COLUMNS, DVLA_FINE_COLUMNS
+from models.profile import VehicleProfile
+from models.vehicle import Vehicle, VEHICLE_COLUMNS
+from models.violation import ViolationSummary, VIOLATION_SUMMARY_COLUMNS
+from services.cache import TTLCache
+
+# Newest violations / renewals / fines included in a profile
+PROFILE_ITEM_LIMIT = 50
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("VEHICLE_PROFILE_CACHE_TTL", "15"))
+
+
+def _quote_filter_value(value: str) -> str:
+    """Quote a value for a PostgREST or=() filter (plates contain spaces and dashes)"""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class ProfileService:
+    """
+    Builds the cross-domain profile of a plate in one parallel round trip.
+
+    The vehicles row, the newest violations and the DVLA record run as three
+    concurrent queries; the DVLA record embeds its renewals and fines through
+    their foreign keys, so it needs no follow-up lookups. Profiles are cached
+    briefly per plate so an officer flicking between tabs doesn't refetch.
+    """
+
+    def __init__(self):
+        self.cache = TTLCache(ttl=PROFILE_CACHE_TTL_SECONDS)
+
+    def _fetch_vehicle(self, plate_number: str) -> Optional[Vehicle]:
+        rows = supabase.table("vehicles").select(VEHICLE_COLUMNS).eq("plate_number", plate_number).limit(1).execute().data
+        return Vehicle(**rows[0]) if rows else None
+
+    def _fetch_violations(self, plate_number: str) -> List[ViolationSummary]:
+        rows = supabase.table("violations").select(VIOLATION_SUMMARY_COLUMNS) \
+            .eq("plate_number", plate_number) \
+            .order("created_at", desc=True) \
+            .order("id", desc=True) \
+            .limit(PROFILE_ITEM_LIMIT) \
+            .execute().data
+        return [ViolationSummary(**row) for row in rows]
+
+    def _fetch_dvla_record(self, plate_number: str) -> Optional[dict]:
+        """The DVLA vehicle registered under this plate, with its renewals and fines embedded"""
+        quoted = _quote_filter_value(plate_number)
+        rows = supabase.table("dvla_vehicles") \
+            .select(f"{DVLA_VEHICLE_SUMMARY_COLUMNS},dvla_renewals({DVLA_RENEWAL_COLUMNS}),dvla_fines({DVLA_FINE_COLUMNS})") \
+            .or_(f"reg_number.eq.{quoted},license_plate.eq.{quoted}") \
+            .order("created_at", desc=True, foreign_table="dvla_renewals") \
+            .limit(PROFILE_ITEM_LIMIT, foreign_table="dvla_renewals") \
+            .order("created_at", desc=True, foreign_table="dvla_fines") \
+            .limit(PROFILE_ITEM_LIMIT, foreign_table="dvla_fines") \
+            .limit(1) \
+            .execute().data
+        return rows[0] if rows else None
+
+    async def get_profile(self, plate_number: str) -> VehicleProfile:
+        return await self.cache.get_or_load(plate_number, lambda: self._load_profile(plate_number))
+
+    async def _load_profile(self, plate_number: str) -> VehicleProfile:
+        vehicle, violations, dvla_record = await asyncio.gather(
+            asyncio.to_thread(self._fetch_vehicle, plate_number),
+            asyncio.to_thread(self._fetch_violations, plate_number),
+            asyncio.to_thread(self._fetch_dvla_record, plate_number)
+        )
+        profile = VehicleProfile(plate_number=plate_number, vehicle=vehicle, violations=violations)
+        if dvla_record:
+            profile.renewals = [DVLARenewal(**renewal) for renewal in dvla_record.pop("dvla_renewals")]
+            profile.fines = [DVLAFine(**fine) for fine in dvla_record.pop("dvla_fines")]
+            profile.dvla_vehicle = DVLAVehicleSummary(**dvla_record)
+        return profile
@@ -0,0 +1,38 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+
+class RateLimiter:
+    """
+    In-process token-bucket limiter keyed by anything hashable.
+
+    Each key may make `burst` attempts at once, refilled at `per_minute`
+    attempts per minute. Only the `max_keys` most recently seen keys are
+    tracked, so memory stays bounded under a spray of usernames or IPs.
+    """
+
+    def __init__(self, per_minute: float, burst: int, max_keys: int = 10000):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: Hashable) -> float:
+        """Take one attempt for `key`; returns 0 if allowed, otherwise seconds until the next is"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return 0.0 if allowed else (1 - tokens) / self.rate
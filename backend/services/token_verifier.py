@@ -0,0 +1,40 @@
+import time
+import jwt
+from services.auth_service import SECRET_KEY, ALGORITHM
+from services.cache import TTLCache
+
+# Distinct tokens whose decoded claims are kept; the oldest are evicted first
+TOKEN_CACHE_SIZE = 10000
+
+
+class TokenVerifier:
+    """
+    Verifies access tokens with a key loaded once at startup.
+
+    Decoded claims are cached per token string until the token's `exp`, so
+    a client reusing its token skips signature verification on every
+    request after the first. Only valid tokens are cached; invalid and
+    expired ones are verified (and rejected) each time.
+    """
+
+    def __init__(self, secret_key: str = SECRET_KEY, algorithm: str = ALGORITHM, max_entries: int = TOKEN_CACHE_SIZE):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self._claims = TTLCache(ttl=0, max_entries=max_entries)
+
+    def verify(self, token: str) -> dict:
+        """
+        Claims of a valid token with a subject.
+
+        Raises jwt.ExpiredSignatureError or jwt.InvalidTokenError otherwise.
+        """
+        claims = self._claims.get(token)
+        if claims is not None:
+            return claims
+
+        claims = jwt.decode(token, self.secret_key, algorithms=[self.algorithm], options={"require": ["exp", "sub"]})
+        self._claims.set(token, claims, ttl=claims["exp"] - time.time())
+        return claims
+
+
+token_verifier = TokenVerifier()
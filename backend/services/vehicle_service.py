@@ -1,12 +1,75 @@
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+import asyncio
+import os
+import time
 import uuid
 from database.supabase_client import supabase
-from models.vehicle import Vehicle, VehicleCreate, VehicleType, VehicleStatus
+from database.pagination import DEFAULT_PAGE_SIZE, clamp_page_size, encode_cursor, decode_cursor
+from models.vehicle import (
+    Vehicle, VehicleCreate, VehicleType, VehicleStatus, PlateCandidate, VehicleSearchResult, VEHICLE_COLUMNS,
+    ExpiryKind, ExpiryBucket, VehicleExpiry, ExpiringVehicles
+)
+from services.cache import SingleFlight, TTLCache
+from services.expiry_sweeper import expiry_sweeper
+from services.plate_index import PlateIndex
+
+PLATE_INDEX_PAGE_SIZE = 1000
+# The fuzzy index is rebuilt from the table this often, which drops plates
+# deleted or renamed outside this process (setup scripts, SQL, other workers)
+PLATE_INDEX_REFRESH_SECONDS = int(os.getenv("PLATE_INDEX_REFRESH_SECONDS", "600"))
+
+# Cumulative "expiring within N days" buckets reported alongside the requested window
+EXPIRY_BUCKET_DAYS = [1, 7, 30]
+EXPIRING_CACHE_TTL = 60
+EXPIRY_COLUMNS = {
+    "expiry_date": ExpiryKind.REGISTRATION,
+    "insurance_expiry": ExpiryKind.INSURANCE,
+    "road_worthiness_expiry": ExpiryKind.ROAD_WORTHINESS,
+}
+
+def _expiry_urgency(days_left: int) -> str:
+    if days_left <= 3:
+        return "high"
+    if days_left <= 7:
+        return "medium"
+    return "low"
+
+def _vehicle_from_row(vehicle_data: dict) -> Vehicle:
+    """Build a Vehicle from a vehicles table row"""
+    return Vehicle(
+        id=vehicle_data["id"],
+        plate_number=vehicle_data["plate_number"],
+        vehicle_type=VehicleType(vehicle_data["vehicle_type"]),
+        make=vehicle_data["make"],
+        model=vehicle_data["model"],
+        year=vehicle_data["year"],
+        color=vehicle_data["color"],
+        engine_number=vehicle_data["engine_number"],
+        chassis_number=vehicle_data["chassis_number"],
+        owner_name=vehicle_data["owner_name"],
+        owner_phone=vehicle_data["owner_phone"],
+        owner_email=vehicle_data.get("owner_email"),
+        owner_address=vehicle_data["owner_address"],
+        registration_date=datetime.fromisoformat(vehicle_data["registration_date"]),
+        expiry_date=datetime.fromisoformat(vehicle_data["expiry_date"]),
+        insurance_expiry=datetime.fromisoformat(vehicle_data["insurance_expiry"]) if vehicle_data.get("insurance_expiry") else None,
+        road_worthiness_expiry=datetime.fromisoformat(vehicle_data["road_worthiness_expiry"]) if vehicle_data.get("road_worthiness_expiry") else None,
+        status=VehicleStatus(vehicle_data["status"]),
+        created_at=datetime.fromisoformat(vehicle_data["created_at"]),
+        updated_at=datetime.fromisoformat(vehicle_data["updated_at"]),
+        registered_by=vehicle_data["registered_by"]
+    )
 
 class VehicleService:
     def __init__(self):
-        pass
+        self.plate_index = PlateIndex()
+        self.plate_index_built_at = 0.0
+        # Plates created while a rebuild is reading the table, replayed into the new index
+        self._plates_added_during_rebuild: Optional[List[str]] = None
+        self._plate_index_refresh: Optional[asyncio.Task] = None
+        self.expiring_cache = TTLCache(ttl=EXPIRING_CACHE_TTL)
+        self.single_flight = SingleFlight()
 
     async def create_vehicle(self, vehicle_data: VehicleCreate, registered_by: str) -> Vehicle:
         """Create a new vehicle record"""
@@ -48,69 +111,32 @@ class VehicleService:
                 raise ValueError("Failed to create vehicle")
             
             created_vehicle = response.data[0]
+            self._index_plate(created_vehicle["plate_number"])
+            self.expiring_cache.invalidate()
+            # Vehicles registered with an already lapsed date are expired right away
+            expiry_sweeper.wake()
             
             # Return Vehicle object
-            return Vehicle(
-                id=created_vehicle["id"],
-                plate_number=created_vehicle["plate_number"],
-                vehicle_type=VehicleType(created_vehicle["vehicle_type"]),
-                make=created_vehicle["make"],
-                model=created_vehicle["model"],
-                year=created_vehicle["year"],
-                color=created_vehicle["color"],
-                engine_number=created_vehicle["engine_number"],
-                chassis_number=created_vehicle["chassis_number"],
-                owner_name=created_vehicle["owner_name"],
-                owner_phone=created_vehicle["owner_phone"],
-                owner_email=created_vehicle.get("owner_email"),
-                owner_address=created_vehicle["owner_address"],
-                registration_date=datetime.fromisoformat(created_vehicle["registration_date"]),
-                expiry_date=datetime.fromisoformat(created_vehicle["expiry_date"]),
-                insurance_expiry=datetime.fromisoformat(created_vehicle["insurance_expiry"]) if created_vehicle.get("insurance_expiry") else None,
-                road_worthiness_expiry=datetime.fromisoformat(created_vehicle["road_worthiness_expiry"]) if created_vehicle.get("road_worthiness_expiry") else None,
-                status=VehicleStatus(created_vehicle["status"]),
-                created_at=datetime.fromisoformat(created_vehicle["created_at"]),
-                updated_at=datetime.fromisoformat(created_vehicle["updated_at"]),
-                registered_by=created_vehicle["registered_by"]
-            )
+            return _vehicle_from_row(created_vehicle)
             
         except Exception as e:
             print(f"Vehicle creation error: {e}")
             raise e
 
     async def get_vehicle_by_plate(self, plate_number: str) -> Optional[Vehicle]:
-        """Get vehicle information by plate number"""
+        """Get vehicle information by plate number; concurrent lookups of one plate share a query"""
         try:
-            response = supabase.table("vehicles").select("*").eq("plate_number", plate_number).execute()
+            query = supabase.table("vehicles").select(VEHICLE_COLUMNS).eq("plate_number", plate_number)
+            response = await self.single_flight.do(
+                ("vehicle_by_plate", plate_number), lambda: asyncio.to_thread(query.execute)
+            )
             
             if not response.data:
                 return None
             
             vehicle_data = response.data[0]
             
-            return Vehicle(
-                id=vehicle_data["id"],
-                plate_number=vehicle_data["plate_number"],
-                vehicle_type=VehicleType(vehicle_data["vehicle_type"]),
-                make=vehicle_data["make"],
-                model=vehicle_data["model"],
-                year=vehicle_data["year"],
-                color=vehicle_data["color"],
-                engine_number=vehicle_data["engine_number"],
-                chassis_number=vehicle_data["chassis_number"],
-                owner_name=vehicle_data["owner_name"],
-                owner_phone=vehicle_data["owner_phone"],
-                owner_email=vehicle_data.get("owner_email"),
-                owner_address=vehicle_data["owner_address"],
-                registration_date=datetime.fromisoformat(vehicle_data["registration_date"]),
-                expiry_date=datetime.fromisoformat(vehicle_data["expiry_date"]),
-                insurance_expiry=datetime.fromisoformat(vehicle_data["insurance_expiry"]) if vehicle_data.get("insurance_expiry") else None,
-                road_worthiness_expiry=datetime.fromisoformat(vehicle_data["road_worthiness_expiry"]) if vehicle_data.get("road_worthiness_expiry") else None,
-                status=VehicleStatus(vehicle_data["status"]),
-                created_at=datetime.fromisoformat(vehicle_data["created_at"]),
-                updated_at=datetime.fromisoformat(vehicle_data["updated_at"]),
-                registered_by=vehicle_data["registered_by"]
-            )
+            return _vehicle_from_row(vehicle_data)
             
         except Exception as e:
             print(f"Get vehicle error: {e}")
@@ -119,33 +145,11 @@ class VehicleService:
     async def get_vehicles_by_owner(self, owner_name: str) -> List[Vehicle]:
         """Get all vehicles owned by a specific person"""
         try:
-            response = supabase.table("vehicles").select("*").ilike("owner_name", f"%{owner_name}%").execute()
+            response = supabase.table("vehicles").select(VEHICLE_COLUMNS).ilike("owner_name", f"%{owner_name}%").execute()
             
             vehicles = []
             for vehicle_data in response.data:
-                vehicle = Vehicle(
-                    id=vehicle_data["id"],
-                    plate_number=vehicle_data["plate_number"],
-                    vehicle_type=VehicleType(vehicle_data["vehicle_type"]),
-                    make=vehicle_data["make"],
-                    model=vehicle_data["model"],
-                    year=vehicle_data["year"],
-                    color=vehicle_data["color"],
-                    engine_number=vehicle_data["engine_number"],
-                    chassis_number=vehicle_data["chassis_number"],
-                    owner_name=vehicle_data["owner_name"],
-                    owner_phone=vehicle_data["owner_phone"],
-                    owner_email=vehicle_data.get("owner_email"),
-                    owner_address=vehicle_data["owner_address"],
-                    registration_date=datetime.fromisoformat(vehicle_data["registration_date"]),
-                    expiry_date=datetime.fromisoformat(vehicle_data["expiry_date"]),
-                    insurance_expiry=datetime.fromisoformat(vehicle_data["insurance_expiry"]) if vehicle_data.get("insurance_expiry") else None,
-                    road_worthiness_expiry=datetime.fromisoformat(vehicle_data["road_worthiness_expiry"]) if vehicle_data.get("road_worthiness_expiry") else None,
-                    status=VehicleStatus(vehicle_data["status"]),
-                    created_at=datetime.fromisoformat(vehicle_data["created_at"]),
-                    updated_at=datetime.fromisoformat(vehicle_data["updated_at"]),
-                    registered_by=vehicle_data["registered_by"]
-                )
+                vehicle = _vehicle_from_row(vehicle_data)
                 vehicles.append(vehicle)
             
             return vehicles
@@ -162,6 +166,8 @@ class VehicleService:
                 "updated_at": datetime.utcnow().isoformat()
             }).eq("plate_number", plate_number).execute()
             
+            self.expiring_cache.invalidate()
+            expiry_sweeper.wake()
             return len(response.data) > 0
             
         except Exception as e:
@@ -172,33 +178,11 @@ class VehicleService:
         """Get all vehicles with expired registration"""
         try:
             current_date = datetime.utcnow().isoformat()
-            response = supabase.table("vehicles").select("*").lt("expiry_date", current_date).execute()
+            response = supabase.table("vehicles").select(VEHICLE_COLUMNS).lt("expiry_date", current_date).execute()
             
             vehicles = []
             for vehicle_data in response.data:
-                vehicle = Vehicle(
-                    id=vehicle_data["id"],
-                    plate_number=vehicle_data["plate_number"],
-                    vehicle_type=VehicleType(vehicle_data["vehicle_type"]),
-                    make=vehicle_data["make"],
-                    model=vehicle_data["model"],
-                    year=vehicle_data["year"],
-                    color=vehicle_data["color"],
-                    engine_number=vehicle_data["engine_number"],
-                    chassis_number=vehicle_data["chassis_number"],
-                    owner_name=vehicle_data["owner_name"],
-                    owner_phone=vehicle_data["owner_phone"],
-                    owner_email=vehicle_data.get("owner_email"),
-                    owner_address=vehicle_data["owner_address"],
-                    registration_date=datetime.fromisoformat(vehicle_data["registration_date"]),
-                    expiry_date=datetime.fromisoformat(vehicle_data["expiry_date"]),
-                    insurance_expiry=datetime.fromisoformat(vehicle_data["insurance_expiry"]) if vehicle_data.get("insurance_expiry") else None,
-                    road_worthiness_expiry=datetime.fromisoformat(vehicle_data["road_worthiness_expiry"]) if vehicle_data.get("road_worthiness_expiry") else None,
-                    status=VehicleStatus(vehicle_data["status"]),
-                    created_at=datetime.fromisoformat(vehicle_data["created_at"]),
-                    updated_at=datetime.fromisoformat(vehicle_data["updated_at"]),
-                    registered_by=vehicle_data["registered_by"]
-                )
+                vehicle = _vehicle_from_row(vehicle_data)
                 vehicles.append(vehicle)
             
             return vehicles
@@ -207,51 +191,131 @@ class VehicleService:
             print(f"Get expired vehicles error: {e}")
             return []
 
-    async def search_vehicles(self, query: str) -> List[Vehicle]:
-        """Search vehicles by plate number, owner name, or make/model"""
+    async def get_expiring_vehicles(self, days: int = 30, limit: int = 20) -> ExpiringVehicles:
+        """Active vehicles whose next expiry falls within `days` days, soonest first, with bucket counts"""
+        return await self.expiring_cache.get_or_load(
+            (days, limit), lambda: asyncio.to_thread(self._load_expiring_vehicles, days, limit)
+        )
+
+    def _load_expiring_vehicles(self, days: int, limit: int) -> ExpiringVehicles:
+        now = datetime.now(timezone.utc)
+        bucket_days = sorted({d for d in EXPIRY_BUCKET_DAYS if d < days} | {days})
+        buckets = supabase.rpc("vehicle_expiry_buckets", {"p_now": now.isoformat(), "p_days": bucket_days}).execute().data
+        
+        rows = supabase.table("vehicles").select(f"id,plate_number,{','.join(EXPIRY_COLUMNS)}") \
+            .eq("status", "active") \
+            .gt("next_expiry_at", now.isoformat()) \
+            .lte("next_expiry_at", (now + timedelta(days=days)).isoformat()) \
+            .order("next_expiry_at") \
+            .limit(clamp_page_size(limit)) \
+            .execute().data
+        
+        items = []
+        for row in rows:
+            expires_at, kind = min(
+                (datetime.fromisoformat(row[column]), kind) for column, kind in EXPIRY_COLUMNS.items() if row.get(column)
+            )
+            days_left = (expires_at - now).days
+            items.append(VehicleExpiry(
+                vehicle_id=row["id"],
+                plate_number=row["plate_number"],
+                kind=kind,
+                expires_at=expires_at,
+                days_left=days_left,
+                urgency=_expiry_urgency(days_left)
+            ))
+        
+        return ExpiringVehicles(
+            buckets=[ExpiryBucket(days=bucket["days"], count=bucket["vehicle_count"]) for bucket in buckets],
+            items=items
+        )
+
+    async def search_vehicles(self, query: str, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0, cursor: Optional[str] = None) -> VehicleSearchResult:
+        """Search vehicles by plate number, owner name, or make/model in one ranked query"""
+        limit = clamp_page_size(limit)
+        params = {"p_query": query, "p_limit": limit, "p_offset": offset}
+        if cursor:
+            after_rank, after_id = decode_cursor(cursor)
+            params.update({"p_after_rank": after_rank, "p_after_id": after_id, "p_offset": 0})
+        
         try:
-            # Search by plate number
-            plate_response = supabase.table("vehicles").select("*").ilike("plate_number", f"%{query}%").execute()
-            
-            # Search by owner name
-            owner_response = supabase.table("vehicles").select("*").ilike("owner_name", f"%{query}%").execute()
+            response = supabase.rpc("search_vehicles", params).execute()
+            rows = response.data
             
-            # Search by make/model
-            make_response = supabase.table("vehicles").select("*").or_(f"make.ilike.%{query}%,model.ilike.%{query}%").execute()
+            next_cursor = None
+            if len(rows) == limit:
+                next_cursor = encode_cursor(rows[-1]["rank"], rows[-1]["id"])
             
-            # Combine and deduplicate results
-            all_vehicles = plate_response.data + owner_response.data + make_response.data
-            unique_vehicles = {v["id"]: v for v in all_vehicles}.values()
+            return VehicleSearchResult(
+                items=[_vehicle_from_row(row["vehicle"]) for row in rows],
+                next_cursor=next_cursor
+            )
             
-            vehicles = []
-            for vehicle_data in unique_vehicles:
-                vehicle = Vehicle(
-                    id=vehicle_data["id"],
-                    plate_number=vehicle_data["plate_number"],
-                    vehicle_type=VehicleType(vehicle_data["vehicle_type"]),
-                    make=vehicle_data["make"],
-                    model=vehicle_data["model"],
-                    year=vehicle_data["year"],
-                    color=vehicle_data["color"],
-                    engine_number=vehicle_data["engine_number"],
-                    chassis_number=vehicle_data["chassis_number"],
-                    owner_name=vehicle_data["owner_name"],
-                    owner_phone=vehicle_data["owner_phone"],
-                    owner_email=vehicle_data.get("owner_email"),
-                    owner_address=vehicle_data["owner_address"],
-                    registration_date=datetime.fromisoformat(vehicle_data["registration_date"]),
-                    expiry_date=datetime.fromisoformat(vehicle_data["expiry_date"]),
-                    insurance_expiry=datetime.fromisoformat(vehicle_data["insurance_expiry"]) if vehicle_data.get("insurance_expiry") else None,
-                    road_worthiness_expiry=datetime.fromisoformat(vehicle_data["road_worthiness_expiry"]) if vehicle_data.get("road_worthiness_expiry") else None,
-                    status=VehicleStatus(vehicle_data["status"]),
-                    created_at=datetime.fromisoformat(vehicle_data["created_at"]),
-                    updated_at=datetime.fromisoformat(vehicle_data["updated_at"]),
-                    registered_by=vehicle_data["registered_by"]
-                )
-                vehicles.append(vehicle)
+        except Exception as e:
+            print(f"Search vehicles error: {e}")
+            return VehicleSearchResult(items=[])
+
+    def _index_plate(self, plate_number: str):
+        self.plate_index.add(plate_number)
+        if self._plates_added_during_rebuild is not None:
+            self._plates_added_during_rebuild.append(plate_number)
+
+    def load_plate_index(self) -> PlateIndex:
+        """Build a fuzzy index of every registered plate number, paging through the table by id"""
+        index = PlateIndex()
+        plates = []
+        last_id = None
+        while True:
+            query = supabase.table("vehicles").select("id,plate_number").order("id").limit(PLATE_INDEX_PAGE_SIZE)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            rows = query.execute().data
+            plates.extend(row["plate_number"] for row in rows)
+            if len(rows) < PLATE_INDEX_PAGE_SIZE:
+                break
+            last_id = rows[-1]["id"]
+        index.build(plates)
+        return index
+
+    async def refresh_plate_index(self):
+        """Rebuild the plate index off the event loop and swap it in; concurrent callers share one rebuild"""
+        async def rebuild():
+            self._plates_added_during_rebuild = []
+            try:
+                index = await asyncio.to_thread(self.load_plate_index)
+                index.build(self._plates_added_during_rebuild)
+                self.plate_index = index
+                self.plate_index_built_at = time.monotonic()
+            finally:
+                self._plates_added_during_rebuild = None
+        
+        await self.single_flight.do(("plate_index",), rebuild)
+
+    def refresh_plate_index_in_background(self):
+        """Start a plate index rebuild on the running loop unless one is already going"""
+        if self._plate_index_refresh is None or self._plate_index_refresh.done():
+            self._plate_index_refresh = asyncio.create_task(self._refresh_plate_index_logged())
+
+    async def _refresh_plate_index_logged(self):
+        try:
+            await self.refresh_plate_index()
+        except Exception as e:
+            print(f"Plate index refresh error: {e}")
+
+    async def find_similar_plates(self, plate_number: str, max_distance: float = 1.0, limit: int = 5) -> List[PlateCandidate]:
+        """Get registered plates closest to a (possibly misread) plate number"""
+        try:
+            if not self.plate_index.loaded:
+                await self.refresh_plate_index()
+            elif time.monotonic() - self.plate_index_built_at > PLATE_INDEX_REFRESH_SECONDS:
+                # Serve from the current index while a fresh one loads
+                self.refresh_plate_index_in_background()
             
-            return vehicles
+            return [
+                PlateCandidate(plate_number=plate, distance=distance)
+                for plate, distance in self.plate_index.search(plate_number, max_distance, limit)
+            ]
             
         except Exception as e:
-            print(f"Search vehicles error: {e}")
-            return [] 
\ No newline at end of file
+            print(f"Find similar plates error: {e}")
+            return []
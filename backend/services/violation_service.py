@@ -1,33 +1,152 @@
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Tuple
+from datetime import date, datetime, timedelta, timezone
+import asyncio
+import os
 import uuid
+from postgrest.types import ReturnMethod
+from pydantic import ValidationError
 from database.supabase_client import supabase
-from models.violation import Violation, ViolationCreate, ViolationType, ViolationStatus, ViolationSeverity
+from database.pagination import DEFAULT_PAGE_SIZE, clamp_page_size, apply_keyset, split_page
+from services.violation_spool import ViolationSpool
+from services.evidence_store import EvidenceStore
+from services.metrics_broadcaster import metrics_broadcaster
+from services.cache import SingleFlight
+from models.violation import (
+    Violation, ViolationCreate, ViolationSummary, ViolationType, ViolationStatus, ViolationSeverity,
+    ViolationBulkItemResult, ViolationBulkResult, ViolationBulkReview, ViolationReviewResult,
+    ViolationBulkReviewResult, VIOLATION_SUMMARY_COLUMNS, VIOLATION_DETAIL_COLUMNS
+)
+
+# Rows per multi-row insert in create_violations
+BULK_INSERT_CHUNK_SIZE = 500
+
+# Ids per UPDATE in review_violations; keeps the in.(...) filter within URL length limits
+BULK_REVIEW_CHUNK_SIZE = 200
+REVIEW_CONFLICT_ERROR = "Violation not found, already reviewed, or leased by another supervisor"
+INVALID_ID_ERROR = "invalid id"
+
+# Chart periods: name -> (bucket unit, default number of buckets)
+CHART_PERIODS = {
+    "day": ("hour", 24),
+    "week": ("day", 7),
+    "month": ("day", 30),
+    "year": ("month", 12),
+}
+MAX_CHART_BUCKETS = 366
+
+# Review queue: how long a supervisor holds leased violations, and how many per lease call
+LEASE_SECONDS = int(os.getenv("VIOLATION_LEASE_SECONDS", "300"))
+MAX_LEASE_BATCH = 50
+
+# Acknowledge create_violation once the row is in the local spool instead of waiting for Supabase
+WRITE_BEHIND_ENABLED = os.getenv("VIOLATION_WRITE_BEHIND", "true").lower() == "true"
+
+def _violation_from_row(violation_data: dict) -> Violation:
+    """Build a Violation from a violations table row (evidence_image may be absent)"""
+    return Violation(
+        id=violation_data["id"],
+        plate_number=violation_data["plate_number"],
+        violation_type=ViolationType(violation_data["violation_type"]),
+        severity=ViolationSeverity(violation_data["severity"]),
+        location=violation_data["location"],
+        description=violation_data["description"],
+        fine_amount=violation_data["fine_amount"],
+        evidence_image=violation_data.get("evidence_image"),
+        evidence_hash=violation_data.get("evidence_hash"),
+        officer_notes=violation_data.get("officer_notes"),
+        status=ViolationStatus(violation_data["status"]),
+        reported_by=violation_data["reported_by"],
+        reported_at=datetime.fromisoformat(violation_data["reported_at"]),
+        reviewed_by=violation_data.get("reviewed_by"),
+        reviewed_at=datetime.fromisoformat(violation_data["reviewed_at"]) if violation_data.get("reviewed_at") else None,
+        rejection_reason=violation_data.get("rejection_reason"),
+        lease_owner=violation_data.get("lease_owner"),
+        lease_expires_at=datetime.fromisoformat(violation_data["lease_expires_at"]) if violation_data.get("lease_expires_at") else None,
+        created_at=datetime.fromisoformat(violation_data["created_at"]),
+        updated_at=datetime.fromisoformat(violation_data["updated_at"])
+    )
+
+def _truncate_to_bucket(moment: datetime, bucket: str) -> datetime:
+    if bucket == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if bucket == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def _shift_bucket(moment: datetime, bucket: str, steps: int) -> datetime:
+    if bucket == "hour":
+        return moment + timedelta(hours=steps)
+    if bucket == "day":
+        return moment + timedelta(days=steps)
+    month_index = moment.year * 12 + moment.month - 1 + steps
+    return moment.replace(year=month_index // 12, month=month_index % 12 + 1)
+
+def _canonical_ids(violation_ids: List[str]) -> dict:
+    """
+    Map each well-formed violation id to its canonical UUID text.
+    
+    Malformed ids are left out: one of them in an in.(...) filter would make
+    Postgres reject the whole statement.
+    """
+    canonical = {}
+    for violation_id in violation_ids:
+        try:
+            canonical[violation_id] = str(uuid.UUID(violation_id))
+        except (TypeError, ValueError, AttributeError):
+            continue
+    return canonical
+
+def _violation_summary_from_row(violation_data: dict) -> ViolationSummary:
+    """Build a ViolationSummary from a row selected with VIOLATION_SUMMARY_COLUMNS"""
+    return ViolationSummary(**_violation_from_row(violation_data).model_dump(exclude={"evidence_image"}))
 
 class ViolationService:
     def __init__(self):
-        pass
+        self.spool = ViolationSpool(self.write_violation_rows) if WRITE_BEHIND_ENABLED else None
+        self.evidence_store = EvidenceStore()
+        self.single_flight = SingleFlight()
+
+    def write_violation_rows(self, rows: List[dict]):
+        """Spool writer: the client-generated id doubles as the idempotency key"""
+        supabase.table("violations").upsert(
+            rows, on_conflict="id", ignore_duplicates=True, returning=ReturnMethod.minimal
+        ).execute()
+        metrics_broadcaster.notify("violations")
+
+    def _build_violation_row(self, violation_data: ViolationCreate, reported_by: str, timestamp: str) -> dict:
+        """Row for the violations table; server-generated fields share one timestamp"""
+        # Inline images go to the evidence store; the row only keeps the hash
+        evidence_image, evidence_hash = self.evidence_store.ingest(violation_data.evidence_image)
+        return {
+            "id": str(uuid.uuid4()),
+            "plate_number": violation_data.plate_number,
+            "violation_type": violation_data.violation_type.value,
+            "severity": violation_data.severity.value,
+            "location": violation_data.location,
+            "description": violation_data.description,
+            "fine_amount": violation_data.fine_amount,
+            "evidence_image": evidence_image,
+            "evidence_hash": evidence_hash,
+            "officer_notes": violation_data.officer_notes,
+            "status": "pending",
+            "reported_by": reported_by,
+            "reported_at": timestamp,
+            "created_at": timestamp,
+            "updated_at": timestamp
+        }
 
     async def create_violation(self, violation_data: ViolationCreate, reported_by: str) -> Violation:
         """Create a new violation record"""
         try:
-            # Create violation data
-            violation_dict = {
-                "id": str(uuid.uuid4()),
-                "plate_number": violation_data.plate_number,
-                "violation_type": violation_data.violation_type.value,
-                "severity": violation_data.severity.value,
-                "location": violation_data.location,
-                "description": violation_data.description,
-                "fine_amount": violation_data.fine_amount,
-                "evidence_image": violation_data.evidence_image,
-                "officer_notes": violation_data.officer_notes,
-                "status": "pending",
-                "reported_by": reported_by,
-                "reported_at": datetime.utcnow().isoformat(),
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
-            }
+            # Create violation data (decoding, hashing and storing the evidence happen off the event loop)
+            violation_dict = await asyncio.to_thread(
+                self._build_violation_row, violation_data, reported_by, datetime.utcnow().isoformat()
+            )
+            
+            if self.spool:
+                # Durable locally; the spool flusher writes it to Supabase in the background
+                await asyncio.to_thread(self.spool.append, violation_dict)
+                return _violation_from_row(violation_dict)
             
             # Insert into Supabase
             response = supabase.table("violations").insert(violation_dict).execute()
@@ -36,170 +155,295 @@ class ViolationService:
                 raise ValueError("Failed to create violation")
             
             created_violation = response.data[0]
+            metrics_broadcaster.notify("violations")
             
             # Return Violation object
-            return Violation(
-                id=created_violation["id"],
-                plate_number=created_violation["plate_number"],
-                violation_type=ViolationType(created_violation["violation_type"]),
-                severity=ViolationSeverity(created_violation["severity"]),
-                location=created_violation["location"],
-                description=created_violation["description"],
-                fine_amount=created_violation["fine_amount"],
-                evidence_image=created_violation.get("evidence_image"),
-                officer_notes=created_violation.get("officer_notes"),
-                status=ViolationStatus(created_violation["status"]),
-                reported_by=created_violation["reported_by"],
-                reported_at=datetime.fromisoformat(created_violation["reported_at"]),
-                reviewed_by=created_violation.get("reviewed_by"),
-                reviewed_at=datetime.fromisoformat(created_violation["reviewed_at"]) if created_violation.get("reviewed_at") else None,
-                rejection_reason=created_violation.get("rejection_reason"),
-                created_at=datetime.fromisoformat(created_violation["created_at"]),
-                updated_at=datetime.fromisoformat(created_violation["updated_at"])
-            )
+            return _violation_from_row(created_violation)
             
         except Exception as e:
             print(f"Violation creation error: {e}")
             raise e
 
-    async def get_violations(self, plate_number: Optional[str] = None, status: Optional[str] = None, user_id: Optional[str] = None) -> List[Violation]:
-        """Get violations with optional filtering"""
+    async def create_violations(self, records: List[dict], reported_by: str) -> ViolationBulkResult:
+        """
+        Validate and insert many violations with chunked multi-row inserts.
+
+        Each record is validated as a ViolationCreate; invalid records are
+        reported and skipped. If a chunk insert fails its rows are retried one
+        by one so the failure can be pinned to the offending records.
+        """
+        timestamp = datetime.utcnow().isoformat()
+        results: List[ViolationBulkItemResult] = []
+        pending = []
+        
+        def build_rows():
+            for index, record in enumerate(records):
+                try:
+                    violation_data = ViolationCreate.model_validate(record)
+                    pending.append((index, self._build_violation_row(violation_data, reported_by, timestamp)))
+                except (ValidationError, ValueError) as e:
+                    results.append(ViolationBulkItemResult(index=index, success=False, error=str(e)))
+        
+        # Evidence decoding and storage run off the event loop
+        await asyncio.to_thread(build_rows)
+        
+        for start in range(0, len(pending), BULK_INSERT_CHUNK_SIZE):
+            chunk = pending[start:start + BULK_INSERT_CHUNK_SIZE]
+            results.extend(await asyncio.to_thread(self._insert_violation_chunk, chunk))
+        
+        results.sort(key=lambda result: result.index)
+        created = sum(1 for result in results if result.success)
+        if created:
+            metrics_broadcaster.notify("violations")
+        return ViolationBulkResult(created=created, failed=len(results) - created, results=results)
+
+    def _insert_violation_chunk(self, chunk: List[Tuple[int, dict]]) -> List[ViolationBulkItemResult]:
+        """Insert one chunk of (record index, row) pairs, falling back to row-by-row writes"""
         try:
-            query = supabase.table("violations").select("*")
-            
-            if plate_number:
-                query = query.eq("plate_number", plate_number)
-            
-            if status:
-                query = query.eq("status", status)
-            
-            if user_id:
-                query = query.eq("reported_by", user_id)
-            
-            response = query.execute()
+            supabase.table("violations").insert([row for _, row in chunk], returning=ReturnMethod.minimal).execute()
+            return [ViolationBulkItemResult(index=index, success=True, violation_id=row["id"]) for index, row in chunk]
+        except Exception as e:
+            print(f"Bulk violation insert error, retrying rows individually: {e}")
+        
+        results = []
+        for index, row in chunk:
+            try:
+                # The chunk may have committed before the error reached us; ids are
+                # generated here, so a row that already exists was ours and counts as created
+                supabase.table("violations").upsert(
+                    row, on_conflict="id", ignore_duplicates=True, returning=ReturnMethod.minimal
+                ).execute()
+                results.append(ViolationBulkItemResult(index=index, success=True, violation_id=row["id"]))
+            except Exception as row_error:
+                results.append(ViolationBulkItemResult(index=index, success=False, error=str(row_error)))
+        return results
+
+    async def get_violations(
+        self,
+        plate_number: Optional[str] = None,
+        status: Optional[str] = None,
+        user_id: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[ViolationSummary], Optional[str]]:
+        """
+        Get one page of violations (newest first) with optional filtering, plus the next-page cursor.
+        
+        Concurrent identical lookups (the same officer's plate scanned again
+        while the first query is still running) share one query. Different
+        officers never share a page, since each only sees their own reports.
+        """
+        limit = clamp_page_size(limit)
+        query = supabase.table("violations").select(VIOLATION_SUMMARY_COLUMNS)
+        
+        if plate_number:
+            query = query.eq("plate_number", plate_number)
+        
+        if status:
+            query = query.eq("status", status)
+        
+        if user_id:
+            query = query.eq("reported_by", user_id)
+        
+        # Raises ValueError for a malformed cursor
+        query = apply_keyset(query, cursor, limit)
+        
+        try:
+            response = await self.single_flight.do(
+                ("violations", plate_number, status, user_id, limit, cursor), lambda: asyncio.to_thread(query.execute)
+            )
+            rows, next_cursor = split_page(response.data, limit)
             
             violations = []
-            for violation_data in response.data:
-                violation = Violation(
-                    id=violation_data["id"],
-                    plate_number=violation_data["plate_number"],
-                    violation_type=ViolationType(violation_data["violation_type"]),
-                    severity=ViolationSeverity(violation_data["severity"]),
-                    location=violation_data["location"],
-                    description=violation_data["description"],
-                    fine_amount=violation_data["fine_amount"],
-                    evidence_image=violation_data.get("evidence_image"),
-                    officer_notes=violation_data.get("officer_notes"),
-                    status=ViolationStatus(violation_data["status"]),
-                    reported_by=violation_data["reported_by"],
-                    reported_at=datetime.fromisoformat(violation_data["reported_at"]),
-                    reviewed_by=violation_data.get("reviewed_by"),
-                    reviewed_at=datetime.fromisoformat(violation_data["reviewed_at"]) if violation_data.get("reviewed_at") else None,
-                    rejection_reason=violation_data.get("rejection_reason"),
-                    created_at=datetime.fromisoformat(violation_data["created_at"]),
-                    updated_at=datetime.fromisoformat(violation_data["updated_at"])
-                )
+            for violation_data in rows:
+                violation = _violation_summary_from_row(violation_data)
                 violations.append(violation)
             
-            return violations
+            return violations, next_cursor
             
         except Exception as e:
             print(f"Get violations error: {e}")
-            return []
+            return [], None
 
-    async def get_violation_by_id(self, violation_id: str) -> Optional[Violation]:
-        """Get violation by ID"""
+    async def get_violation_by_id(self, violation_id: str, include_evidence: bool = False) -> Optional[Violation]:
+        """Get violation by ID; evidence_image is only loaded when include_evidence is set"""
         try:
-            response = supabase.table("violations").select("*").eq("id", violation_id).execute()
+            columns = VIOLATION_DETAIL_COLUMNS if include_evidence else VIOLATION_SUMMARY_COLUMNS
+            response = supabase.table("violations").select(columns).eq("id", violation_id).execute()
             
             if not response.data:
                 return None
             
             violation_data = response.data[0]
             
-            return Violation(
-                id=violation_data["id"],
-                plate_number=violation_data["plate_number"],
-                violation_type=ViolationType(violation_data["violation_type"]),
-                severity=ViolationSeverity(violation_data["severity"]),
-                location=violation_data["location"],
-                description=violation_data["description"],
-                fine_amount=violation_data["fine_amount"],
-                evidence_image=violation_data.get("evidence_image"),
-                officer_notes=violation_data.get("officer_notes"),
-                status=ViolationStatus(violation_data["status"]),
-                reported_by=violation_data["reported_by"],
-                reported_at=datetime.fromisoformat(violation_data["reported_at"]),
-                reviewed_by=violation_data.get("reviewed_by"),
-                reviewed_at=datetime.fromisoformat(violation_data["reviewed_at"]) if violation_data.get("reviewed_at") else None,
-                rejection_reason=violation_data.get("rejection_reason"),
-                created_at=datetime.fromisoformat(violation_data["created_at"]),
-                updated_at=datetime.fromisoformat(violation_data["updated_at"])
-            )
+            return _violation_from_row(violation_data)
             
         except Exception as e:
             print(f"Get violation by ID error: {e}")
             return None
 
+    async def get_violation_evidence(self, violation_id: str) -> Optional[dict]:
+        """Load only the evidence reference (or legacy inline image) of a violation"""
+        try:
+            response = supabase.table("violations").select("evidence_image,evidence_hash").eq("id", violation_id).execute()
+            
+            if not response.data:
+                return None
+            
+            evidence = response.data[0]
+            if not evidence.get("evidence_image") and not evidence.get("evidence_hash"):
+                return None
+            
+            return evidence
+            
+        except Exception as e:
+            print(f"Get violation evidence error: {e}")
+            return None
+
+    async def lease_violations(self, reviewer_id: str, limit: int = 10) -> List[ViolationSummary]:
+        """
+        Lease the oldest pending violations that nobody else holds.
+        
+        Rows are claimed with FOR UPDATE SKIP LOCKED, so concurrent supervisors
+        never get the same item. A supervisor's own unexpired leases are
+        returned again (and renewed), which makes the call safe to retry and
+        doubles as a heartbeat. Leases lapse after LEASE_SECONDS.
+        """
+        response = supabase.rpc("lease_pending_violations", {
+            "p_owner": reviewer_id,
+            "p_limit": min(max(limit, 1), MAX_LEASE_BATCH),
+            "p_lease_seconds": LEASE_SECONDS
+        }).select(VIOLATION_SUMMARY_COLUMNS).execute()
+        
+        violations = [_violation_summary_from_row(row) for row in response.data]
+        violations.sort(key=lambda violation: (violation.created_at, violation.id))
+        return violations
+
+    async def release_violations(self, violation_ids: List[str], reviewer_id: str) -> int:
+        """Hand leased violations back to the queue; returns how many were released"""
+        # Malformed ids can't be leased by anyone
+        violation_ids = list(set(_canonical_ids(violation_ids).values()))
+        if not violation_ids:
+            return 0
+        response = supabase.table("violations").update({
+            "lease_owner": None,
+            "lease_expires_at": None
+        }).eq("lease_owner", reviewer_id).eq("status", "pending").in_("id", violation_ids).execute()
+        return len(response.data)
+
+    def _review_update(self, violation_ids: List[str], reviewer_id: str, changes: dict) -> List[str]:
+        """
+        Update pending violations that no other supervisor holds an active lease on.
+        
+        One UPDATE for all ids; reviewing also releases the lease. Returns the
+        ids that were actually updated.
+        
+        Leasing is optional: the review screens open violations straight from
+        the pending list, so unleased (or lapsed) items can be reviewed too.
+        Two supervisors reviewing the same unleased item can't both succeed:
+        the UPDATE only matches rows still pending, so the second one gets
+        nothing back and reports a conflict. Leases exist to keep supervisors
+        from working on the same items, not to make reviews safe.
+        """
+        if '"' in reviewer_id:
+            raise ValueError("Invalid reviewer id")
+        now = datetime.now(timezone.utc).isoformat()
+        response = supabase.table("violations").update({
+            **changes,
+            "reviewed_by": reviewer_id,
+            "reviewed_at": now,
+            "updated_at": now,
+            "lease_owner": None,
+            "lease_expires_at": None
+        }).in_("id", violation_ids).eq("status", "pending").or_(
+            f'lease_owner.is.null,lease_owner.eq."{reviewer_id}",lease_expires_at.lt."{now}"'
+        ).select("id").execute()
+        return [row["id"] for row in response.data]
+
     async def approve_violation(self, violation_id: str, reviewer_id: str) -> bool:
-        """Approve a violation (supervisor only)"""
+        """Approve a pending violation (supervisor only); False if missing, reviewed, or leased by someone else"""
+        if not _canonical_ids([violation_id]):
+            return False
         try:
-            response = supabase.table("violations").update({
-                "status": "approved",
-                "reviewed_by": reviewer_id,
-                "reviewed_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
-            }).eq("id", violation_id).execute()
+            updated = self._review_update([violation_id], reviewer_id, {"status": "approved"})
             
-            return len(response.data) > 0
+            if updated:
+                metrics_broadcaster.notify("violations")
+            return len(updated) > 0
             
         except Exception as e:
             print(f"Approve violation error: {e}")
             return False
 
     async def reject_violation(self, violation_id: str, reason: str, reviewer_id: str) -> bool:
-        """Reject a violation (supervisor only)"""
+        """Reject a pending violation (supervisor only); False if missing, reviewed, or leased by someone else"""
+        if not _canonical_ids([violation_id]):
+            return False
         try:
-            response = supabase.table("violations").update({
-                "status": "rejected",
-                "rejection_reason": reason,
-                "reviewed_by": reviewer_id,
-                "reviewed_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
-            }).eq("id", violation_id).execute()
+            updated = self._review_update([violation_id], reviewer_id, {"status": "rejected", "rejection_reason": reason})
             
-            return len(response.data) > 0
+            if updated:
+                metrics_broadcaster.notify("violations")
+            return len(updated) > 0
             
         except Exception as e:
             print(f"Reject violation error: {e}")
             return False
 
-    async def get_pending_violations(self) -> List[Violation]:
+    async def review_violations(self, review: ViolationBulkReview, reviewer_id: str) -> ViolationBulkReviewResult:
+        """
+        Approve and reject many violations with one UPDATE per decision (per chunk of ids).
+        
+        Each id gets a result; ids that are malformed, missing, already
+        reviewed, or leased by another supervisor fail without affecting the rest.
+        """
+        results = {}
+        canonical = _canonical_ids(review.approve + review.reject)
+        for violation_id in dict.fromkeys(review.approve + review.reject):
+            if violation_id not in canonical:
+                results[violation_id] = ViolationReviewResult(violation_id=violation_id, success=False, error=INVALID_ID_ERROR)
+        for violation_id in set(review.approve) & set(review.reject):
+            results.setdefault(violation_id, ViolationReviewResult(violation_id=violation_id, success=False, error="Both approved and rejected"))
+        
+        decisions = [
+            (ViolationStatus.APPROVED, review.approve, {"status": "approved"}),
+            (ViolationStatus.REJECTED, review.reject, {"status": "rejected", "rejection_reason": review.rejection_reason})
+        ]
+        for status, violation_ids, changes in decisions:
+            violation_ids = list(dict.fromkeys(violation_id for violation_id in violation_ids if violation_id not in results))
+            for start in range(0, len(violation_ids), BULK_REVIEW_CHUNK_SIZE):
+                chunk = violation_ids[start:start + BULK_REVIEW_CHUNK_SIZE]
+                try:
+                    updated = set(self._review_update(list({canonical[violation_id] for violation_id in chunk}), reviewer_id, changes))
+                    error = REVIEW_CONFLICT_ERROR
+                except Exception as e:
+                    print(f"Bulk review error: {e}")
+                    updated, error = set(), str(e)
+                for violation_id in chunk:
+                    if canonical[violation_id] in updated:
+                        results[violation_id] = ViolationReviewResult(violation_id=violation_id, success=True, status=status)
+                    else:
+                        results[violation_id] = ViolationReviewResult(violation_id=violation_id, success=False, error=error)
+        
+        approved = sum(1 for result in results.values() if result.success and result.status == ViolationStatus.APPROVED)
+        rejected = sum(1 for result in results.values() if result.success and result.status == ViolationStatus.REJECTED)
+        if approved or rejected:
+            metrics_broadcaster.notify("violations")
+        return ViolationBulkReviewResult(
+            approved=approved,
+            rejected=rejected,
+            failed=len(results) - approved - rejected,
+            results=list(results.values())
+        )
+
+    async def get_pending_violations(self) -> List[ViolationSummary]:
         """Get all pending violations for supervisor review"""
         try:
-            response = supabase.table("violations").select("*").eq("status", "pending").execute()
+            response = supabase.table("violations").select(VIOLATION_SUMMARY_COLUMNS).eq("status", "pending").execute()
             
             violations = []
             for violation_data in response.data:
-                violation = Violation(
-                    id=violation_data["id"],
-                    plate_number=violation_data["plate_number"],
-                    violation_type=ViolationType(violation_data["violation_type"]),
-                    severity=ViolationSeverity(violation_data["severity"]),
-                    location=violation_data["location"],
-                    description=violation_data["description"],
-                    fine_amount=violation_data["fine_amount"],
-                    evidence_image=violation_data.get("evidence_image"),
-                    officer_notes=violation_data.get("officer_notes"),
-                    status=ViolationStatus(violation_data["status"]),
-                    reported_by=violation_data["reported_by"],
-                    reported_at=datetime.fromisoformat(violation_data["reported_at"]),
-                    reviewed_by=violation_data.get("reviewed_by"),
-                    reviewed_at=datetime.fromisoformat(violation_data["reviewed_at"]) if violation_data.get("reviewed_at") else None,
-                    rejection_reason=violation_data.get("rejection_reason"),
-                    created_at=datetime.fromisoformat(violation_data["created_at"]),
-                    updated_at=datetime.fromisoformat(violation_data["updated_at"])
-                )
+                violation = _violation_summary_from_row(violation_data)
                 violations.append(violation)
             
             return violations
@@ -211,34 +455,21 @@ class ViolationService:
     async def get_violation_statistics(self) -> dict:
         """Get violation statistics for dashboard"""
         try:
-            # Get total violations
-            total_response = supabase.table("violations").select("id", count="exact").execute()
-            total_violations = total_response.count if total_response.count else 0
-            
-            # Get pending violations
-            pending_response = supabase.table("violations").select("id", count="exact").eq("status", "pending").execute()
-            pending_violations = pending_response.count if pending_response.count else 0
+            # Summed from the trigger-maintained daily counters: a row per
+            # (status, violation_type), without touching the violations table
+            response = supabase.rpc("violation_counter_totals").execute()
             
-            # Get approved violations
-            approved_response = supabase.table("violations").select("id", count="exact").eq("status", "approved").execute()
-            approved_violations = approved_response.count if approved_response.count else 0
-            
-            # Get rejected violations
-            rejected_response = supabase.table("violations").select("id", count="exact").eq("status", "rejected").execute()
-            rejected_violations = rejected_response.count if rejected_response.count else 0
-            
-            # Get violations by type
-            type_response = supabase.table("violations").select("violation_type").execute()
+            status_counts = {}
             violation_types = {}
-            for violation in type_response.data:
-                v_type = violation["violation_type"]
-                violation_types[v_type] = violation_types.get(v_type, 0) + 1
+            for group in response.data:
+                status_counts[group["status"]] = status_counts.get(group["status"], 0) + group["violation_count"]
+                violation_types[group["violation_type"]] = violation_types.get(group["violation_type"], 0) + group["violation_count"]
             
             return {
-                "total_violations": total_violations,
-                "pending_violations": pending_violations,
-                "approved_violations": approved_violations,
-                "rejected_violations": rejected_violations,
+                "total_violations": sum(status_counts.values()),
+                "pending_violations": status_counts.get("pending", 0),
+                "approved_violations": status_counts.get("approved", 0),
+                "rejected_violations": status_counts.get("rejected", 0),
                 "violation_types": violation_types
             }
             
@@ -255,44 +486,34 @@ class ViolationService:
     async def get_violation_stats(self) -> dict:
         """Get violation statistics for supervisor dashboard"""
         try:
-            # Get today's violations
+            # Per-day counters are maintained by a trigger on violations, so the
+            # last 7 days are at most 7 x statuses x types small rows
             today = datetime.utcnow().date()
-            today_start = datetime.combine(today, datetime.min.time()).isoformat()
-            today_end = datetime.combine(today, datetime.max.time()).isoformat()
-            
-            # Get violations for today
-            today_response = supabase.table("violations").select("*").gte("created_at", today_start).lte("created_at", today_end).execute()
+            week_start = today - timedelta(days=6)
+            response = supabase.table("violation_daily_counters").select("day,status,count").gte("day", week_start.isoformat()).execute()
             
-            total_today = len(today_response.data)
-            accepted = len([v for v in today_response.data if v["status"] == "approved"])
-            rejected = len([v for v in today_response.data if v["status"] == "rejected"])
-            pending = len([v for v in today_response.data if v["status"] == "pending"])
+            daily_counts = {}
+            for counter in response.data:
+                day_counts = daily_counts.setdefault(counter["day"], {})
+                day_counts[counter["status"]] = day_counts.get(counter["status"], 0) + counter["count"]
             
-            # Get weekly data (last 7 days)
-            week_ago = datetime.utcnow() - timedelta(days=7)
-            weekly_response = supabase.table("violations").select("*").gte("created_at", week_ago.isoformat()).execute()
+            today_counts = daily_counts.get(today.isoformat(), {})
             
             weekly_data = []
             for i in range(7):
-                day = datetime.utcnow() - timedelta(days=i)
-                day_start = datetime.combine(day.date(), datetime.min.time()).isoformat()
-                day_end = datetime.combine(day.date(), datetime.max.time()).isoformat()
-                
-                day_violations = [v for v in weekly_response.data if day_start <= v["created_at"] <= day_end]
-                day_accepted = len([v for v in day_violations if v["status"] == "approved"])
-                day_rejected = len([v for v in day_violations if v["status"] == "rejected"])
-                
+                day = today - timedelta(days=i)
+                day_counts = daily_counts.get(day.isoformat(), {})
                 weekly_data.append({
                     "day": day.strftime("%a"),
-                    "accepted": day_accepted,
-                    "rejected": day_rejected
+                    "accepted": day_counts.get("approved", 0),
+                    "rejected": day_counts.get("rejected", 0)
                 })
             
             return {
-                "totalToday": total_today,
-                "accepted": accepted,
-                "rejected": rejected,
-                "pending": pending,
+                "totalToday": sum(today_counts.values()),
+                "accepted": today_counts.get("approved", 0),
+                "rejected": today_counts.get("rejected", 0),
+                "pending": today_counts.get("pending", 0),
                 "weeklyData": weekly_data
             }
             
@@ -315,15 +536,72 @@ class ViolationService:
                 ]
             }
 
+    async def get_violation_chart(
+        self,
+        period: str = "week",
+        buckets: Optional[int] = None,
+        end: Optional[date] = None,
+        location: Optional[str] = None,
+        violation_type: Optional[str] = None
+    ) -> dict:
+        """
+        Chart series of violation counts per status from the hourly rollups.
+        
+        `period` picks the bucket size (day -> hours, week/month -> days,
+        year -> months) and the default number of buckets; `end` is the last
+        day shown (default today, UTC).
+        """
+        if period not in CHART_PERIODS:
+            raise ValueError(f"period must be one of: {', '.join(CHART_PERIODS)}")
+        bucket, default_buckets = CHART_PERIODS[period]
+        buckets = min(max(buckets or default_buckets, 1), MAX_CHART_BUCKETS)
+        
+        now = datetime.now(timezone.utc)
+        if end is not None and end < now.date():
+            now = datetime.combine(end, datetime.max.time(), tzinfo=timezone.utc)
+        last_bucket = _truncate_to_bucket(now, bucket)
+        range_start = _shift_bucket(last_bucket, bucket, -(buckets - 1))
+        range_end = _shift_bucket(last_bucket, bucket, 1)
+        
+        response = supabase.rpc("violation_chart", {
+            "p_start": range_start.isoformat(),
+            "p_end": range_end.isoformat(),
+            "p_bucket": bucket,
+            "p_location": location,
+            "p_violation_type": violation_type
+        }).execute()
+        
+        counts = {}
+        for row in response.data:
+            bucket_counts = counts.setdefault(datetime.fromisoformat(row["bucket"]), {})
+            bucket_counts[row["status"]] = row["violation_count"]
+        
+        series = []
+        for i in range(buckets):
+            bucket_start = _shift_bucket(range_start, bucket, i)
+            bucket_counts = counts.get(bucket_start, {})
+            point = {"bucket": bucket_start.isoformat(), "total": sum(bucket_counts.values())}
+            for status in ViolationStatus:
+                point[status.value] = bucket_counts.get(status.value, 0)
+            series.append(point)
+        
+        return {
+            "period": period,
+            "bucket": bucket,
+            "start": range_start.isoformat(),
+            "end": range_end.isoformat(),
+            "series": series
+        }
+
     async def get_officer_stats(self) -> dict:
         """Get officer performance statistics"""
         try:
-            # Get violations grouped by officer
-            response = supabase.table("violations").select("reported_by, status").execute()
+            # One counter row per (officer, status), maintained by a trigger on violations
+            response = supabase.table("violation_officer_counters").select("reported_by,status,count").gt("count", 0).execute()
             
             officer_stats = {}
-            for violation in response.data:
-                officer_id = violation["reported_by"]
+            for counter in response.data:
+                officer_id = counter["reported_by"] or None
                 if officer_id not in officer_stats:
                     officer_stats[officer_id] = {
                         "total": 0,
@@ -332,10 +610,10 @@ class ViolationService:
                         "pending": 0
                     }
                 
-                officer_stats[officer_id]["total"] += 1
-                status = violation["status"]
+                officer_stats[officer_id]["total"] += counter["count"]
+                status = counter["status"]
                 if status in officer_stats[officer_id]:
-                    officer_stats[officer_id][status] += 1
+                    officer_stats[officer_id][status] += counter["count"]
             
             return {
                 "officer_stats": officer_stats,
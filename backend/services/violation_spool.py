@@ -0,0 +1,222 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, List, Optional
+from postgrest.exceptions import APIError
+
+SPOOL_PATH = os.getenv("VIOLATION_SPOOL_PATH", "spool/violations.db")
+FLUSH_INTERVAL_SECONDS = 1.0
+FLUSH_BATCH_SIZE = 500
+MAX_FLUSH_ATTEMPTS = 10
+MAX_BACKOFF_SECONDS = 60
+# SQLSTATE classes that pin a failure on the rows themselves: 22 data exception, 23 integrity constraint
+ROW_ERROR_SQLSTATE_CLASSES = ("22", "23")
+
+
+def is_row_error(error: Exception) -> bool:
+    """True if the database rejected the rows, False for connection or server trouble"""
+    return isinstance(error, APIError) and (error.code or "")[:2] in ROW_ERROR_SQLSTATE_CLASSES
+
+
+class ViolationSpool:
+    """
+    Durable write-behind queue for violation rows.
+
+    Rows are committed to a local SQLite database in WAL mode before the
+    caller is acknowledged. A background task drains the spool in batches
+    through `writer`, which must be idempotent on the row id (the flusher may
+    resend a batch after a partial failure).
+
+    When a batch fails because the database is unreachable or erroring, the
+    whole spool backs off exponentially and no row is charged, so an outage
+    of any length loses nothing. Only failures `row_error` blames on the rows
+    (constraint violations, bad values) are isolated row by row; those rows
+    back off on their own and move to a dead-letter table after
+    MAX_FLUSH_ATTEMPTS, from where requeue_dead_letters() puts them back.
+    """
+
+    def __init__(
+        self,
+        writer: Callable[[List[dict]], None],
+        path: str = SPOOL_PATH,
+        row_error: Callable[[Exception], bool] = is_row_error
+    ):
+        self.writer = writer
+        self.path = path
+        self.row_error = row_error
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._batch_failures = 0
+        self._backoff_until = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS spool (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT UNIQUE NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS dead_letter (
+                id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                error TEXT,
+                failed_at REAL NOT NULL
+            )
+        """)
+
+    def append(self, row: dict):
+        """Durably enqueue a row; returns once it is on local disk"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO spool (id, payload) VALUES (?, ?)",
+                (row["id"], json.dumps(row, default=str))
+            )
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def dead_letter_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+
+    def requeue_dead_letters(self) -> int:
+        """Move every dead-lettered row back into the spool with a fresh attempt count"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            requeued = self._conn.execute(
+                "INSERT OR IGNORE INTO spool (id, payload) SELECT id, payload FROM dead_letter ORDER BY failed_at"
+            ).rowcount
+            self._conn.execute("DELETE FROM dead_letter")
+            self._conn.execute("COMMIT")
+        return requeued
+
+    def backing_off(self) -> bool:
+        """True while the spool waits out a batch-level failure"""
+        return time.time() < self._backoff_until
+
+    def _has_due_rows(self) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM spool WHERE next_attempt_at <= ? LIMIT 1", (time.time(),)
+            ).fetchone() is not None
+
+    def _back_off(self, error: Exception):
+        """Pause the whole spool after a failure that isn't the rows' fault"""
+        self._batch_failures += 1
+        backoff = min(2 ** self._batch_failures, MAX_BACKOFF_SECONDS)
+        self._backoff_until = time.time() + backoff
+        print(f"Violation spool flush failed, retrying in {backoff}s: {error}")
+
+    def flush(self) -> int:
+        """Write one batch of due rows through the writer; returns how many were flushed"""
+        if self.backing_off():
+            return 0
+        with self._lock:
+            batch = self._conn.execute(
+                "SELECT seq, id, payload, attempts FROM spool WHERE next_attempt_at <= ? ORDER BY seq LIMIT ?",
+                (time.time(), FLUSH_BATCH_SIZE)
+            ).fetchall()
+        if not batch:
+            return 0
+
+        try:
+            self.writer([json.loads(payload) for _, _, payload, _ in batch])
+            self._delete([seq for seq, _, _, _ in batch])
+            self._batch_failures = 0
+            return len(batch)
+        except Exception as e:
+            if not self.row_error(e):
+                self._back_off(e)
+                return 0
+            print(f"Violation spool batch rejected, retrying rows individually: {e}")
+
+        # Isolate the rows that are actually failing so they don't hold back the rest
+        flushed = 0
+        for seq, row_id, payload, attempts in batch:
+            try:
+                self.writer([json.loads(payload)])
+                self._delete([seq])
+                flushed += 1
+            except Exception as e:
+                if not self.row_error(e):
+                    # The database went away mid-isolation; leave the remaining rows uncharged
+                    self._back_off(e)
+                    return flushed
+                self._record_failure(seq, row_id, payload, attempts + 1, str(e))
+        self._batch_failures = 0
+        return flushed
+
+    def drain(self) -> int:
+        """Flush until the spool is empty or nothing more can be written right now"""
+        flushed = 0
+        while True:
+            batch_flushed = self.flush()
+            flushed += batch_flushed
+            if batch_flushed == 0 and (self.backing_off() or not self._has_due_rows()):
+                return flushed
+
+    def _delete(self, seqs: List[int]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM spool WHERE seq = ?", [(seq,) for seq in seqs])
+
+    def _record_failure(self, seq: int, row_id: str, payload: str, attempts: int, error: str):
+        with self._lock:
+            if attempts >= MAX_FLUSH_ATTEMPTS:
+                print(f"Violation {row_id} moved to dead letter after {attempts} attempts: {error}")
+                self._conn.execute("BEGIN")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO dead_letter (id, payload, error, failed_at) VALUES (?, ?, ?, ?)",
+                    (row_id, payload, error, time.time())
+                )
+                self._conn.execute("DELETE FROM spool WHERE seq = ?", (seq,))
+                self._conn.execute("COMMIT")
+            else:
+                backoff = min(2 ** attempts, MAX_BACKOFF_SECONDS)
+                self._conn.execute(
+                    "UPDATE spool SET attempts = ?, next_attempt_at = ? WHERE seq = ?",
+                    (attempts, time.time() + backoff, seq)
+                )
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                flushed = await asyncio.to_thread(self.flush)
+            except Exception as e:
+                print(f"Violation spool flusher error: {e}")
+                flushed = 0
+            # Keep draining while there is a backlog, otherwise wait for more rows
+            if flushed < FLUSH_BATCH_SIZE:
+                await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+
+    def start(self):
+        """Start the background flusher on the running event loop"""
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher, then drain whatever the database will take"""
+        self._stopping = True
+        if self._task is not None:
+            await self._task
+            self._task = None
+        # Give the database one more chance even if the spool is backing off
+        self._backoff_until = 0.0
+        await asyncio.to_thread(self.drain)
+        remaining = await asyncio.to_thread(self.pending_count)
+        if remaining:
+            print(f"Violation spool stopped with {remaining} rows pending; they will be flushed on next start")
@@ -125,13 +125,55 @@ async def create_unified_schema():
     ADD COLUMN IF NOT EXISTS dvla_user_id BIGINT REFERENCES dvla_users(id);
     """
     
+    # next_expiry_at is the earliest of the three expiry dates (LEAST skips NULLs),
+    # so one index orders vehicles by when they next lapse
     enhance_vehicles_sql = """
     ALTER TABLE vehicles
-    ADD COLUMN IF NOT EXISTS dvla_vehicle_id BIGINT REFERENCES dvla_vehicles(id);
+    ADD COLUMN IF NOT EXISTS dvla_vehicle_id BIGINT REFERENCES dvla_vehicles(id),
+    ADD COLUMN IF NOT EXISTS next_expiry_at TIMESTAMPTZ
+        GENERATED ALWAYS AS (LEAST(expiry_date, insurance_expiry, road_worthiness_expiry)) STORED;
+    """
+    
+    # Evidence images live in the content-addressed evidence store; rows keep the hash
+    enhance_violations_sql = """
+    ALTER TABLE violations
+    ADD COLUMN IF NOT EXISTS evidence_hash VARCHAR(64),
+    ADD COLUMN IF NOT EXISTS lease_owner TEXT,
+    ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+    """
+    
+    # Aggregate violation counters, maintained by the violations trigger below so
+    # dashboards never have to scan the violations table
+    violation_counters_sql = """
+    CREATE TABLE IF NOT EXISTS violation_daily_counters (
+        day DATE NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        violation_type VARCHAR(50) NOT NULL,
+        count BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, status, violation_type)
+    );
+    
+    CREATE TABLE IF NOT EXISTS violation_officer_counters (
+        reported_by TEXT NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        count BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (reported_by, status)
+    );
+    
+    -- Hourly buckets for the supervisor charts (see violation_chart())
+    CREATE TABLE IF NOT EXISTS violation_hourly_rollups (
+        hour TIMESTAMPTZ NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        violation_type VARCHAR(50) NOT NULL,
+        location VARCHAR NOT NULL,
+        count BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (hour, status, violation_type, location)
+    );
     """
     
     # Create indexes for performance
     indexes_sql = [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
         "CREATE INDEX IF NOT EXISTS idx_dvla_users_username ON dvla_users(username);",
         "CREATE INDEX IF NOT EXISTS idx_dvla_users_email ON dvla_users(email);",
         "CREATE INDEX IF NOT EXISTS idx_dvla_vehicles_reg_number ON dvla_vehicles(reg_number);",
@@ -139,11 +181,517 @@ async def create_unified_schema():
         "CREATE INDEX IF NOT EXISTS idx_dvla_vehicles_owner_name ON dvla_vehicles(owner_name);",
         "CREATE INDEX IF NOT EXISTS idx_dvla_renewals_vehicle_id ON dvla_renewals(vehicle_id);",
         "CREATE INDEX IF NOT EXISTS idx_dvla_renewals_status ON dvla_renewals(status);",
+        # One renewal per payment transaction, so retried renewal batches are idempotent
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_dvla_renewals_transaction_id ON dvla_renewals(transaction_id) WHERE transaction_id IS NOT NULL;",
         "CREATE INDEX IF NOT EXISTS idx_dvla_fines_vehicle_id ON dvla_fines(vehicle_id);",
         "CREATE INDEX IF NOT EXISTS idx_dvla_fines_payment_status ON dvla_fines(payment_status);",
         "CREATE INDEX IF NOT EXISTS idx_dvla_fines_fine_id ON dvla_fines(fine_id);",
         "CREATE INDEX IF NOT EXISTS idx_officers_dvla_user_id ON officers(dvla_user_id);",
-        "CREATE INDEX IF NOT EXISTS idx_vehicles_dvla_vehicle_id ON vehicles(dvla_vehicle_id);"
+        "CREATE INDEX IF NOT EXISTS idx_vehicles_dvla_vehicle_id ON vehicles(dvla_vehicle_id);",
+        # Keyset pagination indexes for the (created_at, id) ordered list endpoints
+        "CREATE INDEX IF NOT EXISTS idx_violations_created_at_id ON violations(created_at DESC, id DESC);",
+        "CREATE INDEX IF NOT EXISTS idx_violations_status_created_at_id ON violations(status, created_at DESC, id DESC);",
+        "CREATE INDEX IF NOT EXISTS idx_vehicles_created_at_id ON vehicles(created_at DESC, id DESC);",
+        "CREATE INDEX IF NOT EXISTS idx_dvla_users_created_at_id ON dvla_users(created_at DESC, id DESC);",
+        "CREATE INDEX IF NOT EXISTS idx_dvla_renewals_created_at_id ON dvla_renewals(created_at DESC, id DESC);",
+        "CREATE INDEX IF NOT EXISTS idx_dvla_fines_created_at_id ON dvla_fines(created_at DESC, id DESC);",
+        # Oldest-first pending queue scanned by lease_pending_violations()
+        "CREATE INDEX IF NOT EXISTS idx_violations_pending_queue ON violations(created_at, id) WHERE status = 'pending';",
+        # Active vehicles in the order they lapse: the expiry sweeper and expiring-soon buckets
+        "CREATE INDEX IF NOT EXISTS idx_vehicles_active_next_expiry ON vehicles(next_expiry_at) WHERE status = 'active';",
+        # Covering index so violation_statistics() can aggregate with an index-only scan
+        "CREATE INDEX IF NOT EXISTS idx_violations_status_type_fine ON violations(status, violation_type) INCLUDE (fine_amount);",
+        # Trigram indexes backing the search_vehicles / search_dvla_vehicles functions
+        "CREATE INDEX IF NOT EXISTS idx_vehicles_search_trgm ON vehicles USING GIN ((plate_number || ' ' || owner_name || ' ' || make || ' ' || model) gin_trgm_ops);",
+        "CREATE INDEX IF NOT EXISTS idx_dvla_vehicles_search_trgm ON dvla_vehicles USING GIN ((reg_number || ' ' || license_plate || ' ' || owner_name || ' ' || manufacturer || ' ' || model) gin_trgm_ops);"
+    ]
+    
+    # Ranked single-query vehicle search. Matches go through the trigram
+    # index above; results are ordered by (rank DESC, id) so callers can page
+    # with either OFFSET or the (p_after_rank, p_after_id) keyset.
+    search_vehicles_sql = r"""
+    CREATE OR REPLACE FUNCTION search_vehicles(
+        p_query TEXT,
+        p_limit INTEGER DEFAULT 50,
+        p_offset INTEGER DEFAULT 0,
+        p_after_rank REAL DEFAULT NULL,
+        p_after_id UUID DEFAULT NULL
+    )
+    RETURNS TABLE (id UUID, rank REAL, vehicle JSONB)
+    LANGUAGE sql STABLE AS $$
+        WITH matches AS (
+            SELECT v.id,
+                   ((v.plate_number ILIKE p_query || '%')::INT
+                    + word_similarity(p_query, v.plate_number || ' ' || v.owner_name || ' ' || v.make || ' ' || v.model))::REAL AS rank,
+                   to_jsonb(v) AS vehicle
+            FROM vehicles v
+            WHERE (v.plate_number || ' ' || v.owner_name || ' ' || v.make || ' ' || v.model)
+                  ILIKE '%' || replace(replace(replace(p_query, '\', '\\'), '%', '\%'), '_', '\_') || '%'
+        )
+        SELECT m.id, m.rank, m.vehicle
+        FROM matches m
+        WHERE p_after_rank IS NULL
+           OR m.rank < p_after_rank
+           OR (m.rank = p_after_rank AND m.id > p_after_id)
+        ORDER BY m.rank DESC, m.id
+        OFFSET p_offset
+        LIMIT p_limit;
+    $$;
+    """
+    
+    search_dvla_vehicles_sql = r"""
+    CREATE OR REPLACE FUNCTION search_dvla_vehicles(
+        p_query TEXT,
+        p_limit INTEGER DEFAULT 50,
+        p_offset INTEGER DEFAULT 0,
+        p_after_rank REAL DEFAULT NULL,
+        p_after_id BIGINT DEFAULT NULL
+    )
+    RETURNS TABLE (id BIGINT, rank REAL, vehicle JSONB)
+    LANGUAGE sql STABLE AS $$
+        WITH matches AS (
+            SELECT v.id,
+                   ((v.reg_number ILIKE p_query || '%' OR v.license_plate ILIKE p_query || '%')::INT
+                    + word_similarity(p_query, v.reg_number || ' ' || v.license_plate || ' ' || v.owner_name || ' ' || v.manufacturer || ' ' || v.model))::REAL AS rank,
+                   to_jsonb(v) AS vehicle
+            FROM dvla_vehicles v
+            WHERE (v.reg_number || ' ' || v.license_plate || ' ' || v.owner_name || ' ' || v.manufacturer || ' ' || v.model)
+                  ILIKE '%' || replace(replace(replace(p_query, '\', '\\'), '%', '\%'), '_', '\_') || '%'
+        )
+        SELECT m.id, m.rank, m.vehicle
+        FROM matches m
+        WHERE p_after_rank IS NULL
+           OR m.rank < p_after_rank
+           OR (m.rank = p_after_rank AND m.id > p_after_id)
+        ORDER BY m.rank DESC, m.id
+        OFFSET p_offset
+        LIMIT p_limit;
+    $$;
+    """
+    
+    # Apply a batch of +1 / -1 deltas to every counter table. Deltas are
+    # summed per bucket first, so a multi-row statement touches each counter
+    # row once. Days are UTC calendar days of created_at, matching the
+    # dashboard queries.
+    apply_violation_counter_deltas_sql = """
+    DROP FUNCTION IF EXISTS bump_violation_counters(TIMESTAMPTZ, TEXT, TEXT, TEXT, INTEGER);
+    DROP FUNCTION IF EXISTS bump_violation_counters(TIMESTAMPTZ, TEXT, TEXT, TEXT, TEXT, INTEGER);
+    CREATE OR REPLACE FUNCTION apply_violation_counter_deltas(p_deltas JSONB)
+    RETURNS VOID
+    LANGUAGE sql AS $$
+        INSERT INTO violation_daily_counters (day, status, violation_type, count)
+        SELECT (d.created_at AT TIME ZONE 'UTC')::DATE, d.status, d.violation_type, SUM(d.delta)
+        FROM jsonb_to_recordset(p_deltas) AS d(created_at TIMESTAMPTZ, status TEXT, violation_type TEXT, delta INTEGER)
+        GROUP BY 1, 2, 3
+        HAVING SUM(d.delta) <> 0
+        ON CONFLICT (day, status, violation_type)
+        DO UPDATE SET count = violation_daily_counters.count + EXCLUDED.count;
+        
+        INSERT INTO violation_officer_counters (reported_by, status, count)
+        SELECT COALESCE(d.reported_by, ''), d.status, SUM(d.delta)
+        FROM jsonb_to_recordset(p_deltas) AS d(reported_by TEXT, status TEXT, delta INTEGER)
+        GROUP BY 1, 2
+        HAVING SUM(d.delta) <> 0
+        ON CONFLICT (reported_by, status)
+        DO UPDATE SET count = violation_officer_counters.count + EXCLUDED.count;
+        
+        INSERT INTO violation_hourly_rollups (hour, status, violation_type, location, count)
+        SELECT date_trunc('hour', d.created_at), d.status, d.violation_type, d.location, SUM(d.delta)
+        FROM jsonb_to_recordset(p_deltas) AS d(created_at TIMESTAMPTZ, status TEXT, violation_type TEXT, location TEXT, delta INTEGER)
+        GROUP BY 1, 2, 3, 4
+        HAVING SUM(d.delta) <> 0
+        ON CONFLICT (hour, status, violation_type, location)
+        DO UPDATE SET count = violation_hourly_rollups.count + EXCLUDED.count;
+    $$;
+    """
+    
+    # Statement-level triggers: one counter update per INSERT / UPDATE / DELETE
+    # statement, however many rows it touched (bulk inserts, bulk review).
+    # Transition tables allow a single event per trigger, hence three.
+    violation_counters_trigger_sql = """
+    CREATE OR REPLACE FUNCTION maintain_violation_counters()
+    RETURNS TRIGGER
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        deltas JSONB;
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            SELECT jsonb_agg(jsonb_build_object(
+                'created_at', n.created_at, 'status', n.status, 'violation_type', n.violation_type,
+                'reported_by', n.reported_by::TEXT, 'location', n.location, 'delta', 1))
+            INTO deltas FROM new_rows n;
+        ELSIF TG_OP = 'DELETE' THEN
+            SELECT jsonb_agg(jsonb_build_object(
+                'created_at', o.created_at, 'status', o.status, 'violation_type', o.violation_type,
+                'reported_by', o.reported_by::TEXT, 'location', o.location, 'delta', -1))
+            INTO deltas FROM old_rows o;
+        ELSE
+            -- Only rows whose counted columns changed (lease / evidence updates are skipped)
+            SELECT jsonb_agg(changes.delta_row) INTO deltas
+            FROM old_rows o
+            JOIN new_rows n ON n.id = o.id
+            CROSS JOIN LATERAL (VALUES
+                (jsonb_build_object(
+                    'created_at', o.created_at, 'status', o.status, 'violation_type', o.violation_type,
+                    'reported_by', o.reported_by::TEXT, 'location', o.location, 'delta', -1)),
+                (jsonb_build_object(
+                    'created_at', n.created_at, 'status', n.status, 'violation_type', n.violation_type,
+                    'reported_by', n.reported_by::TEXT, 'location', n.location, 'delta', 1))
+            ) AS changes(delta_row)
+            WHERE (o.status, o.violation_type, o.reported_by, o.location, o.created_at)
+                  IS DISTINCT FROM (n.status, n.violation_type, n.reported_by, n.location, n.created_at);
+        END IF;
+        
+        IF deltas IS NOT NULL THEN
+            PERFORM apply_violation_counter_deltas(deltas);
+        END IF;
+        RETURN NULL;
+    END;
+    $$;
+    
+    DROP TRIGGER IF EXISTS violations_maintain_counters ON violations;
+    DROP TRIGGER IF EXISTS violations_counters_insert ON violations;
+    DROP TRIGGER IF EXISTS violations_counters_update ON violations;
+    DROP TRIGGER IF EXISTS violations_counters_delete ON violations;
+    CREATE TRIGGER violations_counters_insert
+        AFTER INSERT ON violations REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION maintain_violation_counters();
+    CREATE TRIGGER violations_counters_update
+        AFTER UPDATE ON violations REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION maintain_violation_counters();
+    CREATE TRIGGER violations_counters_delete
+        AFTER DELETE ON violations REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION maintain_violation_counters();
+    """
+    
+    # Recompute every counter table from scratch (see maintenance.py)
+    rebuild_violation_counters_sql = """
+    CREATE OR REPLACE FUNCTION rebuild_violation_counters()
+    RETURNS BIGINT
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        total BIGINT;
+    BEGIN
+        -- Block writers so no delta lands between the delete and the re-count
+        LOCK TABLE violations IN SHARE MODE;
+        
+        DELETE FROM violation_daily_counters;
+        INSERT INTO violation_daily_counters (day, status, violation_type, count)
+        SELECT (created_at AT TIME ZONE 'UTC')::DATE, status, violation_type, COUNT(*)
+        FROM violations
+        GROUP BY 1, 2, 3;
+        
+        DELETE FROM violation_officer_counters;
+        INSERT INTO violation_officer_counters (reported_by, status, count)
+        SELECT COALESCE(reported_by::TEXT, ''), status, COUNT(*)
+        FROM violations
+        GROUP BY 1, 2;
+        
+        DELETE FROM violation_hourly_rollups;
+        INSERT INTO violation_hourly_rollups (hour, status, violation_type, location, count)
+        SELECT date_trunc('hour', created_at), status, violation_type, location, COUNT(*)
+        FROM violations
+        GROUP BY 1, 2, 3, 4;
+        
+        SELECT COALESCE(SUM(count), 0) INTO total FROM violation_officer_counters;
+        RETURN total;
+    END;
+    $$;
+    """
+    
+    # All-time violation counts by (status, type), summed from the daily
+    # counters so the cost depends on how many days have counters and not on
+    # how many violations exist
+    violation_counter_totals_sql = """
+    CREATE OR REPLACE FUNCTION violation_counter_totals()
+    RETURNS TABLE (status VARCHAR, violation_type VARCHAR, violation_count BIGINT)
+    LANGUAGE sql STABLE AS $$
+        SELECT c.status, c.violation_type, SUM(c.count)::BIGINT
+        FROM violation_daily_counters c
+        GROUP BY c.status, c.violation_type
+        HAVING SUM(c.count) <> 0;
+    $$;
+    """
+    
+    # Violation counts and fine totals by (status, type) in one round trip;
+    # callers roll the groups up into whatever totals they need. The counters
+    # don't track fine amounts, so callers that need fine totals still use
+    # this grouped (index-only) scan; count-only callers use the counters.
+    violation_statistics_sql = """
+    CREATE OR REPLACE FUNCTION violation_statistics()
+    RETURNS TABLE (status VARCHAR, violation_type VARCHAR, violation_count BIGINT, fine_total NUMERIC)
+    LANGUAGE sql STABLE AS $$
+        SELECT v.status, v.violation_type, COUNT(*), COALESCE(SUM(v.fine_amount), 0)
+        FROM violations v
+        GROUP BY v.status, v.violation_type;
+    $$;
+    """
+    
+    # Chart series from the hourly rollups: counts per (bucket, status) in
+    # [p_start, p_end). Reads only the rollup rows inside the range, so the
+    # cost depends on the range and not on how much history exists.
+    violation_chart_sql = """
+    CREATE OR REPLACE FUNCTION violation_chart(
+        p_start TIMESTAMPTZ,
+        p_end TIMESTAMPTZ,
+        p_bucket TEXT DEFAULT 'day',
+        p_location TEXT DEFAULT NULL,
+        p_violation_type TEXT DEFAULT NULL
+    )
+    RETURNS TABLE (bucket TIMESTAMPTZ, status VARCHAR, violation_count BIGINT)
+    LANGUAGE sql STABLE AS $$
+        SELECT date_trunc(p_bucket, r.hour, 'UTC'), r.status, SUM(r.count)::BIGINT
+        FROM violation_hourly_rollups r
+        WHERE r.hour >= p_start AND r.hour < p_end
+          AND (p_location IS NULL OR r.location = p_location)
+          AND (p_violation_type IS NULL OR r.violation_type = p_violation_type)
+        GROUP BY 1, 2
+        ORDER BY 1;
+    $$;
+    """
+    
+    # Every /dvla/analytics figure in one round trip
+    dvla_analytics_sql = """
+    CREATE OR REPLACE FUNCTION dvla_analytics(p_month_start TIMESTAMPTZ)
+    RETURNS TABLE (
+        total_vehicles BIGINT,
+        total_renewals BIGINT,
+        pending_renewals BIGINT,
+        completed_renewals BIGINT,
+        revenue_this_month NUMERIC,
+        total_fines BIGINT,
+        unpaid_fines BIGINT,
+        paid_fines BIGINT
+    )
+    LANGUAGE sql STABLE AS $$
+        SELECT (SELECT COUNT(*) FROM dvla_vehicles),
+               r.total, r.pending, r.completed, r.revenue,
+               f.total, f.unpaid, f.paid
+        FROM (
+            SELECT COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE status = 'pending') AS pending,
+                   COUNT(*) FILTER (WHERE status = 'completed') AS completed,
+                   COALESCE(SUM(amount_paid) FILTER (WHERE created_at >= p_month_start), 0) AS revenue
+            FROM dvla_renewals
+        ) r, (
+            SELECT COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE payment_status = 'unpaid') AS unpaid,
+                   COUNT(*) FILTER (WHERE payment_status = 'paid') AS paid
+            FROM dvla_fines
+        ) f;
+    $$;
+    """
+    
+    # Review queue: claim the oldest pending violations that are unleased, whose
+    # lease expired, or that the caller already holds. SKIP LOCKED lets
+    # concurrent supervisors claim disjoint batches without waiting.
+    lease_pending_violations_sql = """
+    CREATE OR REPLACE FUNCTION lease_pending_violations(
+        p_owner TEXT,
+        p_limit INTEGER DEFAULT 10,
+        p_lease_seconds INTEGER DEFAULT 300
+    )
+    RETURNS SETOF violations
+    LANGUAGE sql VOLATILE AS $$
+        UPDATE violations v
+        SET lease_owner = p_owner,
+            lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+        FROM (
+            SELECT q.id
+            FROM violations q
+            WHERE q.status = 'pending'
+              AND (q.lease_expires_at IS NULL OR q.lease_expires_at < NOW() OR q.lease_owner = p_owner)
+            ORDER BY q.created_at, q.id
+            LIMIT p_limit
+            FOR UPDATE SKIP LOCKED
+        ) next_batch
+        WHERE v.id = next_batch.id
+        RETURNING v.*;
+    $$;
+    """
+    
+    # Expiry sweeper: mark up to p_limit active vehicles whose next expiry has
+    # passed as expired. Walks idx_vehicles_active_next_expiry from the oldest
+    # lapse; SKIP LOCKED keeps concurrent sweeps (several workers) disjoint.
+    sweep_expired_vehicles_sql = """
+    CREATE OR REPLACE FUNCTION sweep_expired_vehicles(
+        p_now TIMESTAMPTZ DEFAULT NOW(),
+        p_limit INTEGER DEFAULT 1000
+    )
+    RETURNS TABLE (id UUID, plate_number VARCHAR)
+    LANGUAGE sql VOLATILE AS $$
+        UPDATE vehicles v
+        SET status = 'expired', updated_at = p_now
+        FROM (
+            SELECT q.id
+            FROM vehicles q
+            WHERE q.status = 'active' AND q.next_expiry_at <= p_now
+            ORDER BY q.next_expiry_at
+            LIMIT p_limit
+            FOR UPDATE SKIP LOCKED
+        ) due
+        WHERE v.id = due.id
+        RETURNING v.id, v.plate_number;
+    $$;
+    """
+    
+    # Active vehicles lapsing within each of p_days days of p_now (cumulative
+    # buckets), answered from the same partial index as the sweeper
+    vehicle_expiry_buckets_sql = """
+    CREATE OR REPLACE FUNCTION vehicle_expiry_buckets(p_now TIMESTAMPTZ, p_days INTEGER[])
+    RETURNS TABLE (days INTEGER, vehicle_count BIGINT)
+    LANGUAGE sql STABLE AS $$
+        SELECT d.days,
+               (SELECT COUNT(*)
+                FROM vehicles v
+                WHERE v.status = 'active'
+                  AND v.next_expiry_at > p_now
+                  AND v.next_expiry_at <= p_now + make_interval(days => d.days))
+        FROM unnest(p_days) AS d(days)
+        ORDER BY d.days;
+    $$;
+    """
+    
+    # Batch renewals: insert a JSON array of renewals and extend the expiry of
+    # the linked vehicles (vehicles.dvla_vehicle_id) in one transaction.
+    # Renewals whose transaction_id already exists, in the table or earlier in
+    # the batch, are reported as duplicates with the original renewal's id.
+    # The outcome is read by a second statement: under READ COMMITTED it gets
+    # a fresh snapshot, so a renewal that a concurrent batch committed while
+    # this one waited on the transaction_id conflict is reported as a
+    # duplicate with its id instead of a NULL renewal_id.
+    renewal_batch_items_sql = """
+    CREATE OR REPLACE FUNCTION renewal_batch_items(p_renewals JSONB)
+    RETURNS TABLE (
+        item_index INTEGER, vehicle_id BIGINT, renewal_date DATE, expiry_date DATE, status TEXT,
+        amount_paid NUMERIC, payment_method TEXT, transaction_id TEXT, notes TEXT, vehicle_exists BOOLEAN
+    )
+    LANGUAGE sql STABLE AS $$
+        SELECT (r.ordinality - 1)::INTEGER, x.vehicle_id, x.renewal_date, x.expiry_date, x.status,
+               x.amount_paid, x.payment_method, x.transaction_id, x.notes,
+               EXISTS (SELECT 1 FROM dvla_vehicles v WHERE v.id = x.vehicle_id)
+        FROM jsonb_array_elements(p_renewals) WITH ORDINALITY AS r(item, ordinality)
+        CROSS JOIN LATERAL jsonb_to_record(r.item) AS x(
+            vehicle_id BIGINT, renewal_date DATE, expiry_date DATE, status TEXT, amount_paid NUMERIC,
+            payment_method TEXT, transaction_id TEXT, notes TEXT
+        );
+    $$;
+    """
+    
+    process_renewals_sql = """
+    CREATE OR REPLACE FUNCTION process_renewals(p_renewals JSONB, p_processed_by BIGINT DEFAULT NULL)
+    RETURNS TABLE (item_index INTEGER, renewal_id BIGINT, outcome TEXT)
+    LANGUAGE plpgsql VOLATILE AS $$
+    #variable_conflict use_column
+    DECLARE
+        created_ids JSONB;        -- transaction_id -> id of the renewals this call inserted
+        missing_vehicles INTEGER[];
+    BEGIN
+        WITH items AS (
+            SELECT * FROM renewal_batch_items(p_renewals)
+        ),
+        -- First occurrence of each transaction_id in the batch
+        candidates AS (
+            SELECT DISTINCT ON (i.transaction_id) i.*
+            FROM items i
+            WHERE i.vehicle_exists
+            ORDER BY i.transaction_id, i.item_index
+        ),
+        inserted AS (
+            INSERT INTO dvla_renewals (
+                vehicle_id, renewal_date, expiry_date, status, amount_paid,
+                payment_method, transaction_id, notes, processed_by
+            )
+            SELECT c.vehicle_id, c.renewal_date, c.expiry_date, c.status, c.amount_paid,
+                   c.payment_method, c.transaction_id, c.notes, p_processed_by
+            FROM candidates c
+            ON CONFLICT (transaction_id) WHERE transaction_id IS NOT NULL DO NOTHING
+            RETURNING id, vehicle_id, expiry_date, status, transaction_id
+        ),
+        -- Never shortens an expiry; expired vehicles become active again once nothing has lapsed
+        renewed AS (
+            UPDATE vehicles ve
+            SET expiry_date = GREATEST(ve.expiry_date, r.expiry_date),
+                status = CASE
+                    WHEN ve.status = 'expired'
+                         AND LEAST(GREATEST(ve.expiry_date, r.expiry_date), ve.insurance_expiry, ve.road_worthiness_expiry) > NOW()
+                    THEN 'active'
+                    ELSE ve.status
+                END,
+                updated_at = NOW()
+            FROM (
+                SELECT vehicle_id, MAX(expiry_date)::TIMESTAMPTZ AS expiry_date
+                FROM inserted
+                WHERE status = 'completed'
+                GROUP BY vehicle_id
+            ) r
+            WHERE ve.dvla_vehicle_id = r.vehicle_id
+            RETURNING ve.id
+        )
+        SELECT (SELECT COALESCE(jsonb_object_agg(ins.transaction_id, ins.id), '{}'::JSONB) FROM inserted ins),
+               (SELECT COALESCE(array_agg(i.item_index), '{}') FROM items i WHERE NOT i.vehicle_exists)
+        INTO created_ids, missing_vehicles;
+        
+        RETURN QUERY
+        WITH items AS (
+            SELECT i.item_index, i.transaction_id, i.item_index = ANY(missing_vehicles) AS vehicle_missing
+            FROM renewal_batch_items(p_renewals) i
+        ),
+        first_items AS (
+            SELECT DISTINCT ON (i.transaction_id) i.transaction_id, i.item_index
+            FROM items i
+            WHERE NOT i.vehicle_missing
+            ORDER BY i.transaction_id, i.item_index
+        )
+        SELECT i.item_index,
+               COALESCE((created_ids ->> i.transaction_id)::BIGINT, existing.id),
+               CASE
+                   WHEN i.vehicle_missing THEN 'vehicle_not_found'
+                   WHEN created_ids ? i.transaction_id AND f.item_index = i.item_index THEN 'created'
+                   ELSE 'duplicate'
+               END
+        FROM items i
+        LEFT JOIN first_items f ON f.transaction_id = i.transaction_id
+        LEFT JOIN dvla_renewals existing ON existing.transaction_id = i.transaction_id
+        ORDER BY i.item_index;
+    END;
+    $$;
+    """
+    
+    # Settlement reconciliation: mark a JSON array of (fine_id, payment_method)
+    # paid in one statement. Only fines still unpaid are touched, so fines
+    # paid in the meantime are left alone and missing from the result.
+    apply_fine_payments_sql = """
+    CREATE OR REPLACE FUNCTION apply_fine_payments(p_payments JSONB, p_verified_by BIGINT DEFAULT NULL)
+    RETURNS TABLE (paid_fine_id VARCHAR)
+    LANGUAGE sql VOLATILE AS $$
+        UPDATE dvla_fines f
+        SET payment_status = 'paid',
+            payment_method = COALESCE(p.payment_method, f.payment_method),
+            verified_by = COALESCE(p_verified_by, f.verified_by),
+            updated_at = NOW()
+        FROM jsonb_to_recordset(p_payments) AS p(fine_id TEXT, payment_method TEXT)
+        WHERE f.fine_id = p.fine_id AND f.payment_status = 'unpaid'
+        RETURNING f.fine_id;
+    $$;
+    """
+    
+    functions_sql = [
+        ("search_vehicles", search_vehicles_sql),
+        ("search_dvla_vehicles", search_dvla_vehicles_sql),
+        ("apply_violation_counter_deltas", apply_violation_counter_deltas_sql),
+        ("maintain_violation_counters", violation_counters_trigger_sql),
+        ("rebuild_violation_counters", rebuild_violation_counters_sql),
+        ("violation_counter_totals", violation_counter_totals_sql),
+        ("violation_statistics", violation_statistics_sql),
+        ("violation_chart", violation_chart_sql),
+        ("dvla_analytics", dvla_analytics_sql),
+        ("lease_pending_violations", lease_pending_violations_sql),
+        ("sweep_expired_vehicles", sweep_expired_vehicles_sql),
+        ("vehicle_expiry_buckets", vehicle_expiry_buckets_sql),
+        ("renewal_batch_items", renewal_batch_items_sql),
+        ("process_renewals", process_renewals_sql),
+        ("apply_fine_payments", apply_fine_payments_sql)
     ]
     
     # Execute all SQL commands
@@ -153,7 +701,9 @@ async def create_unified_schema():
         ("DVLA Renewals", dvla_renewals_sql),
         ("DVLA Fines", dvla_fines_sql),
         ("Enhance Officers", enhance_officers_sql),
-        ("Enhance Vehicles", enhance_vehicles_sql)
+        ("Enhance Vehicles", enhance_vehicles_sql),
+        ("Enhance Violations", enhance_violations_sql),
+        ("Violation Counters", violation_counters_sql)
     ]
     
     try:
@@ -173,6 +723,15 @@ async def create_unified_schema():
         
         print("✅ All indexes created successfully")
         
+        print("Creating database functions...")
+        for name, sql in functions_sql:
+            supabase.rpc('exec_sql', {'sql': sql}).execute()
+            print(f"✅ {name} function created")
+        
+        print("Rebuilding violation counters...")
+        supabase.rpc('rebuild_violation_counters').execute()
+        print("✅ Violation counters rebuilt")
+        
         # Create sample data
         print("Creating sample DVLA admin user...")
         
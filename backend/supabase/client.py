@@ -1,8 +1,10 @@
 import os
 from supabase import create_client, Client
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, date
 import json
+from database.pagination import DEFAULT_PAGE_SIZE, clamp_page_size, apply_keyset, split_page, decode_rank_cursor, split_ranked_page
+from services.authorization import user_access
 
 class SupabaseClient:
     def __init__(self):
@@ -42,6 +44,8 @@ class SupabaseClient:
         """Update user"""
         try:
             response = self.client.table('users').update(updates).eq('id', user_id).execute()
+            # Role / status may have changed; drop any cached authorization data
+            user_access.invalidate(user_id)
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Error updating user: {e}")
@@ -51,20 +55,22 @@ class SupabaseClient:
         """Delete user"""
         try:
             self.client.table('users').delete().eq('id', user_id).execute()
+            user_access.invalidate(user_id)
             return True
         except Exception as e:
             print(f"Error deleting user: {e}")
             return False
     
     # Vehicle Management
-    def get_vehicles(self) -> List[Dict]:
-        """Get all vehicles"""
+    def get_vehicles(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Get a page of vehicles, newest first, and the cursor for the next page (None on the last)"""
         try:
-            response = self.client.table('vehicles').select('*').execute()
-            return response.data
+            limit = clamp_page_size(limit)
+            response = apply_keyset(self.client.table('vehicles').select('*'), cursor, limit).execute()
+            return split_page(response.data, limit)
         except Exception as e:
             print(f"Error fetching vehicles: {e}")
-            return []
+            return [], None
     
     def get_vehicle_by_plate(self, plate_number: str) -> Optional[Dict]:
         """Get vehicle by plate number"""
@@ -93,26 +99,31 @@ class SupabaseClient:
             print(f"Error updating vehicle: {e}")
             return None
     
-    def search_vehicles(self, query: str) -> List[Dict]:
-        """Search vehicles by plate number or owner name"""
+    def search_vehicles(self, query: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Search vehicles by plate number, owner name or make/model; returns a ranked page and the next cursor"""
         try:
-            response = self.client.table('vehicles').select('*').or_(
-                f'plate_number.ilike.%{query}%,owner_name.ilike.%{query}%'
-            ).execute()
-            return response.data
+            limit = clamp_page_size(limit)
+            params = {'p_query': query, 'p_limit': limit + 1}
+            if cursor:
+                after_rank, after_id = decode_rank_cursor(cursor)
+                params.update({'p_after_rank': after_rank, 'p_after_id': after_id})
+            response = self.client.rpc('search_vehicles', params).execute()
+            rows, next_cursor = split_ranked_page(response.data, limit)
+            return [row['vehicle'] for row in rows], next_cursor
         except Exception as e:
             print(f"Error searching vehicles: {e}")
-            return []
+            return [], None
     
     # Violation Management
-    def get_violations(self) -> List[Dict]:
-        """Get all violations"""
+    def get_violations(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Get a page of violations, newest first, and the cursor for the next page (None on the last)"""
         try:
-            response = self.client.table('violations').select('*').execute()
-            return response.data
+            limit = clamp_page_size(limit)
+            response = apply_keyset(self.client.table('violations').select('*'), cursor, limit).execute()
+            return split_page(response.data, limit)
         except Exception as e:
             print(f"Error fetching violations: {e}")
-            return []
+            return [], None
     
     def get_violations_by_plate(self, plate_number: str) -> List[Dict]:
         """Get violations by plate number"""
@@ -214,35 +225,34 @@ class SupabaseClient:
     def get_violation_stats(self) -> Dict:
         """Get violation statistics"""
         try:
-            # Get total violations
-            total_response = self.client.table('violations').select('*', count='exact').execute()
-            total_violations = total_response.count or 0
+            # Counts and fine totals grouped by (status, violation_type) in one round trip
+            response = self.client.rpc('violation_statistics').execute()
             
-            # Get violations by status
-            pending_response = self.client.table('violations').select('*', count='exact').eq('status', 'pending').execute()
-            pending_count = pending_response.count or 0
-            
-            approved_response = self.client.table('violations').select('*', count='exact').eq('status', 'approved').execute()
-            approved_count = approved_response.count or 0
-            
-            paid_response = self.client.table('violations').select('*', count='exact').eq('status', 'paid').execute()
-            paid_count = paid_response.count or 0
-            
-            # Get total fine amount
-            fine_response = self.client.table('violations').select('fine_amount').execute()
-            total_fines = sum(violation.get('fine_amount', 0) for violation in fine_response.data)
+            status_counts = {}
+            total_fines = 0.0
+            for group in response.data:
+                status_counts[group['status']] = status_counts.get(group['status'], 0) + group['violation_count']
+                total_fines += float(group['fine_total'])
             
             return {
-                'total_violations': total_violations,
-                'pending_violations': pending_count,
-                'approved_violations': approved_count,
-                'paid_violations': paid_count,
+                'total_violations': sum(status_counts.values()),
+                'pending_violations': status_counts.get('pending', 0),
+                'approved_violations': status_counts.get('approved', 0),
+                'paid_violations': status_counts.get('paid', 0),
                 'total_fines': total_fines
             }
         except Exception as e:
             print(f"Error fetching violation stats: {e}")
             return {}
     
+    def count_rows(self, table: str) -> int:
+        """Exact row count of a table without fetching any rows"""
+        try:
+            return self.client.table(table).select('id', count='exact', head=True).execute().count or 0
+        except Exception as e:
+            print(f"Error counting {table}: {e}")
+            return 0
+    
     def get_vehicle_stats(self) -> Dict:
         """Get vehicle statistics"""
         try:
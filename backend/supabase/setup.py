@@ -179,12 +179,12 @@ def test_queries():
         print(f"  👥 Users: {len(users)} found")
         
         # Test vehicle queries
-        vehicles = supabase_client.get_vehicles()
-        print(f"  🚗 Vehicles: {len(vehicles)} found")
+        vehicles = supabase_client.count_rows('vehicles')
+        print(f"  🚗 Vehicles: {vehicles} found")
         
         # Test violation queries
-        violations = supabase_client.get_violations()
-        print(f"  ⚠️ Violations: {len(violations)} found")
+        violations = supabase_client.count_rows('violations')
+        print(f"  ⚠️ Violations: {violations} found")
         
         # Test approval queries
         approvals = supabase_client.get_pending_approvals()
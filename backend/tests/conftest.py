@@ -0,0 +1,47 @@
+import ast
+import os
+import sys
+import uuid
+
+import pytest
+
+# Services build the Supabase client at import time; tests never reach the network
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test.anon.key")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+SETUP_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "setup_unified_database.py")
+
+
+def setup_sql(name: str) -> str:
+    """A SQL string assigned as `name` inside setup_unified_database.create_unified_schema()"""
+    with open(SETUP_SCRIPT) as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and any(getattr(target, "id", None) == name for target in node.targets):
+            return node.value.value
+    raise KeyError(name)
+
+
+@pytest.fixture
+def pg():
+    """
+    A connection to a scratch schema in the Postgres at TEST_DATABASE_URL.
+
+    SQL-level tests are skipped when TEST_DATABASE_URL isn't set (Supabase
+    itself isn't needed; any PostgreSQL 14+ will do).
+    """
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL not set")
+    psycopg = pytest.importorskip("psycopg")
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    with psycopg.connect(url, autocommit=True) as connection:
+        connection.execute(f"CREATE SCHEMA {schema}")
+        connection.execute(f"SET search_path TO {schema}, public")
+        try:
+            yield connection
+        finally:
+            connection.execute(f"DROP SCHEMA {schema} CASCADE")
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import uuid
+
+import pytest
+
+import services.authorization as authorization
+from models.user import UserRole, UserStatus
+from services.authorization import UserAccessCache
+
+
+class FakeUsers:
+    def __init__(self, users):
+        self.users = users
+        self.queries = 0
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+class FakeQuery:
+    def __init__(self, database):
+        self.database = database
+        self.user_id = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self.user_id = value
+        return self
+
+    def limit(self, count):
+        return self
+
+    def execute(self):
+        self.database.queries += 1
+        user = self.database.users.get(self.user_id)
+
+        class Response:
+            data = [dict(user)] if user else []
+        return Response
+
+
+@pytest.fixture
+def users(monkeypatch):
+    database = FakeUsers({})
+    monkeypatch.setattr(authorization, "supabase", database)
+    return database
+
+
+def test_access_is_cached_until_invalidated(users):
+    user_id = str(uuid.uuid4())
+    users.users[user_id] = {"role": "supervisor", "status": "active"}
+    cache = UserAccessCache(ttl=60)
+
+    async def run():
+        first = await asyncio.gather(*(cache.get(user_id) for _ in range(5)))
+        users.users[user_id]["status"] = "suspended"
+        stale = await cache.get(user_id)
+        cache.invalidate(user_id)
+        return first, stale, await cache.get(user_id)
+
+    first, stale, fresh = asyncio.run(run())
+    assert all(access.role == UserRole.SUPERVISOR for access in first)
+    assert stale.status == UserStatus.ACTIVE
+    assert fresh.status == UserStatus.SUSPENDED
+    assert users.queries == 2
+
+
+def test_suspension_during_a_lookup_is_not_cached_over(users, monkeypatch):
+    user_id = str(uuid.uuid4())
+    users.users[user_id] = {"role": "supervisor", "status": "active"}
+    cache = UserAccessCache(ttl=60)
+    reading = threading.Event()
+    suspended = threading.Event()
+    load = cache._load
+
+    def slow_load(requested_id):
+        access = load(requested_id)
+        if not reading.is_set():
+            reading.set()
+            suspended.wait(5)
+        return access
+
+    monkeypatch.setattr(cache, "_load", slow_load)
+
+    async def run():
+        lookup = asyncio.create_task(cache.get(user_id))
+        await asyncio.to_thread(reading.wait, 5)
+        users.users[user_id]["status"] = "suspended"
+        cache.invalidate(user_id)
+        suspended.set()
+        return await lookup, await cache.get(user_id)
+
+    during, after = asyncio.run(run())
+    assert during.status == UserStatus.SUSPENDED
+    assert after.status == UserStatus.SUSPENDED
+    assert users.queries == 2
+
+
+def test_unknown_and_non_uuid_ids(users):
+    cache = UserAccessCache(ttl=60)
+    assert asyncio.run(cache.get(str(uuid.uuid4()))) is None
+    assert asyncio.run(cache.get("42")) is None
+    assert users.queries == 1  # DVLA-style ids never reach the users table
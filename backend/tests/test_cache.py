@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+
+from services import cache
+from services.cache import SingleFlight, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def test_ttl_cache_expires_entries(clock):
+    ttl_cache = TTLCache(ttl=10)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2, ttl=30)
+    clock.now += 10
+    assert ttl_cache.get("a") is None
+    assert ttl_cache.get("b") == 2
+    assert len(ttl_cache) == 1
+
+
+def test_ttl_cache_evicts_oldest(clock):
+    ttl_cache = TTLCache(ttl=10, max_entries=2)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.set("a", 3)
+    ttl_cache.set("c", 4)
+    assert ttl_cache.get("b") is None
+    assert (ttl_cache.get("a"), ttl_cache.get("c")) == (3, 4)
+
+
+def test_ttl_cache_invalidate(clock):
+    ttl_cache = TTLCache(ttl=10)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.invalidate("a")
+    assert ttl_cache.get("a", "gone") == "gone"
+    assert ttl_cache.get("b") == 2
+    ttl_cache.invalidate()
+    assert len(ttl_cache) == 0
+
+
+def test_get_or_load_runs_loader_once():
+    ttl_cache = TTLCache(ttl=10)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def scenario():
+        results = await asyncio.gather(*(ttl_cache.get_or_load("k", loader) for _ in range(5)))
+        assert results == ["value"] * 5
+        assert await ttl_cache.get_or_load("k", loader) == "value"
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+
+
+def test_single_flight_shares_failures_and_forgets_them():
+    flights = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("database down")
+
+    async def scenario():
+        results = await asyncio.gather(*(flights.do("k", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert len(calls) == 1
+        with pytest.raises(RuntimeError):
+            await flights.do("k", failing)
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_single_flight_follower_retries_after_leader_cancelled():
+    flights = SingleFlight()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def scenario():
+        leader = asyncio.create_task(flights.do("k", loader))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("k", loader))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await follower == 2
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_single_flight_cancelled_follower_leaves_leader_running():
+    flights = SingleFlight()
+
+    async def loader():
+        await asyncio.sleep(0.02)
+        return "value"
+
+    async def scenario():
+        leader = asyncio.create_task(flights.do("k", loader))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("k", loader))
+        await asyncio.sleep(0)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        assert await leader == "value"
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_during_load_is_not_undone():
+    ttl_cache = TTLCache(ttl=60)
+    versions = iter(["active", "suspended"])
+    loading = asyncio.Event()
+
+    async def loader():
+        value = next(versions)
+        loading.set()
+        await asyncio.sleep(0.02)
+        return value
+
+    async def scenario():
+        lookup = asyncio.create_task(ttl_cache.get_or_load("user", loader))
+        await loading.wait()
+        # The user is suspended while the first lookup is still reading the old row
+        ttl_cache.invalidate("user")
+        assert await lookup == "suspended"
+        assert ttl_cache.get("user") == "suspended"
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_all_during_load_restarts_it():
+    ttl_cache = TTLCache(ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return len(calls)
+
+    async def scenario():
+        lookups = [asyncio.create_task(ttl_cache.get_or_load("analytics", loader)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        ttl_cache.invalidate()
+        assert await asyncio.gather(*lookups) == [2, 2, 2]
+        assert ttl_cache.get("analytics") == 2
+
+    asyncio.run(scenario())
+
+
+def test_constant_invalidation_returns_uncached():
+    ttl_cache = TTLCache(ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        ttl_cache.invalidate("k")
+        return len(calls)
+
+    assert asyncio.run(ttl_cache.get_or_load("k", loader)) == TTLCache.MAX_LOAD_ATTEMPTS
+    assert ttl_cache.get("k") is None
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+import services.violation_service as violation_service
+from models.dvla import DVLA_VEHICLE_SUMMARY_COLUMNS
+from models.user import USER_COLUMNS
+from models.violation import VIOLATION_DETAIL_COLUMNS, VIOLATION_SUMMARY_COLUMNS
+from services.violation_service import ViolationService
+from tests.test_violation_lookup import violation_row
+
+
+class RecordingTable:
+    """Records the column list of every select and answers with one row"""
+
+    def __init__(self, row):
+        self.row = row
+        self.selects = []
+
+    def table(self, name):
+        return self
+
+    def select(self, columns):
+        self.selects.append(columns)
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def limit(self, count):
+        return self
+
+    def execute(self):
+        selected = self.selects[-1].split(",")
+
+        class Response:
+            data = [{column: value for column, value in self.row.items() if column in selected}]
+        return Response
+
+
+@pytest.fixture
+def table(monkeypatch):
+    monkeypatch.setattr(violation_service, "WRITE_BEHIND_ENABLED", False)
+    row = dict(violation_row("GR 1-20", "a", 0), evidence_image="data:image/png;base64,AAAA")
+    table = RecordingTable(row)
+    monkeypatch.setattr(violation_service, "supabase", table)
+    return table
+
+
+def test_column_lists_leave_out_heavy_and_secret_columns():
+    assert "evidence_image" not in VIOLATION_SUMMARY_COLUMNS.split(",")
+    assert "evidence_image" in VIOLATION_DETAIL_COLUMNS.split(",")
+    assert set(VIOLATION_SUMMARY_COLUMNS.split(",")) < set(VIOLATION_DETAIL_COLUMNS.split(","))
+    assert "password_hash" not in USER_COLUMNS.split(",")
+    assert "*" not in DVLA_VEHICLE_SUMMARY_COLUMNS
+    assert not {"owner_address", "owner_phone", "owner_email", "vin"} & set(DVLA_VEHICLE_SUMMARY_COLUMNS.split(","))
+
+
+def test_single_violation_loads_evidence_only_on_request(table):
+    service = ViolationService()
+    without = asyncio.run(service.get_violation_by_id("x"))
+    with_evidence = asyncio.run(service.get_violation_by_id("x", include_evidence=True))
+    assert table.selects == [VIOLATION_SUMMARY_COLUMNS, VIOLATION_DETAIL_COLUMNS]
+    assert without.evidence_image is None
+    assert with_evidence.evidence_image == "data:image/png;base64,AAAA"
+
+
+def test_violation_lists_select_summary_columns(table):
+    violations, _ = asyncio.run(ViolationService().get_violations(user_id="a"))
+    assert table.selects == [VIOLATION_SUMMARY_COLUMNS]
+    assert not hasattr(violations[0], "evidence_image")
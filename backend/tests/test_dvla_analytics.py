@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from decimal import Decimal
+
+from services.dvla_service import DVLAService
+
+
+class FakeAnalytics:
+    """Answers the dvla_analytics RPC; the first call can be held open to overlap a mutation"""
+
+    def __init__(self):
+        self.totals = {
+            "total_vehicles": 10, "total_renewals": 4, "completed_renewals": 3, "pending_renewals": 1,
+            "total_fines": 2, "paid_fines": 1, "unpaid_fines": 1, "revenue_this_month": 450.5,
+        }
+        self.calls = 0
+        self.first_call_started = threading.Event()
+        self.release_first_call = threading.Event()
+        self.release_first_call.set()
+
+    def rpc(self, name, params):
+        assert name == "dvla_analytics"
+        return self
+
+    def execute(self):
+        self.calls += 1
+        totals = dict(self.totals)
+        if self.calls == 1:
+            self.first_call_started.set()
+            self.release_first_call.wait(5)
+
+        class Response:
+            data = [totals]
+        return Response
+
+
+def analytics_service():
+    service = DVLAService()
+    service.supabase = FakeAnalytics()
+    return service
+
+
+def test_analytics_rates_and_caching():
+    service = analytics_service()
+
+    async def run():
+        return await asyncio.gather(*(service.get_analytics() for _ in range(3))), await service.get_analytics()
+
+    first, cached = asyncio.run(run())
+    assert service.supabase.calls == 1
+    assert cached == first[0]
+    assert cached.renewal_rate == 75.0
+    assert cached.fine_payment_rate == 50.0
+    assert cached.revenue_this_month == Decimal("450.5")
+
+
+def test_change_during_computation_is_not_hidden_by_the_cache():
+    service = analytics_service()
+    database = service.supabase
+    database.release_first_call.clear()
+
+    async def run():
+        lookup = asyncio.create_task(service.get_analytics())
+        await asyncio.to_thread(database.first_call_started.wait, 5)
+        # A renewal lands while the first computation is still reading the old totals
+        database.totals["total_renewals"] = 5
+        service.analytics_changed()
+        database.release_first_call.set()
+        return await lookup, await service.get_analytics()
+
+    during, after = asyncio.run(run())
+    assert during.total_renewals == 5
+    assert after.total_renewals == 5
+    assert database.calls == 2
@@ -0,0 +1,162 @@
+import csv
+import json
+
+import pandas as pd
+import pytest
+
+import services.dvla_import as dvla_import
+from services.dvla_import import VehicleImporter, import_job_id, read_import_status
+
+HEADER = [
+    "reg_number", "manufacturer", "model", "vehicle_type", "chassis_number", "year_of_manufacture", "vin",
+    "license_plate", "color", "use_type", "date_of_entry", "owner_name", "owner_address", "owner_phone",
+    "owner_email", "engine_cc", "weight_kg",
+]
+
+
+def vehicle(number, **overrides):
+    row = {
+        "reg_number": f"GR {number}-21", "manufacturer": "Toyota", "model": "Corolla", "vehicle_type": "Car",
+        "chassis_number": f"C{number}", "year_of_manufacture": "2019", "vin": f"V{number}",
+        "license_plate": f"GR {number}-21", "color": "Red", "use_type": "Private", "date_of_entry": "2024-01-05",
+        "owner_name": "Kofi Mensah", "owner_address": "Accra", "owner_phone": "0244000000",
+        "owner_email": f"k{number}@example.com", "engine_cc": "1600", "weight_kg": "",
+    }
+    row.update(overrides)
+    return row
+
+
+class FakeRegistry:
+    """dvla_vehicles with one existing row; inserts containing reg_number BOOM fail"""
+
+    def __init__(self):
+        self.existing = [{"id": 1, "reg_number": "GR 1-20", "vin": "EXISTING", "chassis_number": "C-OLD", "license_plate": "GR 1-20"}]
+        self.inserted = []
+
+    def table(self, name):
+        return FakeTable(self)
+
+
+class FakeTable:
+    def __init__(self, registry):
+        self.registry = registry
+        self.rows = None
+        self.after = 0
+
+    def select(self, columns):
+        return self
+
+    def gt(self, column, value):
+        self.after = value
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, page_size):
+        return self
+
+    def insert(self, rows, returning=None):
+        self.rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def execute(self):
+        class Response:
+            data = []
+        if self.rows is None:
+            Response.data = [row for row in self.registry.existing if row["id"] > self.after]
+        elif any(row["reg_number"] == "BOOM" for row in self.rows):
+            raise RuntimeError("insert rejected")
+        else:
+            json.dumps(self.rows)
+            self.registry.inserted.extend(self.rows)
+        return Response
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = FakeRegistry()
+    monkeypatch.setattr(dvla_import, "supabase", registry)
+    return registry
+
+
+def test_validate_flags_bad_rows_with_source_row_numbers(registry):
+    importer = VehicleImporter("unused.json", "unused.csv", created_by=7)
+    importer.load_existing_keys()
+    chunk = pd.DataFrame([
+        vehicle(1),
+        vehicle(2, year_of_manufacture="19x"),
+        vehicle(3, vin="V1"),
+        vehicle(4, owner_email="not-an-email"),
+        vehicle(5, reg_number="gr 1-20"),
+        vehicle(6, engine_cc="1.5"),
+        vehicle(7, manufacturer=""),
+    ], columns=HEADER)
+
+    accepted, rejected = importer.validate(chunk, first_row=100)
+
+    assert [row for row, _ in accepted] == [101]
+    record = accepted[0][1]
+    assert record["year_of_manufacture"] == 2019
+    assert record["engine_cc"] == 1600
+    assert record["weight_kg"] is None
+    assert record["created_by"] == 7
+    errors = {row: error for row, _, error in rejected}
+    assert "year_of_manufacture" in errors[102]
+    assert errors[103] == "duplicate vin in import"
+    assert "owner_email" in errors[104]
+    assert errors[105] == "reg_number already registered"
+    assert errors[106] == "engine_cc must be a whole number"
+    assert errors[107] == "manufacturer is required"
+
+
+def test_validate_rejects_missing_columns(registry):
+    with pytest.raises(ValueError, match="Missing required columns"):
+        VehicleImporter("unused.json", "unused.csv").validate(pd.DataFrame([{"reg_number": "X"}]), 0)
+
+
+def write_extract(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=HEADER)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_run_records_progress_and_status_in_checkpoint(registry, tmp_path):
+    job_id = "a" * 64
+    source = tmp_path / f"{job_id}.csv"
+    write_extract(source, [vehicle(n) for n in range(2, 8)] + [vehicle(8, reg_number="BOOM"), vehicle(9, vin="")])
+    importer = VehicleImporter(f"{source}.checkpoint.json", f"{source}.errors.csv", read_chunk_size=3, insert_chunk_size=2)
+
+    summary = importer.run(str(source))
+
+    assert (summary.rows_read, summary.inserted, summary.failed) == (8, 6, 2)
+    assert len(registry.inserted) == 6
+    assert import_job_id(str(source)) == job_id
+    status = read_import_status(job_id, str(tmp_path))
+    assert status.status == "completed"
+    assert (status.rows_done, status.inserted, status.failed) == (8, 6, 2)
+    assert status.summary.inserted == 6
+    with open(f"{source}.errors.csv") as report:
+        assert [line["row"] for line in csv.DictReader(report)] == ["7", "8"]
+
+    # Running again resumes past everything already done
+    again = VehicleImporter(f"{source}.checkpoint.json", f"{source}.errors.csv").run(str(source))
+    assert again.resumed_from == 8
+    assert len(registry.inserted) == 6
+
+
+def test_failed_run_is_recorded(registry, tmp_path):
+    job_id = "b" * 64
+    source = tmp_path / f"{job_id}.csv"
+    source.write_text("reg_number\nGR 1-21\n")
+    with pytest.raises(ValueError):
+        VehicleImporter(f"{source}.checkpoint.json", f"{source}.errors.csv").run(str(source))
+    status = read_import_status(job_id, str(tmp_path))
+    assert status.status == "failed"
+    assert "Missing required columns" in status.error
+
+
+def test_read_import_status_rejects_unknown_and_malformed_ids(tmp_path):
+    assert read_import_status("c" * 64, str(tmp_path)) is None
+    assert read_import_status("../../etc/passwd", str(tmp_path)) is None
@@ -0,0 +1,104 @@
+import pytest
+
+import services.dvla_service as dvla_service
+from models.dvla import DVLARenewalBatchItem
+from services.dvla_service import DVLAService
+
+
+def renewal(transaction_id, vehicle_id=1):
+    return DVLARenewalBatchItem(
+        vehicle_id=vehicle_id, renewal_date="2026-01-01", expiry_date="2027-01-01",
+        amount_paid=150, payment_method="cash", transaction_id=transaction_id,
+    )
+
+
+class FakeRenewalRpc:
+    """Plays back one process_renewals answer (or exception) per chunk"""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.chunks = []
+
+    def rpc(self, name, params):
+        assert name == "process_renewals"
+        self.chunks.append(params)
+        answer = self.answers.pop(0)
+
+        class Call:
+            def execute(self):
+                if isinstance(answer, Exception):
+                    raise answer
+
+                class Response:
+                    data = answer
+                return Response
+        return Call()
+
+
+@pytest.fixture
+def woken(monkeypatch):
+    calls = []
+    monkeypatch.setattr(dvla_service.expiry_sweeper, "wake", lambda: calls.append("wake"))
+    return calls
+
+
+def service_with(answers, monkeypatch):
+    service = DVLAService()
+    service.supabase = FakeRenewalRpc(answers)
+    changed = []
+    monkeypatch.setattr(service, "analytics_changed", lambda: changed.append(True))
+    return service, changed
+
+
+def test_outcomes_map_to_results(monkeypatch, woken):
+    service, changed = service_with([[
+        {"item_index": 0, "renewal_id": 11, "outcome": "created"},
+        {"item_index": 1, "renewal_id": 7, "outcome": "duplicate"},
+        {"item_index": 2, "renewal_id": None, "outcome": "vehicle_not_found"},
+        {"item_index": 3, "renewal_id": 11, "outcome": "duplicate"},
+    ]], monkeypatch)
+
+    results = list(service.process_renewals([renewal("t1"), renewal("t0"), renewal("t2", 99), renewal("t1")], 5))
+    assert [(r.index, r.success, r.renewal_id, r.duplicate, r.error) for r in results] == [
+        (0, True, 11, False, None),
+        (1, True, 7, True, None),
+        (2, False, None, False, "Vehicle not found"),
+        (3, True, 11, True, None),
+    ]
+    assert service.supabase.chunks[0]["p_processed_by"] == 5
+    assert service.supabase.chunks[0]["p_renewals"][0]["transaction_id"] == "t1"
+    assert changed == [True] and woken == ["wake"]
+
+
+def test_results_stream_chunk_by_chunk_and_a_failed_chunk_fails_alone(monkeypatch, woken):
+    monkeypatch.setattr(dvla_service, "RENEWAL_BATCH_CHUNK_SIZE", 2)
+    service, changed = service_with([
+        [{"item_index": 0, "renewal_id": 1, "outcome": "created"}, {"item_index": 1, "renewal_id": 2, "outcome": "created"}],
+        Exception("statement timeout"),
+        [{"item_index": 0, "renewal_id": 5, "outcome": "created"}],
+    ], monkeypatch)
+
+    results = service.process_renewals([renewal(f"t{n}") for n in range(5)], 5)
+    first = next(results)
+    # Only the first chunk has been sent when its first result arrives
+    assert first.index == 0 and len(service.supabase.chunks) == 1
+    rest = list(results)
+    assert [(r.index, r.success) for r in rest] == [(1, True), (2, False), (3, False), (4, True)]
+    assert rest[1].error == "statement timeout"
+    assert changed == [True] and woken == ["wake"]
+
+
+def test_nothing_created_leaves_analytics_and_sweeper_alone(monkeypatch, woken):
+    service, changed = service_with([[{"item_index": 0, "renewal_id": 3, "outcome": "duplicate"}]], monkeypatch)
+    assert list(service.process_renewals([renewal("t0")], 5))[0].duplicate
+    assert changed == [] and woken == []
+
+
+def test_abandoned_stream_still_reports_created_renewals(monkeypatch, woken):
+    monkeypatch.setattr(dvla_service, "RENEWAL_BATCH_CHUNK_SIZE", 1)
+    service, changed = service_with([[{"item_index": 0, "renewal_id": 1, "outcome": "created"}]], monkeypatch)
+    results = service.process_renewals([renewal("t0"), renewal("t1")], 5)
+    next(results)
+    # The client disconnected mid-stream
+    results.close()
+    assert changed == [True] and woken == ["wake"]
@@ -0,0 +1,145 @@
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+import services.evidence_store as evidence_store
+from services.evidence_store import (
+    DERIVATIVE_FORMATS, DERIVATIVE_SIZES, EvidenceBackend, EvidenceStore, LocalEvidenceBackend, is_evidence_hash,
+    parse_range_header, sniff_content_type
+)
+
+
+def png_bytes(size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (10, 120, 40)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = EvidenceStore(LocalEvidenceBackend(str(tmp_path)))
+    # Render derivatives on demand only, so tests don't race the background executor
+    monkeypatch.setattr(store, "schedule_derivatives", lambda evidence_hash: None)
+    return store
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-9", (0, 9)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=-20", (80, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=90-500", (90, 99)),
+    ("bytes=0-1,5-6", None),
+    ("items=0-9", None),
+    ("bytes=a-b", None),
+])
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=50-10"])
+def test_parse_range_header_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range_header(header, 100)
+
+
+def test_ingest_stores_inline_image_by_hash(store):
+    data = png_bytes()
+    encoded = "data:image/png;base64," + base64.b64encode(data).decode()
+    evidence_image, evidence_hash = store.ingest(encoded)
+    assert evidence_image is None
+    assert is_evidence_hash(evidence_hash)
+    assert store.read(evidence_hash) == data
+    # Same bytes, same blob
+    assert store.ingest(base64.b64encode(data).decode()) == (None, evidence_hash)
+
+
+def test_ingest_passes_urls_through(store):
+    assert store.ingest("https://cdn.example.com/a.jpg") == ("https://cdn.example.com/a.jpg", None)
+    assert store.ingest(None) == (None, None)
+
+
+@pytest.mark.parametrize("payload", ["not base64!", base64.b64encode(b"plain text, not an image").decode()])
+def test_ingest_rejects_non_images(store, payload):
+    with pytest.raises(ValueError):
+        store.ingest(payload)
+
+
+def test_get_derivative_renders_and_reuses(store):
+    evidence_hash = store.put(png_bytes((2000, 1000)))
+    key = store.get_derivative(evidence_hash, "thumbnail", "jpeg")
+    assert key == store.derivative_key(evidence_hash, "thumbnail", "jpeg")
+    thumbnail = Image.open(io.BytesIO(store.read(key)))
+    assert max(thumbnail.size) == 320
+    assert store.get_derivative(evidence_hash, "thumbnail", "jpeg") == key
+
+
+def test_new_blobs_schedule_derivatives_once(tmp_path, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(evidence_store._derivative_executor, "submit", lambda fn, *args: submitted.append(args))
+    store = EvidenceStore(LocalEvidenceBackend(str(tmp_path)))
+    data = png_bytes()
+    evidence_hash = store.put(data)
+    store.put(data)
+    assert submitted == [(evidence_hash,)]
+
+
+def test_background_job_renders_every_size_and_format(store):
+    evidence_hash = store.put(png_bytes((2000, 1000)))
+    store._generate_derivatives(evidence_hash)
+    for size, box in DERIVATIVE_SIZES.items():
+        for image_format in DERIVATIVE_FORMATS:
+            rendered = Image.open(io.BytesIO(store.read(store.derivative_key(evidence_hash, size, image_format))))
+            assert rendered.format == DERIVATIVE_FORMATS[image_format][1]
+            assert max(rendered.size) == box[0]
+
+
+def test_background_job_skips_existing_derivatives(store, monkeypatch):
+    evidence_hash = store.put(png_bytes())
+    store.get_derivative(evidence_hash, "thumbnail", "webp")
+    written = []
+    put = store.backend.put
+    monkeypatch.setattr(store.backend, "put", lambda key, data: (written.append(key), put(key, data)))
+    store._generate_derivatives(evidence_hash)
+    assert store.derivative_key(evidence_hash, "thumbnail", "webp") not in written
+    assert len(written) == len(DERIVATIVE_SIZES) * len(DERIVATIVE_FORMATS) - 1
+
+
+def test_background_job_survives_unreadable_blobs(store):
+    corrupt_hash = "e" * 64
+    store.backend.put(corrupt_hash, b"garbage")
+    store._generate_derivatives(corrupt_hash)
+    assert not store.backend.exists(store.derivative_key(corrupt_hash, "thumbnail", "jpeg"))
+
+
+def test_get_derivative_missing_and_corrupt_blobs(store):
+    assert store.get_derivative("0" * 64, "thumbnail", "jpeg") is None
+    # A blob stored before ingest validation existed
+    corrupt_hash = "f" * 64
+    store.backend.put(corrupt_hash, b"garbage")
+    with pytest.raises(ValueError):
+        store.get_derivative(corrupt_hash, "detail", "webp")
+
+
+def test_local_backend_range_reads(store):
+    data = png_bytes()
+    evidence_hash = store.put(data)
+    assert store.size(evidence_hash) == len(data)
+    assert store.read(evidence_hash, 0, 7) == data[:8]
+    assert store.read(evidence_hash, 10) == data[10:]
+    assert sniff_content_type(store.read(evidence_hash, 0, 11)) == "image/png"
+
+
+def test_incomplete_backend_fails_at_construction():
+    class WriteOnlyBackend(EvidenceBackend):
+        def exists(self, key):
+            return False
+
+        def put(self, key, data):
+            pass
+
+    with pytest.raises(TypeError):
+        WriteOnlyBackend()
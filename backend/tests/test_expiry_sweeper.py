@@ -0,0 +1,63 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+
+import services.expiry_sweeper as expiry_sweeper
+from services.expiry_sweeper import ExpirySweeper
+
+
+class FakeRpc:
+    def __init__(self, batches):
+        self.batches = batches
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append(params)
+        batch = self.batches.pop(0) if self.batches else []
+
+        class Call:
+            def execute(self):
+                class Response:
+                    data = batch
+                return Response
+        return Call()
+
+
+def test_sweep_pages_until_a_short_batch(monkeypatch):
+    database = FakeRpc([[{"id": 1}, {"id": 2}], [{"id": 3}]])
+    monkeypatch.setattr(expiry_sweeper, "supabase", database)
+    swept_batches = []
+    sweeper = ExpirySweeper(on_expired=swept_batches.append, batch_size=2)
+
+    swept = sweeper.sweep(datetime(2026, 1, 1, tzinfo=timezone.utc))
+    assert [row["id"] for row in swept] == [1, 2, 3]
+    assert len(database.calls) == 2
+    assert swept_batches == [swept]
+
+
+def test_wake_from_a_worker_thread_triggers_a_sweep(monkeypatch):
+    sweeper = ExpirySweeper()
+    sweeps = []
+    monkeypatch.setattr(sweeper, "sweep", lambda: sweeps.append(1) or [])
+    # Nothing due for an hour, so only wake() can cause a second sweep
+    monkeypatch.setattr(sweeper, "next_expiry", lambda: datetime.now(timezone.utc) + timedelta(hours=1))
+
+    async def run():
+        sweeper.start()
+        while not sweeps:
+            await asyncio.sleep(0.01)
+        thread = threading.Thread(target=sweeper.wake)
+        thread.start()
+        thread.join()
+        for _ in range(100):
+            if len(sweeps) > 1:
+                break
+            await asyncio.sleep(0.01)
+        await sweeper.stop()
+
+    asyncio.run(run())
+    assert len(sweeps) >= 2
+
+
+def test_wake_before_start_is_a_no_op():
+    ExpirySweeper().wake()
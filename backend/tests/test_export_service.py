@@ -0,0 +1,116 @@
+import csv
+import io
+import json
+import re
+
+import pytest
+
+import services.export_service as export_service
+from services.export_service import EXPORT_COLUMNS, ExportService
+
+KEYSET_FILTER = re.compile(r'created_at\.lt\."([^"]+)",and\(created_at\.eq\."[^"]+",id\.lt\."([^"]+)"\)')
+
+
+class FakeTable:
+    """Applies the equality filters and keyset paging the export issues"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+class FakeQuery:
+    def __init__(self, database):
+        self.database = database
+        self.filters = {}
+        self.after = None
+        self.page_size = None
+
+    def select(self, columns):
+        self.columns = columns.split(",")
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def or_(self, filters):
+        self.after = KEYSET_FILTER.fullmatch(filters).groups()
+        return self
+
+    def limit(self, page_size):
+        self.page_size = page_size
+        return self
+
+    def execute(self):
+        self.database.queries.append(dict(self.filters))
+        rows = [row for row in self.database.rows if all(row[column] == value for column, value in self.filters.items())]
+        rows.sort(key=lambda row: (row["created_at"], row["id"]), reverse=True)
+        if self.after:
+            rows = [row for row in rows if (row["created_at"], row["id"]) < self.after]
+
+        class Response:
+            data = [{column: row.get(column) for column in self.columns} for row in rows[:self.page_size]]
+        return Response
+
+
+def renewal(number, status="completed", vehicle_id=1):
+    return {
+        "id": f"{number:04d}",
+        "vehicle_id": vehicle_id,
+        "status": status,
+        "amount_paid": 150.0,
+        "notes": "paid, in cash" if number % 2 else None,
+        "created_at": f"2026-01-01T00:00:{number:02d}",
+    }
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeTable([renewal(number, "pending" if number % 3 == 0 else "completed") for number in range(1, 8)])
+    monkeypatch.setattr(export_service, "supabase", database)
+    return database
+
+
+def test_ndjson_pages_through_the_whole_table(database):
+    chunks = list(ExportService(chunk_size=3).stream("dvla_renewals", "ndjson"))
+    assert len(chunks) == 3
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert [row["id"] for row in rows] == [f"{number:04d}" for number in range(7, 0, -1)]
+    assert set(rows[0]) == set(EXPORT_COLUMNS["dvla_renewals"])
+
+
+def test_filters_skip_none_values(database):
+    chunks = list(ExportService(chunk_size=3).stream("dvla_renewals", "ndjson", {"status": "pending", "vehicle_id": None}))
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert [row["id"] for row in rows] == ["0006", "0003"]
+    assert database.queries == [{"status": "pending"}]
+
+
+def test_csv_writes_one_header_and_quotes_values(database):
+    body = "".join(ExportService(chunk_size=2).stream("dvla_renewals", "csv"))
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert len(rows) == 7
+    assert body.count("renewal_date") == 1
+    assert rows[0]["notes"] == "paid, in cash"
+    assert rows[1]["notes"] == ""
+
+
+def test_csv_of_empty_result_is_just_the_header(database):
+    body = "".join(ExportService().stream("dvla_renewals", "csv", {"status": "cancelled"}))
+    assert body.strip() == ",".join(EXPORT_COLUMNS["dvla_renewals"])
+
+
+def test_violation_export_leaves_out_inline_evidence():
+    assert "evidence_image" not in EXPORT_COLUMNS["violations"]
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        ExportService().stream("vehicles", "xlsx")
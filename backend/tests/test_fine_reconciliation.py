@@ -0,0 +1,157 @@
+import io
+from decimal import Decimal
+
+import pytest
+
+import services.fine_reconciliation as fine_reconciliation
+from services.fine_reconciliation import FineReconciler, write_mismatch_report
+
+
+class FakeFines:
+    """dvla_fines plus the apply_fine_payments() RPC"""
+
+    def __init__(self, fines, paid_concurrently=()):
+        # fine_id -> (amount, payment_status)
+        self.fines = fines
+        self.paid_concurrently = set(paid_concurrently)
+        self.applied = []
+        self.fail_rpc = False
+
+    def table(self, name):
+        return FakeQuery(self)
+
+    def rpc(self, name, params):
+        return FakeRpc(self, params)
+
+
+class FakeQuery:
+    def __init__(self, database):
+        self.database = database
+        self.filters = {}
+        self.fine_ids = None
+        self.after = 0
+        self.page_size = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def gt(self, column, value):
+        self.after = value
+        return self
+
+    def in_(self, column, values):
+        self.fine_ids = set(values)
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, page_size):
+        self.page_size = page_size
+        return self
+
+    def execute(self):
+        rows = [
+            {"id": number, "fine_id": fine_id, "amount": str(amount), "payment_status": status}
+            for number, (fine_id, (amount, status)) in enumerate(sorted(self.database.fines.items()), start=1)
+        ]
+        rows = [row for row in rows if row["id"] > self.after]
+        if "payment_status" in self.filters:
+            rows = [row for row in rows if row["payment_status"] == self.filters["payment_status"]]
+        if self.fine_ids is not None:
+            rows = [row for row in rows if row["fine_id"] in self.fine_ids]
+
+        class Response:
+            data = rows[:self.page_size] if self.page_size else rows
+        return Response
+
+
+class FakeRpc:
+    def __init__(self, database, params):
+        self.database = database
+        self.params = params
+
+    def execute(self):
+        if self.database.fail_rpc:
+            raise RuntimeError("database unavailable")
+        paid = [
+            payment["fine_id"] for payment in self.params["p_payments"]
+            if payment["fine_id"] not in self.database.paid_concurrently
+        ]
+        self.database.applied.extend(paid)
+
+        class Response:
+            data = [{"paid_fine_id": fine_id} for fine_id in paid]
+        return Response
+
+
+@pytest.fixture
+def fines(monkeypatch):
+    database = FakeFines({
+        "F1": (Decimal("100.00"), "unpaid"),
+        "F2": (Decimal("250.50"), "unpaid"),
+        "F3": (Decimal("75.00"), "unpaid"),
+        "F4": (Decimal("40.00"), "paid"),
+        "F5": (Decimal("60.00"), "unpaid"),
+    }, paid_concurrently={"F5"})
+    monkeypatch.setattr(fine_reconciliation, "supabase", database)
+    return database
+
+
+def settlement(*lines):
+    return io.StringIO("Fine_ID, Amount ,payment_method\n" + "".join(line + "\n" for line in lines))
+
+
+def test_reconcile_classifies_every_line(fines):
+    summary = FineReconciler(verified_by=3, chunk_size=2).run(settlement(
+        "F1,100,card",
+        "F2,\"1,250.50\",cash",
+        "F3,75.00,",
+        "F1,100,card",
+        "F4,40,card",
+        "F9,10,card",
+        ",10,card",
+        "F3,abc,card",
+        "F5,60,card",
+    ))
+
+    assert summary.lines_read == 9
+    assert summary.paid == 2
+    assert sorted(fines.applied) == ["F1", "F3"]
+    reasons = {mismatch.line: mismatch.reason for mismatch in summary.mismatches}
+    assert reasons == {
+        2: "amount_mismatch",
+        4: "duplicate_in_file",
+        5: "already_paid",
+        6: "unknown_fine",
+        7: "invalid_line",
+        8: "invalid_line",
+        9: "already_paid",  # paid by someone else after the index was built
+    }
+    mismatch = next(mismatch for mismatch in summary.mismatches if mismatch.line == 2)
+    assert (mismatch.amount, mismatch.expected_amount) == ("1250.50", "250.50")
+    assert next(m for m in summary.mismatches if m.line == 5).expected_amount == "40.00"
+    assert [mismatch.line for mismatch in summary.mismatches] == sorted(reasons)
+
+
+def test_failed_update_reports_its_lines(fines):
+    fines.fail_rpc = True
+    summary = FineReconciler().run(settlement("F1,100,card", "F2,250.5,card"))
+    assert summary.paid == 0
+    assert [mismatch.reason for mismatch in summary.mismatches] == ["update_failed", "update_failed"]
+
+
+def test_missing_columns_are_rejected(fines):
+    with pytest.raises(ValueError):
+        FineReconciler().run(io.StringIO("fine,total\nF1,100\n"))
+
+
+def test_write_mismatch_report(fines):
+    summary = FineReconciler().run(settlement("F9,10,card"))
+    report = io.StringIO()
+    write_mismatch_report(summary.mismatches, report)
+    assert report.getvalue().splitlines() == ["line,fine_id,amount,expected_amount,reason", "1,F9,10.00,,unknown_fine"]
@@ -0,0 +1,161 @@
+import asyncio
+import json
+
+import pytest
+
+import services.metrics_broadcaster as metrics_broadcaster
+from services.metrics_broadcaster import MetricsBroadcaster
+
+
+def parse(message):
+    event, data = message.strip().split("\n")
+    return event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+class CountingSource:
+    """Metrics source returning whatever `metrics` holds, counting computations"""
+
+    def __init__(self, **metrics):
+        self.metrics = metrics
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return dict(self.metrics)
+
+
+@pytest.fixture(autouse=True)
+def fast_debounce(monkeypatch):
+    monkeypatch.setattr(metrics_broadcaster, "METRICS_DEBOUNCE_SECONDS", 0.01)
+
+
+async def settle():
+    await asyncio.sleep(0.05)
+
+
+def test_subscriber_gets_snapshot_then_only_changed_fields():
+    async def scenario():
+        broadcaster = MetricsBroadcaster()
+        source = CountingSource(total=1, pending=1)
+        broadcaster.register("violations", source)
+        broadcaster.start()
+        stream = broadcaster.subscribe(["violations"])
+
+        assert parse(await stream.__anext__()) == ("snapshot", {"topic": "violations", "metrics": {"total": 1, "pending": 1}})
+        source.metrics["total"] = 2
+        broadcaster.notify("violations")
+        assert parse(await stream.__anext__()) == ("delta", {"topic": "violations", "metrics": {"total": 2}})
+        await stream.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_notifications_within_the_debounce_window_compute_once():
+    async def scenario():
+        broadcaster = MetricsBroadcaster()
+        source = CountingSource(total=1)
+        broadcaster.register("violations", source)
+        broadcaster.start()
+        stream = broadcaster.subscribe(["violations"])
+        await stream.__anext__()
+
+        for total in range(2, 7):
+            source.metrics["total"] = total
+            broadcaster.notify("violations")
+        assert parse(await stream.__anext__())[1]["metrics"] == {"total": 6}
+        assert source.calls == 2
+        await stream.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_unchanged_metrics_send_nothing():
+    async def scenario():
+        broadcaster = MetricsBroadcaster()
+        source = CountingSource(total=1)
+        broadcaster.register("violations", source)
+        broadcaster.start()
+        stream = broadcaster.subscribe(["violations"])
+        await stream.__anext__()
+
+        broadcaster.notify("violations")
+        await settle()
+        assert source.calls == 2
+        assert all(queue.empty() for queue in broadcaster._queue_topics)
+        await stream.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_unwatched_topics_are_not_computed():
+    async def scenario():
+        broadcaster = MetricsBroadcaster()
+        source = CountingSource(total=1)
+        broadcaster.register("dvla", source)
+        broadcaster.start()
+        broadcaster.notify("dvla")
+        await settle()
+        assert source.calls == 0
+
+    asyncio.run(scenario())
+
+
+def test_notify_from_a_worker_thread():
+    async def scenario():
+        broadcaster = MetricsBroadcaster()
+        source = CountingSource(total=1)
+        broadcaster.register("violations", source)
+        broadcaster.start()
+        stream = broadcaster.subscribe(["violations"])
+        await stream.__anext__()
+
+        source.metrics["total"] = 3
+        await asyncio.to_thread(broadcaster.notify, "violations")
+        assert parse(await stream.__anext__())[1]["metrics"] == {"total": 3}
+        await stream.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_slow_consumer_is_resynced_with_snapshots(monkeypatch):
+    monkeypatch.setattr(metrics_broadcaster, "SUBSCRIBER_QUEUE_SIZE", 2)
+
+    async def scenario():
+        broadcaster = MetricsBroadcaster()
+        violations = CountingSource(total=0)
+        dvla = CountingSource(vehicles=10)
+        broadcaster.register("violations", violations)
+        broadcaster.register("dvla", dvla)
+        broadcaster.start()
+        stream = broadcaster.subscribe(["violations", "dvla"])
+        await stream.__anext__()
+        await stream.__anext__()
+
+        # Three deltas arrive while the client reads nothing; the third overflows its queue
+        for total in range(1, 4):
+            violations.metrics["total"] = total
+            broadcaster.notify("violations")
+            await settle()
+
+        messages = [parse(await stream.__anext__()) for _ in range(2)]
+        assert messages == [
+            ("snapshot", {"topic": "violations", "metrics": {"total": 3}}),
+            ("snapshot", {"topic": "dvla", "metrics": {"vehicles": 10}}),
+        ]
+        await stream.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_closed_stream_unsubscribes():
+    async def scenario():
+        broadcaster = MetricsBroadcaster()
+        broadcaster.register("violations", CountingSource(total=1))
+        broadcaster.start()
+        stream = broadcaster.subscribe(["violations"])
+        await stream.__anext__()
+        await stream.aclose()
+        assert broadcaster._subscribers["violations"] == set()
+        assert broadcaster._queue_topics == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,84 @@
+import pytest
+
+from database.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, apply_keyset, clamp_page_size, decode_cursor, decode_rank_cursor, encode_cursor,
+    row_cursor, split_page, split_ranked_page
+)
+
+
+class RecordingQuery:
+    """Records the PostgREST builder calls apply_keyset makes"""
+
+    def __init__(self):
+        self.calls = []
+
+    def order(self, column, desc=False):
+        self.calls.append(("order", column, desc))
+        return self
+
+    def or_(self, filters):
+        self.calls.append(("or", filters))
+        return self
+
+    def limit(self, count):
+        self.calls.append(("limit", count))
+        return self
+
+
+@pytest.mark.parametrize("requested, expected", [
+    (None, DEFAULT_PAGE_SIZE), (0, DEFAULT_PAGE_SIZE), (-5, DEFAULT_PAGE_SIZE), (10, 10), (10000, MAX_PAGE_SIZE),
+])
+def test_clamp_page_size(requested, expected):
+    assert clamp_page_size(requested) == expected
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("2026-01-01T12:00:00+00:00", "0b9e4c2e-6a57-4a44-9d0f-9c1b0d2e7f11")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ["2026-01-01T12:00:00+00:00", "0b9e4c2e-6a57-4a44-9d0f-9c1b0d2e7f11"]
+    assert decode_cursor(encode_cursor(0.75, 42)) == [0.75, 42]
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor!", "%%%%", "eyJhIjoxfQ"])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_apply_keyset_first_page():
+    query = apply_keyset(RecordingQuery(), None, 20)
+    assert query.calls == [("order", "created_at", True), ("order", "id", True), ("limit", 21)]
+
+
+def test_apply_keyset_resumes_after_cursor():
+    cursor = row_cursor({"created_at": "2026-01-01T12:00:00", "id": "abc"})
+    query = apply_keyset(RecordingQuery(), cursor, 20)
+    assert ("or", 'created_at.lt."2026-01-01T12:00:00",and(created_at.eq."2026-01-01T12:00:00",id.lt."abc")') in query.calls
+
+
+def test_apply_keyset_rejects_quote_injection():
+    with pytest.raises(ValueError):
+        apply_keyset(RecordingQuery(), encode_cursor('2026"', "abc"), 20)
+
+
+def test_split_page():
+    rows = [{"created_at": f"2026-01-0{day}", "id": str(day)} for day in range(9, 0, -1)]
+    page, next_cursor = split_page(rows[:4], 3)
+    assert page == rows[:3]
+    assert decode_cursor(next_cursor) == ["2026-01-07", "7"]
+    assert split_page(rows[:3], 3) == (rows[:3], None)
+    assert split_page([], 3) == ([], None)
+
+
+def test_split_ranked_page():
+    rows = [{"rank": 1.5, "id": 4}, {"rank": 0.8, "id": 3}, {"rank": 0.8, "id": 7}]
+    page, next_cursor = split_ranked_page(rows, 2)
+    assert page == rows[:2]
+    assert decode_rank_cursor(next_cursor) == (0.8, 3)
+    assert split_ranked_page(rows, 3) == (rows, None)
+
+
+@pytest.mark.parametrize("cursor", [encode_cursor("x", 1), encode_cursor(True, 1), encode_cursor(1.0), "%%%%"])
+def test_decode_rank_cursor_rejects_other_cursors(cursor):
+    with pytest.raises(ValueError):
+        decode_rank_cursor(cursor)
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+import pytest
+
+from services.password_pool import PasswordHashPool, PasswordPoolBusy
+
+
+def blocking(release: threading.Event, value):
+    release.wait(5)
+    return value
+
+
+async def wait_until(predicate):
+    for _ in range(200):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition never became true")
+
+
+def test_run_returns_result_and_counts():
+    pool = PasswordHashPool(workers=1, max_queue=1)
+    assert asyncio.run(pool.run(lambda a, b: a + b, 2, 3)) == 5
+    metrics = pool.metrics()
+    assert metrics["completed"] == 1
+    assert metrics["running"] == 0 and metrics["queue_depth"] == 0
+
+
+def test_run_propagates_errors():
+    pool = PasswordHashPool(workers=1, max_queue=0)
+
+    def fail():
+        raise ValueError("bad hash")
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await pool.run(fail)
+        # The failed job gave its slot back
+        assert await pool.run(lambda: "ok") == "ok"
+
+    asyncio.run(scenario())
+
+
+def test_rejects_beyond_workers_plus_queue():
+    pool = PasswordHashPool(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.create_task(pool.run(blocking, release, 1))
+        second = asyncio.create_task(pool.run(blocking, release, 2))
+        await wait_until(lambda: pool.metrics()["running"] == 1)
+        with pytest.raises(PasswordPoolBusy):
+            await pool.run(blocking, release, 3)
+        assert pool.metrics()["rejected"] == 1
+        assert pool.metrics()["queue_depth"] == 1
+        release.set()
+        assert await asyncio.gather(first, second) == [1, 2]
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_keeps_slot_until_job_finishes():
+    pool = PasswordHashPool(workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def scenario():
+        caller = asyncio.create_task(pool.run(blocking, release, 1))
+        await wait_until(lambda: pool.metrics()["running"] == 1)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        # bcrypt is still running in the worker, so the pool is still full
+        with pytest.raises(PasswordPoolBusy):
+            await pool.run(blocking, release, 2)
+        release.set()
+        await wait_until(lambda: pool.metrics()["completed"] == 1)
+        assert await pool.run(lambda: "free") == "free"
+
+    asyncio.run(scenario())
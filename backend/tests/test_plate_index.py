@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+import services.vehicle_service as vehicle_service
+from services.plate_index import PlateIndex, normalize_plate, plate_distance
+from services.vehicle_service import VehicleService
+
+
+@pytest.fixture
+def index():
+    index = PlateIndex()
+    index.build(["GR 1234-20", "GT 8080-19", "AS 5511-21", "GW 2020-22"])
+    return index
+
+
+def test_normalize_plate():
+    assert normalize_plate("gr 1234-20") == "GR123420"
+    assert normalize_plate("GW/55 - 21") == "GW5521"
+
+
+def test_plate_distance_weights_ocr_confusions():
+    assert plate_distance("GR123420", "GR123420") == 0
+    assert plate_distance("GR123420", "GR1234Z0") == 1  # 2/Z is half an edit
+    assert plate_distance("GR123420", "GR123X20") == 2  # one regular edit
+    assert plate_distance("GR123420", "GR12342") == 2  # one deletion
+
+
+def test_search_tolerates_confusable_characters(index):
+    assert index.search("GT B0B0-19")[0] == ("GT 8080-19", 1.0)
+    assert index.search("GR 1234-20") == [("GR 1234-20", 0.0)]
+    assert index.search("AS 55l1-21") == [("AS 5511-21", 0.5)]
+
+
+def test_search_allows_one_regular_edit(index):
+    assert index.search("GR 123-20") == [("GR 1234-20", 1.0)]
+    assert index.search("GR 12-20") == []
+    assert index.search("") == []
+
+
+def test_search_respects_max_distance_and_limit(index):
+    assert index.search("GR 1234-2O", max_distance=0.5) == [("GR 1234-20", 0.5)]
+    assert index.search("GR 1234-2X", max_distance=0.5) == []
+    index.build(["GR 1234-21", "GR 1234-22", "GR 1234-23"])
+    assert len(index.search("GR 1234-2", limit=2)) == 2
+
+
+def test_add_is_idempotent(index):
+    size = len(index)
+    index.add("gr 1234-20")
+    assert len(index) == size
+    assert "GR1234-20" in index
+
+
+class FakeVehicles:
+    """Serves vehicle plates a page at a time, like a keyset-paged select"""
+
+    def __init__(self, plates):
+        self.rows = [{"id": f"{number:08d}", "plate_number": plate} for number, plate in enumerate(plates)]
+        self.queries = 0
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+class FakeQuery:
+    def __init__(self, database):
+        self.database = database
+        self.after = None
+        self.page_size = None
+
+    def select(self, columns):
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, page_size):
+        self.page_size = page_size
+        return self
+
+    def gt(self, column, value):
+        self.after = value
+        return self
+
+    def execute(self):
+        self.database.queries += 1
+
+        class Response:
+            data = [row for row in self.database.rows if self.after is None or row["id"] > self.after][:self.page_size]
+        return Response
+
+
+def test_refresh_pages_by_id_and_coalesces(monkeypatch):
+    monkeypatch.setattr(vehicle_service, "PLATE_INDEX_PAGE_SIZE", 2)
+    database = FakeVehicles(["GR 1-20", "GR 2-20", "GR 3-20", "GR 4-20", "GR 5-20"])
+    monkeypatch.setattr(vehicle_service, "supabase", database)
+    service = VehicleService()
+
+    async def run():
+        await asyncio.gather(*(service.find_similar_plates("GR 3-2O") for _ in range(5)))
+        return await service.find_similar_plates("GR 5-2O")
+
+    candidates = asyncio.run(run())
+    assert len(service.plate_index) == 5
+    assert database.queries == 3  # one load of three pages for all concurrent first calls
+    assert candidates[0].plate_number == "GR 5-20"
+
+
+def test_refresh_drops_deleted_plates_and_keeps_new_ones(monkeypatch):
+    database = FakeVehicles(["GR 1-20", "GR 2-20"])
+    monkeypatch.setattr(vehicle_service, "supabase", database)
+    service = VehicleService()
+    asyncio.run(service.refresh_plate_index())
+    assert "GR 2-20" in service.plate_index
+
+    database.rows.pop()
+    original_load = service.load_plate_index
+
+    def load_while_vehicle_created():
+        # A vehicle registered mid-rebuild must survive the swap
+        service._index_plate("GR 9-20")
+        return original_load()
+
+    monkeypatch.setattr(service, "load_plate_index", load_while_vehicle_created)
+    asyncio.run(service.refresh_plate_index())
+    assert "GR 2-20" not in service.plate_index
+    assert "GR 9-20" in service.plate_index
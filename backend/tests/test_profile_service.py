@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+import services.profile_service as profile_service
+from services.profile_service import ProfileService
+from tests.test_violation_lookup import violation_row
+
+PLATE = 'GR 1234-23'
+
+
+def vehicle_row(plate_number):
+    return {
+        "id": "v-1", "plate_number": plate_number, "vehicle_type": "private", "make": "Toyota", "model": "Corolla",
+        "year": 2020, "color": "Silver", "engine_number": "E1", "chassis_number": "C1", "owner_name": "Kwame Asante",
+        "owner_phone": "+233241234567", "owner_email": None, "owner_address": "Accra",
+        "registration_date": "2023-01-01T00:00:00", "expiry_date": "2027-01-01T00:00:00",
+        "status": "active", "created_at": "2023-01-01T00:00:00", "updated_at": "2023-01-01T00:00:00", "registered_by": "u-1",
+    }
+
+
+def dvla_row(plate_number):
+    return {
+        "id": 7, "reg_number": plate_number, "license_plate": plate_number, "manufacturer": "Toyota", "model": "Corolla",
+        "vehicle_type": "Sedan", "year_of_manufacture": 2020, "color": "Silver", "owner_name": "Kwame Asante",
+        "status": "active", "created_at": "2023-01-01T00:00:00",
+        "dvla_renewals": [{"id": 3, "vehicle_id": 7, "renewal_date": "2026-01-01", "expiry_date": "2027-01-01", "status": "completed"}],
+        "dvla_fines": [{
+            "id": 4, "fine_id": "F-1", "vehicle_id": 7, "offense_description": "Speeding",
+            "offense_date": "2025-06-01T10:00:00", "offense_location": "Accra", "amount": "200.00",
+        }],
+    }
+
+
+class FakeTables:
+    """Answers the three profile queries from per-table rows, recording the filters used"""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.filters = {}
+        self.queries = 0
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+class FakeQuery:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self.database.filters[self.name] = (column, value)
+        return self
+
+    def or_(self, filters):
+        self.database.filters[self.name] = filters
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def limit(self, *args, **kwargs):
+        return self
+
+    def execute(self):
+        self.database.queries += 1
+
+        class Response:
+            data = [dict(row) for row in self.database.tables.get(self.name, [])]
+        return Response
+
+
+def use(monkeypatch, tables):
+    database = FakeTables(tables)
+    monkeypatch.setattr(profile_service, "supabase", database)
+    return database
+
+
+def test_profile_joins_police_and_dvla_records(monkeypatch):
+    database = use(monkeypatch, {
+        "vehicles": [vehicle_row(PLATE)],
+        "violations": [violation_row(PLATE, "officer", minutes) for minutes in range(3)],
+        "dvla_vehicles": [dvla_row(PLATE)],
+    })
+
+    profile = asyncio.run(ProfileService().get_profile(PLATE))
+    assert profile.vehicle.make == "Toyota"
+    assert len(profile.violations) == 3
+    assert profile.dvla_vehicle.id == 7
+    assert [renewal.id for renewal in profile.renewals] == [3]
+    assert [fine.fine_id for fine in profile.fines] == ["F-1"]
+    assert database.filters["vehicles"] == ("plate_number", PLATE)
+    assert database.filters["dvla_vehicles"] == f'reg_number.eq."{PLATE}",license_plate.eq."{PLATE}"'
+
+
+def test_unknown_plate_gives_an_empty_profile(monkeypatch):
+    use(monkeypatch, {})
+    profile = asyncio.run(ProfileService().get_profile("NO 0000-00"))
+    # The endpoint answers 404 for a profile with nothing in it
+    assert profile.vehicle is None and profile.dvla_vehicle is None and profile.violations == []
+    assert profile.renewals == [] and profile.fines == []
+
+
+def test_plate_is_quoted_inside_the_dvla_filter(monkeypatch):
+    database = use(monkeypatch, {})
+    asyncio.run(ProfileService().get_profile('GR 1",id.gt.0'))
+    assert database.filters["dvla_vehicles"] == 'reg_number.eq."GR 1\\",id.gt.0",license_plate.eq."GR 1\\",id.gt.0"'
+
+
+def test_profiles_are_cached_per_plate(monkeypatch):
+    database = use(monkeypatch, {"vehicles": [vehicle_row(PLATE)]})
+    service = ProfileService()
+
+    async def run():
+        await asyncio.gather(*(service.get_profile(PLATE) for _ in range(3)))
+        await service.get_profile(PLATE)
+
+    asyncio.run(run())
+    assert database.queries == 3
+
+
+def test_query_failures_are_not_cached(monkeypatch):
+    use(monkeypatch, {"vehicles": [{"plate_number": PLATE}]})
+    service = ProfileService()
+    with pytest.raises(Exception):
+        asyncio.run(service.get_profile(PLATE))
+    assert service.cache.get(PLATE) is None
@@ -0,0 +1,51 @@
+import pytest
+
+from services import rate_limiter
+from services.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    return clock
+
+
+def test_allows_burst_then_reports_wait(clock):
+    limiter = RateLimiter(per_minute=6, burst=2)
+    assert limiter.acquire("alice") == 0
+    assert limiter.acquire("alice") == 0
+    assert limiter.acquire("alice") == pytest.approx(10.0)
+
+
+def test_refills_over_time(clock):
+    limiter = RateLimiter(per_minute=6, burst=1)
+    assert limiter.acquire("alice") == 0
+    assert limiter.acquire("alice") > 0
+    clock.now += 10
+    assert limiter.acquire("alice") == 0
+
+
+def test_keys_are_independent(clock):
+    limiter = RateLimiter(per_minute=1, burst=1)
+    assert limiter.acquire("alice") == 0
+    assert limiter.acquire("alice") > 0
+    assert limiter.acquire("bob") == 0
+
+
+def test_tracks_only_most_recent_keys(clock):
+    limiter = RateLimiter(per_minute=1, burst=1, max_keys=2)
+    for key in ("a", "b", "c"):
+        limiter.acquire(key)
+    assert len(limiter) == 2
+    # "a" was evicted, so it starts again with a full bucket
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("c") > 0
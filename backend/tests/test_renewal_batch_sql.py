@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+
+import pytest
+
+from tests.conftest import setup_sql
+
+# Stand-in for the Supabase vehicles table: the columns process_renewals updates
+VEHICLES_TABLE = """
+CREATE TABLE vehicles (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    dvla_vehicle_id BIGINT REFERENCES dvla_vehicles(id),
+    expiry_date TIMESTAMPTZ NOT NULL,
+    insurance_expiry TIMESTAMPTZ,
+    road_worthiness_expiry TIMESTAMPTZ,
+    status VARCHAR(20) NOT NULL DEFAULT 'active',
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+"""
+
+
+@pytest.fixture
+def registry(pg):
+    for name in ("dvla_users_sql", "dvla_vehicles_sql", "dvla_renewals_sql"):
+        pg.execute(setup_sql(name))
+    pg.execute(VEHICLES_TABLE)
+    pg.execute("CREATE UNIQUE INDEX ON dvla_renewals(transaction_id) WHERE transaction_id IS NOT NULL")
+    pg.execute(setup_sql("renewal_batch_items_sql"))
+    pg.execute(setup_sql("process_renewals_sql"))
+    pg.execute("""
+        INSERT INTO dvla_vehicles (reg_number, manufacturer, model, vehicle_type, chassis_number, year_of_manufacture,
+                                   vin, license_plate, color, use_type, date_of_entry, owner_name, owner_address,
+                                   owner_phone, owner_email)
+        VALUES ('GR 1-23', 'Toyota', 'Corolla', 'Sedan', 'C1', 2023, 'V1', 'GR 1-23', 'Silver', 'Private',
+                '2024-01-01', 'Kwame', 'Accra', '+233', 'k@example.com')
+    """)
+    pg.execute("""
+        INSERT INTO vehicles (dvla_vehicle_id, expiry_date, insurance_expiry, status)
+        VALUES (1, '2020-01-01', '2030-01-01', 'expired')
+    """)
+    return pg
+
+
+def renewal(transaction_id, vehicle_id=1, expiry_date="2031-01-01"):
+    return {"vehicle_id": vehicle_id, "renewal_date": "2026-01-01", "expiry_date": expiry_date,
+            "status": "completed", "amount_paid": 150, "payment_method": "cash", "transaction_id": transaction_id}
+
+
+def process(connection, renewals):
+    return connection.execute("SELECT * FROM process_renewals(%s::JSONB)", (json.dumps(renewals),)).fetchall()
+
+
+def test_outcomes_for_new_repeated_and_unknown_renewals(registry):
+    first = process(registry, [renewal("t1")])
+    assert [(index, outcome) for index, _, outcome in first] == [(0, "created")]
+    original_id = first[0][1]
+
+    rows = process(registry, [renewal("t2"), renewal("t1"), renewal("t3", vehicle_id=99), renewal("t2")])
+    assert [(index, outcome) for index, _, outcome in rows] == [
+        (0, "created"), (1, "duplicate"), (2, "vehicle_not_found"), (3, "duplicate")
+    ]
+    assert rows[1][1] == original_id
+    assert rows[3][1] == rows[0][1]
+    assert registry.execute("SELECT COUNT(*) FROM dvla_renewals").fetchone()[0] == 2
+
+
+def test_completed_renewal_extends_and_reactivates_the_vehicle(registry):
+    process(registry, [renewal("t1", expiry_date="2029-06-01"), renewal("t2", expiry_date="2031-01-01")])
+    expiry, status = registry.execute("SELECT expiry_date::DATE::TEXT, status FROM vehicles").fetchone()
+    assert (expiry, status) == ("2031-01-01", "active")
+
+
+def test_concurrent_duplicate_reports_the_committed_renewal(registry):
+    psycopg = pytest.importorskip("psycopg")
+    schema = registry.execute("SELECT current_schema()").fetchone()[0]
+
+    def connect():
+        connection = psycopg.connect(os.environ["TEST_DATABASE_URL"])
+        connection.execute(f"SET search_path TO {schema}, public")
+        connection.commit()
+        return connection
+
+    with connect() as first, connect() as second:
+        # The first batch holds its uncommitted insert while the second tries the same transaction_id
+        created = process(first, [renewal("t1")])
+        results = []
+        worker = threading.Thread(target=lambda: results.append(process(second, [renewal("t1")])))
+        worker.start()
+        worker.join(0.5)
+        assert worker.is_alive()  # Waiting on the conflicting row
+        first.commit()
+        worker.join(5)
+        second.commit()
+
+    assert results[0] == [(0, created[0][1], "duplicate")]
@@ -0,0 +1,83 @@
+import time
+
+import jwt
+import pytest
+
+import services.cache as cache
+import services.token_verifier as token_verifier
+from services.token_verifier import TokenVerifier
+
+SECRET = "token-verifier-test-secret-0123456789"
+
+
+def token(secret=SECRET, algorithm="HS256", lifetime=60.0, **claims):
+    claims.setdefault("sub", "42")
+    if lifetime is not None:
+        claims["exp"] = time.time() + lifetime
+    return jwt.encode(claims, secret, algorithm=algorithm)
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    calls = []
+    decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(token_verifier.jwt, "decode", counting_decode)
+    return calls
+
+
+def test_valid_claims_are_cached_until_exp(decodes, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: clock[0])
+    verifier = TokenVerifier(SECRET, "HS256")
+    issued = token(lifetime=60, role="officer")
+
+    assert verifier.verify(issued)["role"] == "officer"
+    clock[0] += 59
+    assert verifier.verify(issued)["sub"] == "42"
+    assert len(decodes) == 1
+
+    # Past the token's exp the cached claims are gone and the token is verified again
+    clock[0] += 2
+    verifier.verify(issued)
+    assert len(decodes) == 2
+
+
+def test_expired_token_is_rejected_every_time(decodes):
+    verifier = TokenVerifier(SECRET, "HS256")
+    expired = token(lifetime=-10)
+    for _ in range(2):
+        with pytest.raises(jwt.ExpiredSignatureError):
+            verifier.verify(expired)
+    assert len(decodes) == 2
+
+
+@pytest.mark.parametrize("bad_token", [
+    token(secret="someone-elses-secret-0123456789abcdef"),
+    token(lifetime=None),
+    token(sub=None),
+    jwt.encode({"sub": "42", "exp": time.time() + 60}, key=None, algorithm="none"),
+    "not.a.jwt",
+])
+def test_invalid_tokens_raise_invalid_token_error(bad_token):
+    with pytest.raises(jwt.InvalidTokenError):
+        TokenVerifier(SECRET, "HS256").verify(bad_token)
+
+
+def test_tampered_payload_is_rejected():
+    header, payload, signature = token(role="officer").split(".")
+    forged = jwt.encode({"sub": "1", "role": "admin", "exp": time.time() + 60}, "forger-secret-0123456789abcdef0123", algorithm="HS256").split(".")[1]
+    with pytest.raises(jwt.InvalidSignatureError):
+        TokenVerifier(SECRET, "HS256").verify(".".join([header, forged, signature]))
+
+
+def test_expiry_is_reported_distinctly_from_other_failures():
+    # authenticate_token answers "Token expired" vs "Invalid token" on this distinction
+    assert issubclass(jwt.ExpiredSignatureError, jwt.InvalidTokenError)
+    with pytest.raises(jwt.InvalidTokenError) as excinfo:
+        TokenVerifier(SECRET, "HS256").verify(token(secret="another-test-secret-0123456789abcdef"))
+    assert not isinstance(excinfo.value, jwt.ExpiredSignatureError)
@@ -0,0 +1,143 @@
+import asyncio
+import importlib.util
+import os
+
+import pytest
+
+from database.pagination import decode_cursor, encode_cursor
+from services.dvla_service import DVLAService
+
+
+def load_setup_client():
+    """backend/supabase/client.py is a standalone script module; the installed supabase package shadows its path"""
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "supabase", "client.py")
+    spec = importlib.util.spec_from_file_location("setup_supabase_client", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def dvla_vehicle(vehicle_id):
+    return {
+        "id": vehicle_id, "reg_number": f"GR {vehicle_id}-23", "license_plate": f"GR {vehicle_id}-23",
+        "manufacturer": "Toyota", "model": "Corolla", "vehicle_type": "Sedan", "year_of_manufacture": 2023,
+        "color": "Silver", "use_type": "Private", "owner_name": "Kwame Asante", "status": "active",
+    }
+
+
+class FakeRegistry:
+    """Serves the ranked search RPCs and id-ordered listings over a fixed set of rows"""
+
+    def __init__(self, ranked):
+        # (rank, id) pairs, searched in (rank DESC, id) order like the SQL functions
+        self.ranked = sorted(ranked, key=lambda pair: (-pair[0], pair[1]))
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append((name, dict(params)))
+        after_rank, after_id = params.get("p_after_rank"), params.get("p_after_id")
+        rows = [
+            {"id": row_id, "rank": rank, "vehicle": dvla_vehicle(row_id)}
+            for rank, row_id in self.ranked
+            if after_rank is None or rank < after_rank or (rank == after_rank and row_id > after_id)
+        ]
+        return Result(rows[:params["p_limit"]])
+
+    def table(self, name):
+        return FakeListing(self)
+
+
+class FakeListing:
+    def __init__(self, registry):
+        self.registry = registry
+        self.after_id = None
+
+    def select(self, columns):
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    def gt(self, column, value):
+        self.after_id = value
+        return self
+
+    def execute(self):
+        self.registry.calls.append(("list", self.after_id))
+        ids = sorted(row_id for _, row_id in self.registry.ranked)
+        ids = [row_id for row_id in ids if self.after_id is None or row_id > self.after_id]
+        return Result([dvla_vehicle(row_id) for row_id in ids[:self.count]])
+
+
+class Result:
+    def __init__(self, data):
+        self.data = data
+
+    def execute(self):
+        return self
+
+
+def collect(fetch):
+    """Follow next cursors until the last page, returning the pages' ids"""
+    pages, cursor = [], None
+    while True:
+        rows, cursor = fetch(cursor)
+        pages.append([row["id"] if isinstance(row, dict) else row.id for row in rows])
+        if not cursor:
+            return pages
+
+
+@pytest.fixture
+def registry():
+    return FakeRegistry([(1.5, 4), (0.5, 1), (1.5, 2), (0.8, 3), (0.5, 5)])
+
+
+@pytest.fixture
+def dvla(registry):
+    service = DVLAService()
+    service.supabase = registry
+    return service
+
+
+def test_dvla_search_pages_by_rank_and_id(dvla, registry):
+    pages = collect(lambda cursor: asyncio.run(dvla.get_vehicles("GR", limit=2, cursor=cursor)))
+    assert pages == [[2, 4], [3, 1], [5]]
+    assert all("p_offset" not in params for _, params in registry.calls)
+    assert registry.calls[1][1]["p_after_rank"] == 1.5 and registry.calls[1][1]["p_after_id"] == 4
+
+
+def test_dvla_listing_pages_by_id(dvla, registry):
+    pages = collect(lambda cursor: asyncio.run(dvla.get_vehicles(limit=2, cursor=cursor)))
+    assert pages == [[1, 2], [3, 4], [5]]
+    assert registry.calls == [("list", None), ("list", 2), ("list", 4)]
+
+
+def test_exact_final_page_has_no_cursor(dvla):
+    vehicles, next_cursor = asyncio.run(dvla.get_vehicles(limit=5))
+    assert len(vehicles) == 5 and next_cursor is None
+
+
+@pytest.mark.parametrize("search, cursor", [
+    ("GR", "garbage!"), ("GR", encode_cursor("high", 4)), ("GR", encode_cursor(1.5, "4")), (None, encode_cursor(1.5, 4)),
+])
+def test_dvla_rejects_malformed_cursors(dvla, search, cursor):
+    with pytest.raises(ValueError):
+        asyncio.run(dvla.get_vehicles(search, cursor=cursor))
+
+
+def test_client_search_returns_rows_and_rank_cursor(registry, monkeypatch):
+    # The module builds its client at import time from the service key
+    monkeypatch.setenv("SUPABASE_SERVICE_KEY", os.environ["SUPABASE_ANON_KEY"])
+    setup_client = load_setup_client()
+    client = setup_client.SupabaseClient.__new__(setup_client.SupabaseClient)
+    client.client = registry
+
+    rows, next_cursor = client.search_vehicles("GR", limit=3)
+    assert [row["id"] for row in rows] == [2, 4, 3]
+    assert decode_cursor(next_cursor) == [0.8, 3]
+    pages = collect(lambda cursor: client.search_vehicles("GR", limit=3, cursor=cursor))
+    assert pages == [[2, 4, 3], [1, 5]]
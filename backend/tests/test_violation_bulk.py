@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+import pytest
+
+import services.violation_service as violation_service
+from services.violation_service import ViolationService
+
+
+def record(plate_number, **overrides):
+    return {
+        "plate_number": plate_number,
+        "violation_type": "speeding",
+        "severity": "minor",
+        "location": "Accra",
+        "description": "Speeding",
+        "fine_amount": 100.0,
+        **overrides,
+    }
+
+
+class FakeViolations:
+    """Stores inserted rows; plates listed in `rejected` fail the way a constraint violation would"""
+
+    def __init__(self, rejected=(), fail_chunk_after_commit=False):
+        self.rows = {}
+        self.rejected = set(rejected)
+        self.fail_chunk_after_commit = fail_chunk_after_commit
+        self.calls = []
+        self.threads = set()
+
+    def table(self, name):
+        return FakeWrite(self)
+
+
+class FakeWrite:
+    def __init__(self, database):
+        self.database = database
+
+    def insert(self, rows, returning=None):
+        self.operation, self.rows = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False, returning=None):
+        assert on_conflict == "id" and ignore_duplicates
+        self.operation, self.rows = "upsert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def execute(self):
+        database = self.database
+        database.threads.add(threading.get_ident())
+        database.calls.append((self.operation, len(self.rows)))
+        if any(row["plate_number"] in database.rejected for row in self.rows):
+            raise Exception("violates check constraint")
+        for row in self.rows:
+            if row["id"] in database.rows and self.operation == "insert":
+                raise Exception("duplicate key value violates unique constraint")
+            database.rows.setdefault(row["id"], row)
+        if self.operation == "insert" and len(self.rows) > 1 and database.fail_chunk_after_commit:
+            database.fail_chunk_after_commit = False
+            raise Exception("timed out waiting for response")
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(violation_service, "WRITE_BEHIND_ENABLED", False)
+    return ViolationService()
+
+
+def test_bulk_create_reports_invalid_and_rejected_records(service, monkeypatch):
+    database = FakeViolations(rejected={"BAD 1-20"})
+    monkeypatch.setattr(violation_service, "supabase", database)
+    records = [record("GR 1-20"), record("GR 2-20", severity="medium"), record("BAD 1-20"), record("GR 3-20")]
+
+    result = asyncio.run(service.create_violations(records, "officer"))
+    assert (result.created, result.failed) == (2, 2)
+    assert [item.index for item in result.results] == [0, 1, 2, 3]
+    assert [item.success for item in result.results] == [True, False, False, True]
+    assert "severity" in result.results[1].error
+    assert "constraint" in result.results[2].error
+    assert set(database.rows) == {result.results[0].violation_id, result.results[3].violation_id}
+    assert database.calls == [("insert", 3), ("upsert", 1), ("upsert", 1), ("upsert", 1)]
+
+
+def test_bulk_create_counts_rows_committed_before_an_ambiguous_failure(service, monkeypatch):
+    database = FakeViolations(fail_chunk_after_commit=True)
+    monkeypatch.setattr(violation_service, "supabase", database)
+
+    result = asyncio.run(service.create_violations([record("GR 1-20"), record("GR 2-20")], "officer"))
+    assert (result.created, result.failed) == (2, 0)
+    assert len(database.rows) == 2
+
+
+def test_bulk_create_splits_chunks_and_writes_off_the_event_loop(service, monkeypatch):
+    database = FakeViolations()
+    monkeypatch.setattr(violation_service, "supabase", database)
+    monkeypatch.setattr(violation_service, "BULK_INSERT_CHUNK_SIZE", 2)
+
+    result = asyncio.run(service.create_violations([record(f"GR {n}-20") for n in range(5)], "officer"))
+    assert result.created == 5
+    assert database.calls == [("insert", 2), ("insert", 2), ("insert", 1)]
+    assert threading.get_ident() not in database.threads
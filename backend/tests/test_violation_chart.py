@@ -0,0 +1,142 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+import services.violation_service as violation_service
+from services.violation_service import ViolationService
+from tests.conftest import setup_sql
+from tests.test_violation_counters import counters, insert  # noqa: F401 (fixture)
+
+
+class FakeChartRpc:
+    """Records violation_chart() calls and answers with canned rows"""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        return self
+
+    def execute(self):
+        class Response:
+            data = self.rows
+        return Response
+
+
+class PostgresChartRpc:
+    """Runs violation_chart() against the test database, shaped like a PostgREST response"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def rpc(self, name, params):
+        self.params = params
+        return self
+
+    def execute(self):
+        rows = self.connection.execute(
+            "SELECT * FROM violation_chart(%(p_start)s, %(p_end)s, %(p_bucket)s, %(p_location)s, %(p_violation_type)s)",
+            self.params
+        ).fetchall()
+
+        class Response:
+            data = [{"bucket": bucket.isoformat(), "status": status, "violation_count": count}
+                    for bucket, status, count in rows]
+        return Response
+
+
+def chart(**kwargs):
+    return asyncio.run(ViolationService().get_violation_chart(**kwargs))
+
+
+def test_week_chart_fills_empty_days(monkeypatch):
+    rpc = FakeChartRpc([
+        {"bucket": "2026-03-02T00:00:00+00:00", "status": "pending", "violation_count": 3},
+        {"bucket": "2026-03-02T00:00:00+00:00", "status": "approved", "violation_count": 2},
+        {"bucket": "2026-03-05T00:00:00+00:00", "status": "rejected", "violation_count": 1},
+    ])
+    monkeypatch.setattr(violation_service, "supabase", rpc)
+
+    result = chart(period="week", end=date(2026, 3, 5))
+    assert rpc.calls == [("violation_chart", {
+        "p_start": "2026-02-27T00:00:00+00:00",
+        "p_end": "2026-03-06T00:00:00+00:00",
+        "p_bucket": "day",
+        "p_location": None,
+        "p_violation_type": None,
+    })]
+    assert [point["bucket"][:10] for point in result["series"]] == [
+        "2026-02-27", "2026-02-28", "2026-03-01", "2026-03-02", "2026-03-03", "2026-03-04", "2026-03-05"
+    ]
+    assert result["series"][3] == {"bucket": "2026-03-02T00:00:00+00:00", "total": 5, "pending": 3,
+                                   "approved": 2, "rejected": 0, "paid": 0, "appealed": 0}
+    assert result["series"][6]["rejected"] == 1
+    assert sum(point["total"] for point in result["series"]) == 6
+
+
+def test_year_chart_spans_month_boundaries(monkeypatch):
+    rpc = FakeChartRpc()
+    monkeypatch.setattr(violation_service, "supabase", rpc)
+
+    result = chart(period="year", end=date(2026, 2, 10), location="Accra", violation_type="speeding")
+    params = rpc.calls[0][1]
+    assert (params["p_start"], params["p_end"], params["p_bucket"]) == (
+        "2025-03-01T00:00:00+00:00", "2026-03-01T00:00:00+00:00", "month"
+    )
+    assert (params["p_location"], params["p_violation_type"]) == ("Accra", "speeding")
+    assert len(result["series"]) == 12
+    assert result["series"][-1]["bucket"] == "2026-02-01T00:00:00+00:00"
+
+
+def test_bucket_count_is_clamped(monkeypatch):
+    monkeypatch.setattr(violation_service, "supabase", FakeChartRpc())
+    assert len(chart(period="day", buckets=10_000, end=date(2026, 3, 5))["series"]) == violation_service.MAX_CHART_BUCKETS
+    assert len(chart(period="day", buckets=0, end=date(2026, 3, 5))["series"]) == 24
+
+
+def test_unknown_period_is_rejected():
+    with pytest.raises(ValueError):
+        chart(period="fortnight")
+
+
+@pytest.fixture
+def rollups(counters):  # noqa: F811
+    counters.execute("SET TIME ZONE 'UTC'")
+    counters.execute(setup_sql("violation_chart_sql"))
+    return counters
+
+
+def test_chart_reads_filtered_rollups(rollups, monkeypatch):
+    insert(rollups, 3, created_at="2026-03-02 08:10:00+00")
+    insert(rollups, 2, status="approved", created_at="2026-03-02 17:45:00+00")
+    insert(rollups, 4, location="Kumasi", created_at="2026-03-03 09:00:00+00")
+    insert(rollups, 1, violation_type="parking", created_at="2026-03-05 23:59:00+00")
+    # Outside the week ending 2026-03-05
+    insert(rollups, 7, created_at="2026-02-26 23:00:00+00")
+    insert(rollups, 7, created_at="2026-03-06 00:00:00+00")
+    monkeypatch.setattr(violation_service, "supabase", PostgresChartRpc(rollups))
+
+    totals = {point["bucket"][:10]: point["total"] for point in chart(period="week", end=date(2026, 3, 5))["series"]}
+    assert totals == {"2026-02-27": 0, "2026-02-28": 0, "2026-03-01": 0, "2026-03-02": 5,
+                      "2026-03-03": 4, "2026-03-04": 0, "2026-03-05": 1}
+
+    accra = chart(period="week", end=date(2026, 3, 5), location="Accra")["series"]
+    assert [point["total"] for point in accra] == [0, 0, 0, 5, 0, 0, 1]
+    parking = chart(period="week", end=date(2026, 3, 5), violation_type="parking")["series"]
+    assert [point["total"] for point in parking] == [0, 0, 0, 0, 0, 0, 1]
+
+
+def test_hourly_chart_splits_a_day(rollups, monkeypatch):
+    insert(rollups, 3, created_at="2026-03-02 08:10:00+00")
+    insert(rollups, 2, status="approved", created_at="2026-03-02 08:50:00+00")
+    insert(rollups, 1, created_at="2026-03-02 17:45:00+00")
+    monkeypatch.setattr(violation_service, "supabase", PostgresChartRpc(rollups))
+
+    series = chart(period="day", end=date(2026, 3, 2))["series"]
+    assert series[0]["bucket"] == "2026-03-02T00:00:00+00:00"
+    assert {point["bucket"][11:13]: (point["pending"], point["approved"]) for point in series if point["total"]} == {
+        "08": (3, 2), "17": (1, 0)
+    }
@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+
+import pytest
+
+import maintenance
+import services.violation_service as violation_service
+from tests.conftest import setup_sql
+
+OFFICER_A = "00000000-0000-0000-0000-00000000000a"
+OFFICER_B = "00000000-0000-0000-0000-00000000000b"
+
+# Stand-in for the Supabase violations table: just the columns the counters read
+VIOLATIONS_TABLE = """
+CREATE TABLE violations (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    plate_number TEXT NOT NULL,
+    violation_type VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    reported_by UUID,
+    location VARCHAR NOT NULL,
+    lease_owner TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+"""
+
+# What each counter table should hold, computed straight from violations
+EXPECTED = {
+    "violation_daily_counters": """
+        SELECT (created_at AT TIME ZONE 'UTC')::DATE, status, violation_type, COUNT(*)
+        FROM violations GROUP BY 1, 2, 3""",
+    "violation_officer_counters": """
+        SELECT COALESCE(reported_by::TEXT, ''), status, COUNT(*) FROM violations GROUP BY 1, 2""",
+    "violation_hourly_rollups": """
+        SELECT date_trunc('hour', created_at), status, violation_type, location, COUNT(*)
+        FROM violations GROUP BY 1, 2, 3, 4""",
+}
+
+
+@pytest.fixture
+def counters(pg):
+    pg.execute(VIOLATIONS_TABLE)
+    for name in ("violation_counters_sql", "apply_violation_counter_deltas_sql",
+                 "violation_counters_trigger_sql", "rebuild_violation_counters_sql",
+                 "violation_counter_totals_sql"):
+        pg.execute(setup_sql(name))
+    return pg
+
+
+def counter_rows(connection, table):
+    """Non-zero counter rows; decrements can leave zero rows behind, which count as absent"""
+    columns = {"violation_daily_counters": "day, status, violation_type, count",
+               "violation_officer_counters": "reported_by, status, count",
+               "violation_hourly_rollups": "hour, status, violation_type, location, count"}[table]
+    return sorted(connection.execute(f"SELECT {columns} FROM {table} WHERE count <> 0").fetchall())
+
+
+def assert_counters_match(connection):
+    for table, query in EXPECTED.items():
+        assert counter_rows(connection, table) == sorted(connection.execute(query).fetchall()), table
+
+
+def insert(connection, count=1, violation_type="speeding", status="pending", officer=OFFICER_A,
+           location="Accra", created_at="2026-03-01 10:15:00+00"):
+    connection.execute(
+        """INSERT INTO violations (plate_number, violation_type, status, reported_by, location, created_at)
+           SELECT 'GR ' || n, %s, %s, %s, %s, %s FROM generate_series(1, %s) AS n""",
+        (violation_type, status, officer, location, created_at, count)
+    )
+
+
+def test_multi_row_insert_counts_every_row(counters):
+    insert(counters, 3)
+    insert(counters, 2, violation_type="parking", officer=OFFICER_B, created_at="2026-03-01 23:30:00+00")
+    insert(counters, 1, officer=None, created_at="2026-03-02 00:05:00+00")
+    assert_counters_match(counters)
+    assert counter_rows(counters, "violation_officer_counters") == [
+        ("", "pending", 1), (OFFICER_A, "pending", 3), (OFFICER_B, "pending", 2)
+    ]
+
+
+@pytest.mark.parametrize("change", [
+    "status = 'approved'",
+    "violation_type = 'red_light'",
+    f"reported_by = '{OFFICER_B}'",
+    "location = 'Kumasi'",
+    "created_at = created_at + INTERVAL '1 day'",
+    "status = 'rejected', violation_type = 'parking', reported_by = NULL",
+])
+def test_updates_move_counts_between_buckets(counters, change):
+    insert(counters, 4)
+    insert(counters, 2, violation_type="parking", officer=OFFICER_B)
+    counters.execute(f"UPDATE violations SET {change} WHERE id IN (SELECT id FROM violations ORDER BY plate_number LIMIT 3)")
+    assert_counters_match(counters)
+
+
+def test_updates_to_uncounted_columns_leave_counters_alone(counters):
+    insert(counters, 2)
+    before = {table: counter_rows(counters, table) for table in EXPECTED}
+    counters.execute("UPDATE violations SET lease_owner = 'supervisor', plate_number = plate_number || 'X'")
+    assert {table: counter_rows(counters, table) for table in EXPECTED} == before
+
+
+def test_deletes_subtract(counters):
+    insert(counters, 3)
+    insert(counters, 1, status="approved")
+    counters.execute("DELETE FROM violations WHERE id IN (SELECT id FROM violations WHERE status = 'pending' LIMIT 2)")
+    assert_counters_match(counters)
+    counters.execute("DELETE FROM violations")
+    for table in EXPECTED:
+        assert counter_rows(counters, table) == []
+
+
+def test_rebuild_repairs_drift(counters):
+    insert(counters, 3)
+    insert(counters, 2, status="approved", officer=OFFICER_B)
+    counters.execute("UPDATE violation_daily_counters SET count = count + 40")
+    counters.execute("DELETE FROM violation_officer_counters")
+    counters.execute("TRUNCATE violation_hourly_rollups")
+
+    assert counters.execute("SELECT rebuild_violation_counters()").fetchone()[0] == 5
+    assert_counters_match(counters)
+
+
+def test_counter_totals_match_a_grouped_scan(counters):
+    insert(counters, 3)
+    insert(counters, 2, status="approved", created_at="2026-03-02 09:00:00+00")
+    insert(counters, 1, violation_type="parking", created_at="2026-03-03 09:00:00+00")
+    counters.execute("DELETE FROM violations WHERE violation_type = 'parking'")
+
+    totals = counters.execute("SELECT * FROM violation_counter_totals()").fetchall()
+    expected = counters.execute("SELECT status, violation_type, COUNT(*) FROM violations GROUP BY 1, 2").fetchall()
+    assert sorted(totals) == sorted(expected)
+
+
+def test_violation_statistics_roll_up_counter_totals(monkeypatch):
+    calls = []
+
+    class FakeRpc:
+        def rpc(self, name):
+            calls.append(name)
+            return self
+
+        def execute(self):
+            class Response:
+                data = [
+                    {"status": "pending", "violation_type": "speeding", "violation_count": 4},
+                    {"status": "approved", "violation_type": "speeding", "violation_count": 2},
+                    {"status": "approved", "violation_type": "parking", "violation_count": 3},
+                    {"status": "paid", "violation_type": "parking", "violation_count": 1},
+                ]
+            return Response
+
+    monkeypatch.setattr(violation_service, "supabase", FakeRpc())
+    statistics = asyncio.run(violation_service.ViolationService().get_violation_statistics())
+    assert calls == ["violation_counter_totals"]
+    assert statistics == {
+        "total_violations": 10,
+        "pending_violations": 4,
+        "approved_violations": 5,
+        "rejected_violations": 0,
+        "violation_types": {"speeding": 6, "parking": 4},
+    }
+
+
+def test_rebuild_counters_command_reports_total(monkeypatch, capsys):
+    calls = []
+
+    class FakeRpc:
+        def rpc(self, name):
+            calls.append(name)
+            return self
+
+        def execute(self):
+            class Response:
+                data = 12
+            return Response
+
+    monkeypatch.setattr(maintenance, "supabase", FakeRpc())
+    maintenance.rebuild_counters(argparse.Namespace())
+    assert calls == ["rebuild_violation_counters"]
+    assert "12 violations counted" in capsys.readouterr().out
@@ -0,0 +1,171 @@
+import asyncio
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import services.violation_service as violation_service
+from models.violation import ViolationBulkReview
+from services.violation_service import MAX_LEASE_BATCH, REVIEW_CONFLICT_ERROR, ViolationService
+from tests.test_violation_lookup import violation_row
+
+LEASE_FILTER = re.compile(r'lease_owner\.is\.null,lease_owner\.eq\."([^"]+)",lease_expires_at\.lt\."([^"]+)"')
+
+
+class FakeQueue:
+    """In-memory violations table that applies the lease RPC and review/release UPDATEs like Postgres would"""
+
+    def __init__(self, count):
+        self.rows = {}
+        for minutes in range(count):
+            row = violation_row("GR 1-20", "officer", count - minutes)
+            self.rows[row["id"]] = row
+        self.lease_calls = []
+
+    def ids(self):
+        return sorted(self.rows, key=lambda row_id: (self.rows[row_id]["created_at"], row_id))
+
+    def lease(self, row_id, owner, seconds):
+        self.rows[row_id]["lease_owner"] = owner
+        self.rows[row_id]["lease_expires_at"] = (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+    def rpc(self, name, params):
+        assert name == "lease_pending_violations"
+        self.lease_calls.append(params)
+        now = datetime.now(timezone.utc).isoformat()
+        leased = []
+        for row_id in self.ids():
+            row = self.rows[row_id]
+            free = row["lease_expires_at"] is None or row["lease_expires_at"] < now or row["lease_owner"] == params["p_owner"]
+            if row["status"] == "pending" and free and len(leased) < params["p_limit"]:
+                self.lease(row_id, params["p_owner"], params["p_lease_seconds"])
+                leased.append(dict(row))
+        return FakeResult(list(reversed(leased)))
+
+    def table(self, name):
+        return FakeUpdate(self)
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+    def select(self, columns):
+        return self
+
+    def execute(self):
+        return self
+
+
+class FakeUpdate:
+    def __init__(self, database):
+        self.database = database
+        self.conditions = []
+
+    def update(self, changes):
+        self.changes = changes
+        return self
+
+    def in_(self, column, values):
+        self.conditions.append(lambda row: row[column] in values)
+        return self
+
+    def eq(self, column, value):
+        self.conditions.append(lambda row: row[column] == value)
+        return self
+
+    def or_(self, filters):
+        owner, now = LEASE_FILTER.fullmatch(filters).groups()
+        self.conditions.append(lambda row: row["lease_owner"] is None or row["lease_owner"] == owner or row["lease_expires_at"] < now)
+        return self
+
+    def select(self, columns):
+        return self
+
+    def execute(self):
+        updated = []
+        for row in self.database.rows.values():
+            if all(condition(row) for condition in self.conditions):
+                row.update(self.changes)
+                updated.append({"id": row["id"]})
+        return FakeResult(updated)
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    database = FakeQueue(5)
+    monkeypatch.setattr(violation_service, "supabase", database)
+    monkeypatch.setattr(violation_service.metrics_broadcaster, "notify", lambda topic: None)
+    return database
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(violation_service, "WRITE_BEHIND_ENABLED", False)
+    return ViolationService()
+
+
+def test_leases_are_disjoint_oldest_first_and_renewable(service, queue):
+    first = asyncio.run(service.lease_violations("alice", 2))
+    second = asyncio.run(service.lease_violations("bob", 2))
+    assert [violation.id for violation in first] == queue.ids()[:2]
+    assert [violation.id for violation in second] == queue.ids()[2:4]
+    # Calling again returns (and renews) alice's own leases instead of new items
+    again = asyncio.run(service.lease_violations("alice", 2))
+    assert [violation.id for violation in again] == queue.ids()[:2]
+
+
+def test_lease_batch_size_is_clamped(service, queue):
+    asyncio.run(service.lease_violations("alice", 0))
+    asyncio.run(service.lease_violations("alice", 10000))
+    assert [call["p_limit"] for call in queue.lease_calls] == [1, MAX_LEASE_BATCH]
+    assert queue.lease_calls[0]["p_lease_seconds"] == violation_service.LEASE_SECONDS
+
+
+def test_expired_leases_go_back_to_the_queue(service, queue):
+    stale = queue.ids()[0]
+    queue.lease(stale, "alice", -60)
+    leased = asyncio.run(service.lease_violations("bob", 1))
+    assert [violation.id for violation in leased] == [stale]
+    assert queue.rows[stale]["lease_owner"] == "bob"
+
+
+def test_review_respects_other_supervisors_live_leases(service, queue):
+    held, lapsed, own = queue.ids()[:3]
+    queue.lease(held, "alice", 300)
+    queue.lease(lapsed, "alice", -60)
+    queue.lease(own, "bob", 300)
+
+    assert asyncio.run(service.approve_violation(held, "bob")) is False
+    assert asyncio.run(service.approve_violation(lapsed, "bob")) is True
+    assert asyncio.run(service.approve_violation(own, "bob")) is True
+    assert queue.rows[held]["status"] == "pending"
+    assert queue.rows[own]["lease_owner"] is None and queue.rows[own]["reviewed_by"] == "bob"
+
+
+def test_unleased_items_can_be_reviewed_but_only_once(service, queue):
+    violation_id = queue.ids()[0]
+    assert asyncio.run(service.approve_violation(violation_id, "alice")) is True
+    # A second supervisor acting on the same unleased item loses the race cleanly
+    assert asyncio.run(service.reject_violation(violation_id, "Blurry", "bob")) is False
+    assert queue.rows[violation_id]["status"] == "approved"
+    assert queue.rows[violation_id]["reviewed_by"] == "alice"
+
+
+def test_bulk_review_reports_items_leased_by_others(service, queue):
+    held, free = queue.ids()[:2]
+    queue.lease(held, "alice", 300)
+    result = asyncio.run(service.review_violations(ViolationBulkReview(approve=[held, free]), "bob"))
+    by_id = {item.violation_id: item for item in result.results}
+    assert by_id[free].success
+    assert by_id[held].error == REVIEW_CONFLICT_ERROR
+
+
+def test_release_only_hands_back_own_leases(service, queue):
+    mine, theirs = queue.ids()[:2]
+    queue.lease(mine, "bob", 300)
+    queue.lease(theirs, "alice", 300)
+    assert asyncio.run(service.release_violations([mine, theirs, str(uuid.uuid4())], "bob")) == 1
+    assert queue.rows[mine]["lease_owner"] is None
+    assert queue.rows[theirs]["lease_owner"] == "alice"
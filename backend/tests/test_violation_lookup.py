@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+import services.violation_service as violation_service
+from services.violation_service import ViolationService
+
+
+def violation_row(plate_number, reported_by, minutes_ago):
+    timestamp = (datetime(2026, 1, 1, 12, 0) - timedelta(minutes=minutes_ago)).isoformat()
+    return {
+        "id": str(uuid.uuid4()),
+        "plate_number": plate_number,
+        "violation_type": "speeding",
+        "severity": "minor",
+        "location": "Accra",
+        "description": "Speeding",
+        "fine_amount": 100.0,
+        "evidence_hash": None,
+        "officer_notes": None,
+        "status": "pending",
+        "reported_by": reported_by,
+        "reported_at": timestamp,
+        "reviewed_by": None,
+        "reviewed_at": None,
+        "rejection_reason": None,
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "created_at": timestamp,
+        "updated_at": timestamp,
+    }
+
+
+class FakeViolations:
+    """Answers plate/reporter-filtered selects slowly enough for lookups to overlap"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+        self.lock = threading.Lock()
+
+    def table(self, name):
+        return FakeSelect(self)
+
+
+class FakeSelect:
+    def __init__(self, database):
+        self.database = database
+        self.filters = {}
+        self.page_size = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def limit(self, page_size):
+        self.page_size = page_size
+        return self
+
+    def execute(self):
+        time.sleep(0.05)
+        with self.database.lock:
+            self.database.executed.append(dict(self.filters))
+        rows = [row for row in self.database.rows if all(row[column] == value for column, value in self.filters.items())]
+        rows.sort(key=lambda row: (row["created_at"], row["id"]), reverse=True)
+
+        class Response:
+            data = rows[:self.page_size]
+        return Response
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(violation_service, "WRITE_BEHIND_ENABLED", False)
+    return ViolationService()
+
+
+def test_identical_plate_lookups_share_a_query(service, monkeypatch):
+    database = FakeViolations([violation_row("GR 1-20", "a", minutes) for minutes in range(3)])
+    monkeypatch.setattr(violation_service, "supabase", database)
+
+    async def run():
+        return await asyncio.gather(*(service.get_violations("GR 1-20", user_id="a") for _ in range(4)))
+
+    pages = asyncio.run(run())
+    assert database.executed == [{"plate_number": "GR 1-20", "reported_by": "a"}]
+    assert [len(violations) for violations, _ in pages] == [3, 3, 3, 3]
+
+
+def test_plate_lookups_from_different_officers_stay_scoped(service, monkeypatch):
+    rows = [violation_row("GR 1-20", officer, minutes) for minutes, officer in enumerate(["a", "b", "a", "c"])]
+    database = FakeViolations(rows + [violation_row("GT 9-19", "a", 0)])
+    monkeypatch.setattr(violation_service, "supabase", database)
+
+    async def run():
+        return await asyncio.gather(*(service.get_violations("GR 1-20", user_id=officer) for officer in ["a", "b", "c"]))
+
+    pages = asyncio.run(run())
+    assert sorted(filters["reported_by"] for filters in database.executed) == ["a", "b", "c"]
+    assert [len(violations) for violations, _ in pages] == [2, 1, 1]
+    assert all(violation.reported_by == "b" for violation in pages[1][0])
+
+
+def test_other_reporters_rows_do_not_crowd_out_the_page(service, monkeypatch):
+    # The newest rows for the plate all belong to another officer
+    rows = [violation_row("GR 1-20", "b", minutes) for minutes in range(5)]
+    rows += [violation_row("GR 1-20", "a", minutes) for minutes in range(5, 8)]
+    monkeypatch.setattr(violation_service, "supabase", FakeViolations(rows))
+
+    violations, next_cursor = asyncio.run(service.get_violations("GR 1-20", user_id="a", limit=3))
+    assert [violation.id for violation in violations] == [row["id"] for row in rows[5:]]
+    assert next_cursor is None
+
+
+def test_lookups_without_plate_still_filter_by_reporter_in_the_query(service, monkeypatch):
+    database = FakeViolations([violation_row("GR 1-20", "a", 0), violation_row("GR 2-20", "b", 1)])
+    monkeypatch.setattr(violation_service, "supabase", database)
+    violations, _ = asyncio.run(service.get_violations(user_id="b"))
+    assert database.executed == [{"reported_by": "b"}]
+    assert [violation.plate_number for violation in violations] == ["GR 2-20"]
@@ -0,0 +1,112 @@
+import asyncio
+import uuid
+
+import pytest
+from postgrest.exceptions import APIError
+
+import services.violation_service as violation_service
+from models.violation import ViolationBulkReview, ViolationStatus
+from services.violation_service import INVALID_ID_ERROR, REVIEW_CONFLICT_ERROR, ViolationService
+
+
+class FakeUpdate:
+    """Enough of a PostgREST update builder to run the review and release queries"""
+
+    def __init__(self, database):
+        self.database = database
+        self.ids = []
+
+    def update(self, changes):
+        self.changes = changes
+        return self
+
+    def in_(self, column, values):
+        self.ids = values
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def or_(self, *args):
+        return self
+
+    def select(self, *args):
+        return self
+
+    def execute(self):
+        self.database.statements.append(list(self.ids))
+        for violation_id in self.ids:
+            try:
+                uuid.UUID(violation_id)
+            except ValueError:
+                # Postgres rejects the whole statement
+                raise APIError({"code": "22P02", "message": f'invalid input syntax for type uuid: "{violation_id}"'})
+
+        class Response:
+            data = [{"id": violation_id} for violation_id in self.ids if violation_id in self.database.pending]
+        return Response
+
+
+class FakeDatabase:
+    def __init__(self, pending):
+        self.pending = set(pending)
+        self.statements = []
+
+    def table(self, name):
+        return FakeUpdate(self)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(violation_service, "WRITE_BEHIND_ENABLED", False)
+    monkeypatch.setattr(violation_service.metrics_broadcaster, "notify", lambda topic: None)
+    return ViolationService()
+
+
+def test_review_reports_malformed_ids_individually(service, monkeypatch):
+    pending = [str(uuid.uuid4()) for _ in range(3)]
+    missing = str(uuid.uuid4())
+    database = FakeDatabase(pending)
+    monkeypatch.setattr(violation_service, "supabase", database)
+
+    review = ViolationBulkReview(
+        approve=[pending[0], "not-a-uuid", pending[1].upper()],
+        reject=[pending[2], missing, "1; drop table"],
+        rejection_reason="Unclear plate"
+    )
+    result = asyncio.run(service.review_violations(review, "supervisor-1"))
+    by_id = {item.violation_id: item for item in result.results}
+
+    assert (result.approved, result.rejected, result.failed) == (2, 1, 3)
+    assert by_id["not-a-uuid"].error == INVALID_ID_ERROR
+    assert by_id["1; drop table"].error == INVALID_ID_ERROR
+    assert by_id[missing].error == REVIEW_CONFLICT_ERROR
+    assert by_id[pending[1].upper()].status == ViolationStatus.APPROVED
+    # Only well-formed ids ever reach the database
+    assert all(uuid.UUID(violation_id) for statement in database.statements for violation_id in statement)
+
+
+def test_review_flags_ids_in_both_lists(service, monkeypatch):
+    violation_id = str(uuid.uuid4())
+    monkeypatch.setattr(violation_service, "supabase", FakeDatabase([violation_id]))
+    review = ViolationBulkReview(approve=[violation_id], reject=[violation_id], rejection_reason="x")
+    result = asyncio.run(service.review_violations(review, "supervisor-1"))
+    assert result.failed == 1
+    assert result.results[0].error == "Both approved and rejected"
+
+
+def test_release_ignores_malformed_ids(service, monkeypatch):
+    leased = str(uuid.uuid4())
+    database = FakeDatabase([leased])
+    monkeypatch.setattr(violation_service, "supabase", database)
+    assert asyncio.run(service.release_violations([leased, "bogus"], "supervisor-1")) == 1
+    assert database.statements == [[leased]]
+    assert asyncio.run(service.release_violations(["bogus"], "supervisor-1")) == 0
+    assert len(database.statements) == 1
+
+
+def test_approve_malformed_id_skips_database(service, monkeypatch):
+    database = FakeDatabase([])
+    monkeypatch.setattr(violation_service, "supabase", database)
+    assert asyncio.run(service.approve_violation("bogus", "supervisor-1")) is False
+    assert database.statements == []
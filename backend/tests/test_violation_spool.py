@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+from postgrest.exceptions import APIError
+
+import services.violation_spool as violation_spool
+from services.violation_spool import ViolationSpool, is_row_error
+
+
+class FakeWriter:
+    """Collects written rows; `fail` decides per call whether (and how) to raise"""
+
+    def __init__(self):
+        self.written = []
+        self.calls = 0
+        self.fail = None
+
+    def __call__(self, rows):
+        self.calls += 1
+        if self.fail:
+            error = self.fail(rows)
+            if error:
+                raise error
+        self.written.extend(row["id"] for row in rows)
+
+
+def constraint_error():
+    return APIError({"code": "23505", "message": "duplicate key value violates unique constraint"})
+
+
+@pytest.fixture
+def writer():
+    return FakeWriter()
+
+
+@pytest.fixture
+def spool(tmp_path, writer):
+    return ViolationSpool(writer, str(tmp_path / "violations.db"))
+
+
+def fill(spool, count):
+    for index in range(count):
+        spool.append({"id": f"v{index}", "plate_number": f"GR {index}"})
+
+
+def test_is_row_error():
+    assert is_row_error(constraint_error())
+    assert is_row_error(APIError({"code": "22P02", "message": "invalid input syntax for type uuid"}))
+    assert not is_row_error(APIError({"code": "57014", "message": "canceling statement due to statement timeout"}))
+    assert not is_row_error(ConnectionError("connection refused"))
+
+
+def test_flush_writes_batch_and_empties_spool(spool, writer):
+    fill(spool, 3)
+    spool.append({"id": "v0", "plate_number": "duplicate"})
+    assert spool.flush() == 3
+    assert writer.written == ["v0", "v1", "v2"]
+    assert spool.pending_count() == 0
+
+
+def test_outage_backs_off_without_charging_rows(spool, writer, monkeypatch):
+    monkeypatch.setattr(violation_spool, "MAX_FLUSH_ATTEMPTS", 2)
+    fill(spool, 3)
+    writer.fail = lambda rows: ConnectionError("database unreachable")
+
+    assert spool.flush() == 0
+    assert writer.calls == 1  # no per-row retries against a dead database
+    assert spool.backing_off()
+    assert spool.flush() == 0
+    assert writer.calls == 1
+
+    # Many failed batches later nothing has been charged or dead-lettered
+    for _ in range(5):
+        spool._backoff_until = 0
+        spool.flush()
+    assert spool.dead_letter_count() == 0
+    attempts = spool._conn.execute("SELECT MAX(attempts) FROM spool").fetchone()[0]
+    assert attempts == 0
+
+    writer.fail = None
+    spool._backoff_until = 0
+    assert spool.flush() == 3
+    assert spool.pending_count() == 0
+
+
+def test_row_errors_are_isolated_and_dead_lettered(spool, writer, monkeypatch):
+    monkeypatch.setattr(violation_spool, "MAX_FLUSH_ATTEMPTS", 1)
+    fill(spool, 3)
+    writer.fail = lambda rows: constraint_error() if any(row["id"] == "v1" for row in rows) else None
+
+    assert spool.flush() == 2
+    assert writer.written == ["v0", "v2"]
+    assert not spool.backing_off()
+    assert spool.pending_count() == 0
+    assert spool.dead_letter_count() == 1
+
+    writer.fail = None
+    assert spool.requeue_dead_letters() == 1
+    assert spool.dead_letter_count() == 0
+    assert spool.flush() == 1
+    assert writer.written[-1] == "v1"
+
+
+def test_row_error_charges_attempt_and_delays_row(spool, writer):
+    fill(spool, 1)
+    writer.fail = lambda rows: constraint_error()
+    assert spool.flush() == 0
+    attempts, next_attempt_at = spool._conn.execute("SELECT attempts, next_attempt_at FROM spool").fetchone()
+    assert attempts == 1
+    assert next_attempt_at > 0
+    assert spool.flush() == 0  # not due yet
+    assert writer.calls == 2
+
+
+def test_outage_during_isolation_stops_charging(spool, writer):
+    fill(spool, 3)
+    calls = []
+
+    def fail(rows):
+        calls.append(len(rows))
+        if len(rows) > 1 or rows[0]["id"] == "v0":
+            return constraint_error()
+        return ConnectionError("database unreachable")
+
+    writer.fail = fail
+    assert spool.flush() == 0
+    assert spool.backing_off()
+    charged = spool._conn.execute("SELECT id FROM spool WHERE attempts > 0").fetchall()
+    assert charged == [("v0",)]
+
+
+def test_drain_empties_a_multi_batch_backlog(spool, writer, monkeypatch):
+    monkeypatch.setattr(violation_spool, "FLUSH_BATCH_SIZE", 2)
+    fill(spool, 5)
+    assert spool.drain() == 5
+    assert spool.pending_count() == 0
+
+
+def test_drain_stops_while_backing_off(spool, writer):
+    fill(spool, 2)
+    writer.fail = lambda rows: ConnectionError("database unreachable")
+    assert spool.drain() == 0
+    assert spool.pending_count() == 2
+
+
+def test_stop_drains_whole_spool(spool, writer, monkeypatch):
+    monkeypatch.setattr(violation_spool, "FLUSH_BATCH_SIZE", 2)
+
+    async def run():
+        spool.start()
+        await spool.stop()
+
+    fill(spool, 5)
+    asyncio.run(run())
+    assert spool.pending_count() == 0
+    assert sorted(writer.written) == [f"v{index}" for index in range(5)]
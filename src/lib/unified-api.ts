@@ -62,6 +62,29 @@ export interface Violation {
   updated_at?: string;
 }
 
+// List view returned by GET /violations (no evidence image)
+export interface ViolationSummary {
+  id: string;
+  plate_number: string;
+  violation_type: string;
+  severity: string;
+  location: string;
+  description: string;
+  fine_amount: number;
+  evidence_hash?: string | null;
+  officer_notes?: string | null;
+  status: string;
+  reported_by: string;
+  reported_at: string;
+  reviewed_by?: string | null;
+  reviewed_at?: string | null;
+  rejection_reason?: string | null;
+  lease_owner?: string | null;
+  lease_expires_at?: string | null;
+  created_at: string;
+  updated_at: string;
+}
+
 export interface DVLAVehicle {
   id: number;
   reg_number: string;
@@ -82,6 +105,21 @@ export interface DVLAVehicle {
   status: string;
 }
 
+// List/search view returned by GET /dvla/vehicles; fetch a single vehicle for the full record
+export interface DVLAVehicleSummary {
+  id: number;
+  reg_number: string;
+  license_plate: string;
+  manufacturer: string;
+  model: string;
+  vehicle_type: string;
+  year_of_manufacture: number;
+  color: string;
+  owner_name: string;
+  status: string;
+  created_at?: string;
+}
+
 export interface DVLARenewal {
   id: number;
   vehicle_id: number;
@@ -608,12 +646,12 @@ class UnifiedAPIClient {
     });
   }
 
-  async getViolations(plateNumber?: string, status?: string): Promise<ApiResponse<Violation[]>> {
+  async getViolations(plateNumber?: string, status?: string): Promise<ApiResponse<ViolationSummary[]>> {
     const params = new URLSearchParams();
     if (plateNumber) params.append('plate_number', plateNumber);
     if (status) params.append('status', status);
     
-    return this.request<Violation[]>(`/violations?${params.toString()}`);
+    return this.request<ViolationSummary[]>(`/violations?${params.toString()}`);
   }
 
   async approveViolation(violationId: string): Promise<ApiResponse<any>> {
@@ -641,12 +679,12 @@ class UnifiedAPIClient {
     });
   }
 
-  async getDVLAVehicles(search?: string, limit: number = 100): Promise<ApiResponse<DVLAVehicle[]>> {
+  async getDVLAVehicles(search?: string, limit: number = 100): Promise<ApiResponse<DVLAVehicleSummary[]>> {
     const params = new URLSearchParams();
     if (search) params.append('search', search);
     params.append('limit', limit.toString());
     
-    return this.request<DVLAVehicle[]>(`/dvla/vehicles?${params.toString()}`);
+    return this.request<DVLAVehicleSummary[]>(`/dvla/vehicles?${params.toString()}`);
   }
 
   async getDVLAVehicleById(vehicleId: number): Promise<ApiResponse<DVLAVehicle>> {